@@ -0,0 +1,42 @@
+"""
+Разбор программы сгенерированным парсером ExprParser
+Вынесен из Driver, чтобы исполнение программы из кэша AST не импортировало ANTLR
+"""
+
+from antlr4 import CommonTokenStream, InputStream
+from antlr4.error.ErrorListener import ErrorListener
+
+from ExprLexer import ExprLexer
+from ExprParser import ExprParser
+from FastLexer import FastLexer
+from Runtime import ParseError
+
+
+# Лексеры с одинаковым потоком токенов
+LEXERS = {
+    'fast': FastLexer,
+    'antlr': ExprLexer,
+}
+
+
+class SyntaxErrorCounter(ErrorListener):
+    """Считает ошибки лексера, у которого нет собственного счётчика"""
+
+    def __init__(self):
+        self.count = 0
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.count += 1
+
+
+def parse(input_text: str, strict: bool = False, lexer: str = 'fast') -> ExprParser.ProgramContext:
+    input_stream = InputStream(input_text)
+    lexer = LEXERS[lexer](input_stream)
+    lexer_errors = SyntaxErrorCounter()
+    lexer.addErrorListener(lexer_errors)
+    stream = CommonTokenStream(lexer)
+    parser = ExprParser(stream)
+    tree = parser.program()
+    if strict and (parser.getNumberOfSyntaxErrors() > 0 or lexer_errors.count > 0):
+        raise ParseError("Программа содержит синтаксические ошибки")
+    return tree
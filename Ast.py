@@ -0,0 +1,157 @@
+"""
+Компактное AST для исполнения программ
+Узлы используют __slots__, операторы заранее преобразованы в целые коды,
+имена переменных интернированы, литералы разобраны в значения
+"""
+
+import sys
+from typing import List, Optional
+
+from Runtime import Value
+
+
+# Коды бинарных операторов
+OP_MUL = 0
+OP_DIV = 1
+OP_MOD = 2
+OP_ADD = 3
+OP_SUB = 4
+OP_LT = 5
+OP_LE = 6
+OP_GT = 7
+OP_GE = 8
+OP_EQ = 9
+OP_NE = 10
+# Логические операторы идут последними: их операнды вычисляются лениво
+OP_AND = 11
+OP_OR = 12
+
+# Коды унарных операторов
+OP_NOT = 0
+OP_NEG = 1
+OP_POS = 2
+
+BINARY_OPS = {
+    '*': OP_MUL, '/': OP_DIV, '%': OP_MOD,
+    '+': OP_ADD, '-': OP_SUB,
+    '<': OP_LT, '<=': OP_LE, '>': OP_GT, '>=': OP_GE, '==': OP_EQ, '!=': OP_NE,
+    '&&': OP_AND, '||': OP_OR,
+}
+
+UNARY_OPS = {'!': OP_NOT, '-': OP_NEG, '+': OP_POS}
+
+BINARY_SYMBOLS = {code: symbol for symbol, code in BINARY_OPS.items()}
+UNARY_SYMBOLS = {code: symbol for symbol, code in UNARY_OPS.items()}
+
+TYPE_NAMES = ('int', 'float', 'string')
+
+
+class Node:
+    __slots__ = ()
+
+
+# Операторы
+
+class Program(Node):
+    __slots__ = ('body', 'names', 'types')
+
+    def __init__(self, body: List[Node]):
+        self.body = body
+        # Имена переменных по номерам слотов, заполняется модулем Resolver
+        self.names: Optional[List[str]] = None
+        # Статические типы слотов (None - тип известен только при исполнении),
+        # заполняется модулем TypeChecker
+        self.types: Optional[List[Optional[str]]] = None
+
+
+class Declaration(Node):
+    __slots__ = ('name', 'type_name', 'expr', 'slot')
+
+    def __init__(self, name: str, type_name: str, expr: Optional[Node]):
+        self.name = sys.intern(name)
+        self.type_name = sys.intern(type_name)
+        self.expr = expr
+        self.slot = -1
+
+
+class Assignment(Node):
+    __slots__ = ('name', 'expr', 'slot', 'guarded')
+
+    def __init__(self, name: str, expr: Node):
+        self.name = sys.intern(name)
+        self.expr = expr
+        self.slot = -1
+        # Нужна ли проверка объявления переменной во время выполнения
+        self.guarded = True
+
+
+class If(Node):
+    __slots__ = ('cond', 'then', 'orelse')
+
+    def __init__(self, cond: Node, then: Node, orelse: Optional[Node]):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+
+
+class While(Node):
+    __slots__ = ('cond', 'body')
+
+    def __init__(self, cond: Node, body: Node):
+        self.cond = cond
+        self.body = body
+
+
+class Print(Node):
+    __slots__ = ('expr',)
+
+    def __init__(self, expr: Node):
+        self.expr = expr
+
+
+class Block(Node):
+    __slots__ = ('body',)
+
+    def __init__(self, body: List[Node]):
+        self.body = body
+
+
+# Выражения
+# Поле type_name заполняется модулем TypeChecker: статический тип результата
+# или None, если тип известен только при исполнении
+
+class Binary(Node):
+    __slots__ = ('op', 'left', 'right', 'type_name')
+
+    def __init__(self, op: int, left: Node, right: Node):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.type_name: Optional[str] = None
+
+
+class Unary(Node):
+    __slots__ = ('op', 'operand', 'type_name')
+
+    def __init__(self, op: int, operand: Node):
+        self.op = op
+        self.operand = operand
+        self.type_name: Optional[str] = None
+
+
+class Var(Node):
+    __slots__ = ('name', 'slot', 'guarded', 'type_name')
+
+    def __init__(self, name: str):
+        self.name = sys.intern(name)
+        self.slot = -1
+        self.guarded = True
+        self.type_name: Optional[str] = None
+
+
+class Literal(Node):
+    __slots__ = ('value', 'type_name')
+
+    def __init__(self, value: Value):
+        self.value = value
+        self.type_name = value.type_name
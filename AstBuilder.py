@@ -0,0 +1,88 @@
+"""
+Понижение дерева разбора ANTLR в компактное AST (модуль Ast)
+Выполняется один раз перед исполнением, после чего дерево разбора можно отбросить
+"""
+
+from typing import Dict
+
+from ExprParser import ExprParser
+from ExprVisitor import ExprVisitor
+from Runtime import Value, int_value, InterpreterError, decode_string_literal
+import Ast
+
+
+class AstBuilder(ExprVisitor):
+    def __init__(self):
+        # Одинаковые литералы разделяют одно разобранное значение
+        self._literals: Dict[str, Value] = {}
+
+    def visitProgram(self, ctx: ExprParser.ProgramContext):
+        return Ast.Program([self.visit(statement) for statement in ctx.statement()])
+
+    def visitStatement(self, ctx: ExprParser.StatementContext):
+        child = (ctx.declaration() or ctx.assignment() or ctx.ifStatement()
+                 or ctx.whileStatement() or ctx.printStatement() or ctx.block())
+        if child is None:
+            raise InterpreterError(f"Неизвестный оператор: {ctx.getText()}")
+        return self.visit(child)
+
+    def visitDeclaration(self, ctx: ExprParser.DeclarationContext):
+        expr = self.visit(ctx.expression()) if ctx.expression() else None
+        return Ast.Declaration(ctx.ID().getText(), self.visit(ctx.type_()), expr)
+
+    def visitAssignment(self, ctx: ExprParser.AssignmentContext):
+        return Ast.Assignment(ctx.ID().getText(), self.visit(ctx.expression()))
+
+    def visitIfStatement(self, ctx: ExprParser.IfStatementContext):
+        statements = ctx.statement()
+        orelse = self.visit(statements[1]) if len(statements) > 1 else None
+        return Ast.If(self.visit(ctx.expression()), self.visit(statements[0]), orelse)
+
+    def visitWhileStatement(self, ctx: ExprParser.WhileStatementContext):
+        return Ast.While(self.visit(ctx.expression()), self.visit(ctx.statement()))
+
+    def visitPrintStatement(self, ctx: ExprParser.PrintStatementContext):
+        return Ast.Print(self.visit(ctx.expression()))
+
+    def visitBlock(self, ctx: ExprParser.BlockContext):
+        return Ast.Block([self.visit(statement) for statement in ctx.statement()])
+
+    def visitType(self, ctx: ExprParser.TypeContext):
+        return ctx.getText()
+
+    def visitExpression(self, ctx: ExprParser.ExpressionContext):
+        operands = ctx.expression()
+
+        if ctx.getChildCount() == 3 and ctx.getChild(0).getText() == '(':
+            return self.visit(operands[0])
+
+        if len(operands) == 2:
+            op = Ast.BINARY_OPS[ctx.getChild(1).getText()]
+            return Ast.Binary(op, self.visit(operands[0]), self.visit(operands[1]))
+        elif len(operands) == 1:
+            op = Ast.UNARY_OPS[ctx.getChild(0).getText()]
+            return Ast.Unary(op, self.visit(operands[0]))
+        elif ctx.ID():
+            return Ast.Var(ctx.ID().getText())
+        elif ctx.literal():
+            return self.visit(ctx.literal())
+
+        raise InterpreterError(f"Неизвестный тип выражения: {ctx.getText()}")
+
+    def visitLiteral(self, ctx: ExprParser.LiteralContext):
+        text = ctx.getText()
+        value = self._literals.get(text)
+        if value is None:
+            value = self._literals[text] = self._parse_literal(ctx)
+        return Ast.Literal(value)
+
+    @staticmethod
+    def _parse_literal(ctx: ExprParser.LiteralContext) -> Value:
+        if ctx.INT_LITERAL():
+            return int_value(int(ctx.INT_LITERAL().getText()))
+        elif ctx.FLOAT_LITERAL():
+            return Value(float(ctx.FLOAT_LITERAL().getText()), 'float')
+        elif ctx.STRING_LITERAL():
+            return Value(decode_string_literal(ctx.STRING_LITERAL().getText()), 'string')
+
+        raise InterpreterError(f"Неизвестный тип литерала: {ctx.getText()}")
@@ -0,0 +1,155 @@
+"""
+Интерпретатор компактного AST (модуль Ast)
+Операторы выбираются по заранее вычисленным кодам, без разбора строк во время выполнения;
+циклы со счётчиком и накоплениями исполняются векторно (LoopVectorizer)
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from LoopVectorizer import LoopVectorizer, CountedLoop
+from OutputSink import OutputSink
+from Runtime import Runtime, Value, TRUE, FALSE, ExecutionBudget, UndefinedVariableError, TypeMismatchError
+from TypeChecker import TypeChecker
+import Ast
+
+
+class AstInterpreter(Runtime):
+    def __init__(self, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None):
+        super().__init__(sink, budget)
+        # Значения переменных по номерам слотов, None - переменная ещё не объявлена
+        self.slots: List[Optional[Value]] = []
+        # Циклы, исполняемые векторно
+        self._counted_loops: Dict[Ast.While, CountedLoop] = {}
+        self._statements = {
+            Ast.Declaration: self._exec_declaration,
+            Ast.Assignment: self._exec_assignment,
+            Ast.If: self._exec_if,
+            Ast.While: self._exec_while,
+            Ast.Print: self._exec_print,
+            Ast.Block: self._exec_block,
+        }
+        self._expressions = {
+            Ast.Binary: self._eval_binary,
+            Ast.Unary: self._eval_unary,
+            Ast.Var: self._eval_var,
+            Ast.Literal: self._eval_literal,
+        }
+        # Таблицы индексируются кодами операторов из модуля Ast
+        self._binary = [
+            self._multiply, self._divide, self._modulo, self._add, self._subtract,
+            self._compare_lt, self._compare_le, self._compare_gt, self._compare_ge,
+            self._compare_eq, self._compare_ne,
+        ]
+        self._unary = [self._logical_not, self._unary_minus, self._unary_plus]
+
+    def execute(self, program: Ast.Program):
+        self.slots = [None] * len(TypeChecker().check(program))
+        self._counted_loops = LoopVectorizer().analyze(program)
+        statements = self._statements
+        self.budget.start()
+        self._ticks = 0
+        try:
+            for statement in program.body:
+                statements[statement.__class__](statement)
+        finally:
+            self.sink.flush()
+        return None
+
+    def evaluate(self, node: Ast.Node) -> Value:
+        return self._expressions[node.__class__](node)
+
+    def _stored_values(self) -> Iterable[Optional[Value]]:
+        return self.slots
+
+    # Операторы
+
+    def _exec_declaration(self, node: Ast.Declaration):
+        type_name = node.type_name
+        if node.expr is not None:
+            value = self._expressions[node.expr.__class__](node.expr)
+            if not self._is_compatible_type(value.type_name, type_name):
+                raise TypeMismatchError(
+                    f"Невозможно присвоить значение типа {value.type_name} переменной типа {type_name} '{node.name}'"
+                )
+            self.slots[node.slot] = self._convert_type(value, type_name)
+        else:
+            self.slots[node.slot] = self._get_default_value(type_name)
+
+    def _exec_assignment(self, node: Ast.Assignment):
+        var_name = node.name
+        existing_var = self.slots[node.slot]
+        if existing_var is None:
+            raise UndefinedVariableError(f"Переменная '{var_name}' не объявлена")
+
+        value = self._expressions[node.expr.__class__](node.expr)
+
+        if not self._is_compatible_type(value.type_name, existing_var.type_name):
+            raise TypeMismatchError(
+                f"Невозможно присвоить значение типа {value.type_name} переменной типа {existing_var.type_name} '{var_name}'"
+            )
+        self.slots[node.slot] = self._convert_type(value, existing_var.type_name)
+
+    def _exec_if(self, node: Ast.If):
+        if self._is_true(node.cond):
+            self._statements[node.then.__class__](node.then)
+        elif node.orelse is not None:
+            self._statements[node.orelse.__class__](node.orelse)
+
+    def _exec_while(self, node: Ast.While):
+        loop = self._counted_loops.get(node)
+        if loop is not None and loop.run(self):
+            return
+        cond = node.cond
+        is_true = self._is_true
+        body = node.body
+        exec_body = self._statements[body.__class__]
+        checkpoint = self.budget.checkpoint
+        while is_true(cond):
+            exec_body(body)
+            # Счётчик шагов общий для всех циклов; ограничения проверяются раз в порцию
+            self._ticks = (self._ticks or checkpoint()) - 1
+
+    def _exec_print(self, node: Ast.Print):
+        value = self._expressions[node.expr.__class__](node.expr)
+        self._print_value(value.value)
+
+    def _exec_block(self, node: Ast.Block):
+        statements = self._statements
+        for statement in node.body:
+            statements[statement.__class__](statement)
+
+    # Выражения
+
+    def _is_true(self, node: Ast.Node) -> bool:
+        """Вычисляет условие сразу в bool, без промежуточного Value для &&, || и !"""
+        node_class = node.__class__
+        if node_class is Ast.Binary:
+            if node.op == Ast.OP_AND:
+                return self._is_true(node.left) and self._is_true(node.right)
+            if node.op == Ast.OP_OR:
+                return self._is_true(node.left) or self._is_true(node.right)
+        elif node_class is Ast.Unary and node.op == Ast.OP_NOT:
+            return not self._is_true(node.operand)
+        return self._expressions[node_class](node).is_truthy()
+
+    def _eval_binary(self, node: Ast.Binary) -> Value:
+        if node.op >= Ast.OP_AND:
+            # Правый операнд логических операций вычисляется только при необходимости
+            return TRUE if self._is_true(node) else FALSE
+        expressions = self._expressions
+        left = expressions[node.left.__class__](node.left)
+        right = expressions[node.right.__class__](node.right)
+        return self._binary[node.op](left, right)
+
+    def _eval_unary(self, node: Ast.Unary) -> Value:
+        operand = self._expressions[node.operand.__class__](node.operand)
+        return self._unary[node.op](operand)
+
+    def _eval_var(self, node: Ast.Var) -> Value:
+        value = self.slots[node.slot]
+        if value is None:
+            raise UndefinedVariableError(f"Переменная '{node.name}' не объявлена")
+        return value
+
+    def _eval_literal(self, node: Ast.Literal) -> Value:
+        return node.value
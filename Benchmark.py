@@ -0,0 +1,278 @@
+"""
+Набор замеров производительности интерпретатора
+Программы из каталога bench исполняются каждым выбранным исполнителем;
+большие сгенерированные программы только разбираются. Для каждого случая
+после прогрева несколько раз отдельно измеряются лексер, разбор и исполнение
+(лучшее время), а в отдельном прогоне под tracemalloc - пиковая память. Результаты
+сравниваются с сохранённым bench/baseline.json; записываемый файл результатов
+имеет тот же формат, поэтому регрессия видна и в diff:
+    python Benchmark.py [--engines ast,vm] [--repeat N] [--save-baseline]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import Driver
+from OutputSink import CaptureSink
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(ROOT, 'bench')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+DEFAULT_ENGINES = ('ast', 'closure', 'vm', 'python')
+DEFAULT_REPEAT = 5
+DEFAULT_WARMUP = 1
+# Допустимое замедление относительно базовых результатов и порог шума
+DEFAULT_THRESHOLD = 0.2
+_NOISE_MS = 1.0
+_NOISE_KB = 64
+
+METRICS = ('lex_ms', 'parse_ms', 'execute_ms', 'peak_kb')
+
+
+class BenchCase:
+    __slots__ = ('name', 'source', 'execute')
+
+    def __init__(self, name: str, source: str, execute: bool = True):
+        self.name = name
+        self.source = source
+        # Большие сгенерированные программы только разбираются
+        self.execute = execute
+
+
+def generate_large_program(blocks: int) -> str:
+    """Большая программа для замера разбора: объявления, ветвления, циклы и длинные выражения"""
+    lines = []
+    for n in range(blocks):
+        lines.append(f"int a{n} = {n} * 3 + (7 - {n} % 5) * 2;")
+        lines.append(f"float f{n} = a{n} / 2.5 - -{n}.75;")
+        lines.append(f"string s{n} = 'блок ' + a{n} + ' \\'{n}\\'';  // комментарий")
+        lines.append(f"if (a{n} > {n} && !(f{n} == 0.0) || s{n} != '') {{")
+        lines.append(f"    while (a{n} < {n + 10}) {{ a{n} = a{n} + 1; print(a{n}); }}")
+        lines.append("} else {")
+        lines.append(f"    /* ветвь {n} */ print(s{n} * 2);")
+        lines.append("}")
+    return '\n'.join(lines) + '\n'
+
+
+def generate_long_expressions(count: int, length: int) -> str:
+    """Программа из длинных выражений: нагрузка на разбор приоритетов операторов"""
+    operators = ('+', '-', '*', '/', '%', '<', '==', '&&', '||')
+    lines = ["int x = 1;"]
+    for n in range(count):
+        terms = [f"(x {operators[(n + k) % len(operators)]} {k + 1})" for k in range(length)]
+        lines.append(f"x = {' + '.join(terms)};")
+    return '\n'.join(lines) + '\n'
+
+
+def load_cases() -> List[BenchCase]:
+    cases = []
+    for path in sorted(glob.glob(os.path.join(BENCH_DIR, '*.txt'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            cases.append(BenchCase(os.path.splitext(os.path.basename(path))[0], f.read()))
+    cases.append(BenchCase('large_program', generate_large_program(2500), execute=False))
+    cases.append(BenchCase('long_expressions', generate_long_expressions(200, 40), execute=False))
+    return cases
+
+
+# Этапы
+
+def _frontend_stages(source: str, engine: str, frontend: str):
+    """Функции лексера и полного разбора для исполнителя и способа разбора"""
+    if engine == 'tree' or frontend == 'antlr':
+        from antlr4 import InputStream
+        from FastLexer import FastLexer
+
+        def lex():
+            return FastLexer(InputStream(source)).getAllTokens()
+    else:
+        from Scanner import scan
+
+        def lex():
+            return scan(source)
+
+    if engine == 'tree':
+        def parse():
+            return Driver.parse(source)
+    else:
+        def parse():
+            return Driver.build_ast(source, frontend=frontend)
+    return lex, parse
+
+
+def _executor(engine: str) -> Callable:
+    """Функция исполнения готового AST или дерева разбора; возвращает перехваченный вывод"""
+    def execute(program) -> str:
+        sink = CaptureSink()
+        if engine == 'tree':
+            from Interpreter import Interpreter
+            Interpreter(sink).visit(program)
+        else:
+            Driver.engine_class(engine)(sink).execute(program)
+        return sink.get_output()
+    return execute
+
+
+def _best_ms(function: Callable, repeat: int, warmup: int) -> float:
+    """Лучшее время из repeat запусков: оно меньше всего зависит от посторонней нагрузки"""
+    for _ in range(warmup):
+        function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def measure(case: BenchCase, engine: str, frontend: str, repeat: int, warmup: int) -> Dict[str, object]:
+    lex, parse = _frontend_stages(case.source, engine, frontend)
+    lex_ms = _best_ms(lex, repeat, warmup)
+    # Разбор включает лексер, поэтому время лексера из него вычитается
+    parse_ms = max(0.0, _best_ms(parse, repeat, warmup) - lex_ms)
+    result = {'lex_ms': round(lex_ms, 2), 'parse_ms': round(parse_ms, 2)}
+
+    execute = _executor(engine)
+    if case.execute:
+        # Одно и то же AST исполняется повторно: исполнители не изменяют его
+        program = parse()
+        output = execute(program)
+        result['execute_ms'] = round(_best_ms(lambda: execute(program), repeat, max(0, warmup - 1)), 2)
+        result['output_sha1'] = hashlib.sha1(output.encode('utf-8', 'surrogatepass')).hexdigest()[:12]
+        del program
+
+    # Пиковая память измеряется отдельно: tracemalloc заметно замедляет исполнение
+    tracemalloc.start()
+    try:
+        program = parse()
+        if case.execute:
+            execute(program)
+        result['peak_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+# Сравнение с базовыми результатами
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Описания регрессий: метрика хуже базовой более чем на threshold и больше порога шума"""
+    regressions = []
+    for case, engines in results['cases'].items():
+        for engine, current in engines.items():
+            previous = baseline.get('cases', {}).get(case, {}).get(engine)
+            if previous is None:
+                continue
+            if 'output_sha1' in previous and previous['output_sha1'] != current.get('output_sha1'):
+                regressions.append(f"{case}/{engine}: вывод программы изменился")
+            for metric in METRICS:
+                if metric not in previous or metric not in current:
+                    continue
+                old, new = previous[metric], current[metric]
+                noise = _NOISE_KB if metric == 'peak_kb' else _NOISE_MS
+                if new > old * (1 + threshold) and new - old > noise:
+                    percent = (new / old - 1) * 100 if old else 100.0
+                    regressions.append(f"{case}/{engine}: {metric} {old} -> {new} (+{percent:.0f}%)")
+    return regressions
+
+
+def print_table(results: Dict, baseline: Optional[Dict]):
+    print(f"{'случай':<18} {'исполнитель':<11} {'лексер мс':>10} {'разбор мс':>10} {'исполн. мс':>11} "
+          f"{'к ast':>6} {'память КБ':>10}")
+    for case, engines in results['cases'].items():
+        reference = engines.get('ast', {}).get('execute_ms')
+        for engine, result in engines.items():
+            execute_ms = result.get('execute_ms')
+            relative = f"{execute_ms / reference:.2f}" if execute_ms is not None and reference else '-'
+            execute_text = f"{execute_ms:.1f}" if execute_ms is not None else '-'
+            previous = (baseline or {}).get('cases', {}).get(case, {}).get(engine, {}).get('execute_ms')
+            change = f"  ({(execute_ms / previous - 1) * 100:+.0f}%)" if execute_ms is not None and previous else ''
+            print(f"{case:<18} {engine:<11} {result['lex_ms']:10.2f} {result['parse_ms']:10.2f} "
+                  f"{execute_text:>11} {relative:>6} {result['peak_kb']:10d}{change}")
+
+
+def _check_outputs(results: Dict) -> List[str]:
+    """Все исполнители должны напечатать одно и то же"""
+    problems = []
+    for case, engines in results['cases'].items():
+        digests = {engine: result['output_sha1'] for engine, result in engines.items() if 'output_sha1' in result}
+        if len(set(digests.values())) > 1:
+            problems.append(f"{case}: вывод исполнителей различается {digests}")
+    return problems
+
+
+def write_json(path: str, data: Dict):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Замеры производительности интерпретатора Expr")
+    arg_parser.add_argument('--engines', default=','.join(DEFAULT_ENGINES),
+                            help="исполнители через запятую (tree очень медленный и по умолчанию не входит)")
+    arg_parser.add_argument('--frontend', choices=Driver.FRONTENDS, default='pratt', help="способ построения AST")
+    arg_parser.add_argument('--cases', default=None, help="имена случаев через запятую (по умолчанию все)")
+    arg_parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="число замеров каждого этапа")
+    arg_parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help="число прогревочных запусков")
+    arg_parser.add_argument('--baseline', default=BASELINE_PATH, help="файл базовых результатов")
+    arg_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help="допустимое относительное ухудшение метрики")
+    arg_parser.add_argument('--output', default=None, help="записать результаты в JSON-файл")
+    arg_parser.add_argument('--save-baseline', action='store_true', help="записать результаты как базовые")
+    args = arg_parser.parse_args()
+
+    engines = [engine for engine in args.engines.split(',') if engine]
+    for engine in engines:
+        if engine not in Driver.ENGINES:
+            arg_parser.error(f"неизвестный исполнитель '{engine}'")
+    cases = load_cases()
+    if args.cases:
+        selected = set(args.cases.split(','))
+        cases = [case for case in cases if case.name in selected]
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'frontend': args.frontend,
+        'repeat': args.repeat,
+        'cases': {},
+    }
+    for case in cases:
+        results['cases'][case.name] = {}
+        # Для случаев только с разбором этапы не зависят от исполнителя AST
+        case_engines = engines if case.execute else sorted({'tree' if engine == 'tree' else 'ast' for engine in engines})
+        for engine in case_engines:
+            results['cases'][case.name][engine] = measure(case, engine, args.frontend, args.repeat, args.warmup)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(results, baseline)
+    if args.output:
+        write_json(args.output, results)
+
+    problems = _check_outputs(results)
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"Базовые результаты записаны в {args.baseline}")
+    elif baseline is not None:
+        problems.extend(compare(results, baseline, args.threshold))
+    for problem in problems:
+        print(f"РЕГРЕССИЯ {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Компилятор AST в плоский байт-код для VirtualMachine
+Условные операторы и циклы превращаются в переходы, значения литералов
+хранятся в пуле констант, переменные адресуются номерами слотов
+"""
+
+from typing import Dict, List, Tuple
+
+from Runtime import Value, TRUE, FALSE
+from TypeChecker import TypeChecker
+import Ast
+
+
+# Коды инструкций
+LOAD_CONST = 0        # arg: индекс в пуле констант
+LOAD_VAR = 1          # arg: слот переменной
+LOAD_VAR_CHECKED = 2  # arg: слот, с проверкой объявления
+DECLARE = 3           # arg: индекс в таблице объявлений (слот, тип)
+DECLARE_DEFAULT = 4   # arg: индекс в таблице объявлений (слот, тип)
+CHECK_DEFINED = 5     # arg: слот переменной
+STORE = 6             # arg: слот переменной
+ADD = 7
+SUB = 8
+MUL = 9
+DIV = 10
+MOD = 11
+LT = 12
+LE = 13
+GT = 14
+GE = 15
+EQ = 16
+NE = 17
+NOT = 18
+NEG = 19
+POS = 20
+JUMP_IF_FALSE = 21    # arg: адрес перехода
+JUMP_IF_TRUE = 22     # arg: адрес перехода
+JUMP = 23             # arg: адрес перехода
+PRINT = 24
+LOOP = 25             # arg: адрес начала цикла; переход с расходом шага бюджета
+
+OPCODE_NAMES = {
+    value: name for name, value in globals().items()
+    if name.isupper() and isinstance(value, int) and not name.startswith('_')
+}
+
+BINARY_OPCODES = {
+    Ast.OP_MUL: MUL, Ast.OP_DIV: DIV, Ast.OP_MOD: MOD, Ast.OP_ADD: ADD, Ast.OP_SUB: SUB,
+    Ast.OP_LT: LT, Ast.OP_LE: LE, Ast.OP_GT: GT, Ast.OP_GE: GE, Ast.OP_EQ: EQ, Ast.OP_NE: NE,
+}
+
+UNARY_OPCODES = {Ast.OP_NOT: NOT, Ast.OP_NEG: NEG, Ast.OP_POS: POS}
+
+Instruction = Tuple[int, int]
+
+
+class Code:
+    """Скомпилированная программа: инструкции и пулы"""
+
+    def __init__(self, instructions: List[Instruction], constants: List[Value],
+                 names: List[str], declarations: List[Tuple[int, str]]):
+        self.instructions = instructions
+        self.constants = constants
+        self.names = names
+        self.declarations = declarations
+
+    def disassemble(self) -> str:
+        lines = []
+        for address, (opcode, arg) in enumerate(self.instructions):
+            line = f"{address:5d}  {OPCODE_NAMES[opcode]:<14}"
+            if opcode == LOAD_CONST:
+                line += f"{arg} ({self.constants[arg]!r})"
+            elif opcode in (LOAD_VAR, LOAD_VAR_CHECKED, CHECK_DEFINED, STORE):
+                line += f"{arg} ({self.names[arg]})"
+            elif opcode in (DECLARE, DECLARE_DEFAULT):
+                slot, type_name = self.declarations[arg]
+                line += f"{arg} ({type_name} {self.names[slot]})"
+            elif opcode in (JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, LOOP):
+                line += f"{arg}"
+            lines.append(line.rstrip())
+        return '\n'.join(lines)
+
+
+class BytecodeCompiler:
+    def __init__(self):
+        self.instructions: List[Instruction] = []
+        self.constants: List[Value] = []
+        self.declarations: List[Tuple[int, str]] = []
+        self._constant_index: Dict[Tuple[str, str], int] = {}
+        self._declaration_index: Dict[Tuple[int, str], int] = {}
+        self._statements = {
+            Ast.Declaration: self._compile_declaration,
+            Ast.Assignment: self._compile_assignment,
+            Ast.If: self._compile_if,
+            Ast.While: self._compile_while,
+            Ast.Print: self._compile_print,
+            Ast.Block: self._compile_block,
+        }
+        self._expressions = {
+            Ast.Binary: self._compile_binary,
+            Ast.Unary: self._compile_unary,
+            Ast.Var: self._compile_var,
+            Ast.Literal: self._compile_literal,
+        }
+
+    def compile(self, program: Ast.Program) -> Code:
+        names = TypeChecker().check(program)
+        for statement in program.body:
+            self._compile_statement(statement)
+        return Code(self.instructions, self.constants, names, self.declarations)
+
+    # Пулы и генерация инструкций
+
+    def _emit(self, opcode: int, arg: int = 0) -> int:
+        self.instructions.append((opcode, arg))
+        return len(self.instructions) - 1
+
+    def _patch(self, address: int, target: int):
+        opcode, _ = self.instructions[address]
+        self.instructions[address] = (opcode, target)
+
+    def _patch_all(self, addresses: List[int], target: int):
+        for address in addresses:
+            self._patch(address, target)
+
+    def _constant(self, value: Value) -> int:
+        # repr различает 0.0 и -0.0, которые равны как числа
+        key = (value.type_name, repr(value.value))
+        index = self._constant_index.get(key)
+        if index is None:
+            index = self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return index
+
+    def _declaration(self, slot: int, type_name: str) -> int:
+        key = (slot, type_name)
+        index = self._declaration_index.get(key)
+        if index is None:
+            index = self._declaration_index[key] = len(self.declarations)
+            self.declarations.append(key)
+        return index
+
+    # Операторы
+
+    def _compile_statement(self, node: Ast.Node):
+        self._statements[node.__class__](node)
+
+    def _compile_declaration(self, node: Ast.Declaration):
+        declaration = self._declaration(node.slot, node.type_name)
+        if node.expr is None:
+            self._emit(DECLARE_DEFAULT, declaration)
+            return
+        self._compile_expression(node.expr)
+        self._emit(DECLARE, declaration)
+
+    def _compile_assignment(self, node: Ast.Assignment):
+        # Необъявленная переменная обнаруживается до вычисления выражения
+        if node.guarded:
+            self._emit(CHECK_DEFINED, node.slot)
+        self._compile_expression(node.expr)
+        self._emit(STORE, node.slot)
+
+    def _compile_if(self, node: Ast.If):
+        jumps_to_else = self._compile_jump(node.cond, False)
+        self._compile_statement(node.then)
+        if node.orelse is None:
+            self._patch_all(jumps_to_else, len(self.instructions))
+            return
+        jump_to_end = self._emit(JUMP)
+        self._patch_all(jumps_to_else, len(self.instructions))
+        self._compile_statement(node.orelse)
+        self._patch(jump_to_end, len(self.instructions))
+
+    def _compile_while(self, node: Ast.While):
+        start = len(self.instructions)
+        jumps_to_end = self._compile_jump(node.cond, False)
+        self._compile_statement(node.body)
+        self._emit(LOOP, start)
+        self._patch_all(jumps_to_end, len(self.instructions))
+
+    def _compile_print(self, node: Ast.Print):
+        self._compile_expression(node.expr)
+        self._emit(PRINT)
+
+    def _compile_block(self, node: Ast.Block):
+        for statement in node.body:
+            self._compile_statement(statement)
+
+    # Выражения
+
+    def _compile_expression(self, node: Ast.Node):
+        self._expressions[node.__class__](node)
+
+    def _compile_jump(self, node: Ast.Node, when: bool) -> List[int]:
+        """Переход, если истинность условия равна when; возвращает адреса для исправления.
+        &&, || и ! становятся цепочками переходов без промежуточных значений"""
+        if isinstance(node, Ast.Binary) and (node.op == Ast.OP_AND or node.op == Ast.OP_OR):
+            # Для && ложный левый операнд решает исход сразу, для || - истинный
+            decisive = node.op == Ast.OP_OR
+            if when == decisive:
+                return self._compile_jump(node.left, when) + self._compile_jump(node.right, when)
+            skip = self._compile_jump(node.left, decisive)
+            jumps = self._compile_jump(node.right, when)
+            self._patch_all(skip, len(self.instructions))
+            return jumps
+        if isinstance(node, Ast.Unary) and node.op == Ast.OP_NOT:
+            return self._compile_jump(node.operand, not when)
+        self._compile_expression(node)
+        return [self._emit(JUMP_IF_TRUE if when else JUMP_IF_FALSE)]
+
+    def _compile_binary(self, node: Ast.Binary):
+        if node.op == Ast.OP_AND or node.op == Ast.OP_OR:
+            # Правый операнд вычисляется только при необходимости
+            jumps_to_false = self._compile_jump(node, False)
+            self._emit(LOAD_CONST, self._constant(TRUE))
+            jump_to_end = self._emit(JUMP)
+            self._patch_all(jumps_to_false, len(self.instructions))
+            self._emit(LOAD_CONST, self._constant(FALSE))
+            self._patch(jump_to_end, len(self.instructions))
+            return
+        self._compile_expression(node.left)
+        self._compile_expression(node.right)
+        self._emit(BINARY_OPCODES[node.op])
+
+    def _compile_unary(self, node: Ast.Unary):
+        self._compile_expression(node.operand)
+        self._emit(UNARY_OPCODES[node.op])
+
+    def _compile_var(self, node: Ast.Var):
+        self._emit(LOAD_VAR_CHECKED if node.guarded else LOAD_VAR, node.slot)
+
+    def _compile_literal(self, node: Ast.Literal):
+        self._emit(LOAD_CONST, self._constant(node.value))
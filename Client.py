@@ -0,0 +1,71 @@
+"""
+Клиент сервера исполнения (модуль Daemon)
+Исполняет программу из файла так же, как Driver.py, но без запуска
+интерпретатора и загрузки ANTLR при каждом вызове:
+    python Client.py [--socket путь] [--engine ...] input.txt
+"""
+
+import argparse
+import json
+import socket
+import sys
+
+from Daemon import REQUEST, OUTPUT, DONE, default_socket_path, send_frame, read_frame
+
+
+def run_remote(source: str, socket_path: str, request: dict, output=None) -> str:
+    """Отправляет программу серверу и копирует её вывод в output; возвращает сообщение об ошибке"""
+    output = output if output is not None else sys.stdout.buffer
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        send_frame(connection.sendall, REQUEST, json.dumps(dict(request, source=source)).encode('utf-8'))
+        with connection.makefile('rb') as stream:
+            while True:
+                frame = read_frame(stream)
+                if frame is None:
+                    raise ConnectionError("сервер закрыл соединение")
+                kind, payload = frame
+                if kind == OUTPUT:
+                    output.write(payload)
+                    output.flush()
+                elif kind == DONE:
+                    return json.loads(payload.decode('utf-8'))['error']
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Клиент сервера исполнения программ Expr")
+    arg_parser.add_argument('input_file', help="входной файл с программой")
+    arg_parser.add_argument('--socket', default=None, help="путь к Unix-сокету сервера")
+    arg_parser.add_argument('--engine', default='ast', help="исполнитель, как у Driver.py")
+    arg_parser.add_argument('--lexer', default='fast', help="лексер, как у Driver.py")
+    arg_parser.add_argument('--frontend', default='pratt', help="построение AST, как у Driver.py")
+    arg_parser.add_argument('--time-limit', type=float, default=None, help="ограничение времени исполнения, с")
+    arg_parser.add_argument('--memory-limit', type=int, default=None, help="ограничение памяти, МБ")
+    args = arg_parser.parse_args()
+
+    try:
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            source = f.read()
+    except FileNotFoundError:
+        print(f"Ошибка: Файл '{args.input_file}' не найден")
+        return
+    except Exception as e:
+        print(f"Ошибка: {e}")
+        return
+
+    request = {
+        'engine': args.engine,
+        'lexer': args.lexer,
+        'frontend': args.frontend,
+        'time_limit': args.time_limit,
+        'memory_limit': args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+    }
+    try:
+        run_remote(source, args.socket or default_socket_path(), request)
+    except OSError as e:
+        print(f"Ошибка: сервер исполнения недоступен: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
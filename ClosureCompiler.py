@@ -0,0 +1,390 @@
+"""
+Исполнитель, компилирующий AST во вложенные замыкания Python
+Каждый узел один раз превращается в вызываемый объект с заранее выбранной операцией,
+после чего программа исполняется вызовом корневого замыкания.
+Выражения со статическим типом (модуль TypeChecker) вычисляются над обычными
+значениями Python без создания Value; в Value упаковываются только значения
+динамических переменных
+"""
+
+import operator
+from typing import Any, Callable, Iterable, List, Optional
+
+from OutputSink import OutputSink
+from Rope import concat as rope_concat, repeat as rope_repeat
+from Runtime import Runtime, Value, ExecutionBudget, InterpreterError, UndefinedVariableError, TypeMismatchError
+from TypeChecker import TypeChecker
+import Ast
+
+
+Statement = Callable[[], None]
+# Возвращает значение Python, если тип выражения известен статически, иначе Value
+Expression = Callable[[], Any]
+
+_NUMERIC = ('int', 'float')
+
+_ARITHMETIC = {
+    Ast.OP_ADD: operator.add,
+    Ast.OP_SUB: operator.sub,
+    Ast.OP_MUL: operator.mul,
+}
+
+_COMPARISON = {
+    Ast.OP_LT: operator.lt,
+    Ast.OP_LE: operator.le,
+    Ast.OP_GT: operator.gt,
+    Ast.OP_GE: operator.ge,
+    Ast.OP_EQ: operator.eq,
+    Ast.OP_NE: operator.ne,
+}
+
+_DEFAULT_VALUES = {'int': 0, 'float': 0.0, 'string': ''}
+
+
+def _divide(left, right) -> float:
+    if right == 0:
+        raise InterpreterError("Деление на ноль")
+    return float(left) / float(right)
+
+
+def _modulo(left: int, right: int) -> int:
+    if right == 0:
+        raise InterpreterError("Деление на ноль при вычислении остатка")
+    return left % right
+
+
+def _converter(from_type: str, to_type: str) -> Optional[Callable[[Any], Any]]:
+    """Функция приведения значения Python или None, если приведение не требуется"""
+    if from_type == to_type:
+        return None
+    return float if to_type == 'float' else str
+
+
+class ClosureInterpreter(Runtime):
+    def __init__(self, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None):
+        super().__init__(sink, budget)
+        # Слоты статически типизированных переменных хранят значения Python, остальные - Value
+        self.slots: List[Any] = []
+        self._types: List[Optional[str]] = []
+        self._statements = {
+            Ast.Declaration: self._compile_declaration,
+            Ast.Assignment: self._compile_assignment,
+            Ast.If: self._compile_if,
+            Ast.While: self._compile_while,
+            Ast.Print: self._compile_print,
+            Ast.Block: self._compile_block,
+        }
+        self._expressions = {
+            Ast.Binary: self._compile_binary,
+            Ast.Unary: self._compile_unary,
+            Ast.Var: self._compile_var,
+            Ast.Literal: self._compile_literal,
+        }
+        self._binary = [
+            self._multiply, self._divide, self._modulo, self._add, self._subtract,
+            self._compare_lt, self._compare_le, self._compare_gt, self._compare_ge,
+            self._compare_eq, self._compare_ne,
+        ]
+        self._unary = [self._logical_not, self._unary_minus, self._unary_plus]
+
+    def compile(self, program: Ast.Program) -> Statement:
+        self.slots = [None] * len(TypeChecker().check(program))
+        self._types = program.types
+        return self._compile_sequence(program.body)
+
+    def execute(self, program: Ast.Program):
+        function = self.compile(program)
+        self.budget.start()
+        self._ticks = 0
+        try:
+            function()
+        finally:
+            self.sink.flush()
+        return None
+
+    def _stored_values(self) -> Iterable[Any]:
+        return self.slots
+
+    def _compile_statement(self, node: Ast.Node) -> Statement:
+        return self._statements[node.__class__](node)
+
+    def _compile_expression(self, node: Ast.Node) -> Expression:
+        return self._expressions[node.__class__](node)
+
+    def _compile_boxed(self, node: Ast.Node) -> Callable[[], Value]:
+        """Выражение, всегда возвращающее Value"""
+        expr = self._compile_expression(node)
+        type_name = node.type_name
+        if type_name is None:
+            return expr
+        return lambda: Value(expr(), type_name)
+
+    def _compile_condition(self, node: Ast.Node) -> Callable[[], Any]:
+        """Выражение, истинность результата которого совпадает с истинностью узла.
+        Для &&, || и ! и сравнений статических типов промежуточное значение не создаётся"""
+        if isinstance(node, Ast.Binary):
+            if node.op == Ast.OP_AND or node.op == Ast.OP_OR:
+                left = self._compile_condition(node.left)
+                right = self._compile_condition(node.right)
+                if node.op == Ast.OP_AND:
+                    return lambda: left() and right()
+                return lambda: left() or right()
+            if node.op in _COMPARISON and self._raw_binary(node.op, node.left.type_name, node.right.type_name):
+                comparison = _COMPARISON[node.op]
+                left = self._compile_expression(node.left)
+                right = self._compile_expression(node.right)
+                return lambda: comparison(left(), right())
+        elif isinstance(node, Ast.Unary) and node.op == Ast.OP_NOT:
+            operand = self._compile_condition(node.operand)
+            return lambda: not operand()
+
+        # Истинность int, float и string совпадает с истинностью значения Python
+        expr = self._compile_expression(node)
+        if node.type_name is not None:
+            return expr
+        return lambda: expr().is_truthy()
+
+    def _compile_store(self, name: str, slot: int, type_name: Optional[str], expr_node: Ast.Node) -> Expression:
+        """Выражение, возвращающее значение для записи в слот, с проверкой и приведением типа.
+        type_name - тип переменной; None - тип берётся из текущего значения слота"""
+        slots = self.slots
+        slot_type = self._types[slot]
+        value_type = expr_node.type_name
+
+        if value_type is not None and type_name is not None:
+            # Совместимость уже проверена статически, приведение выбирается один раз
+            expr = self._compile_expression(expr_node)
+            convert = _converter(value_type, type_name)
+            if slot_type is None:
+                if convert is None:
+                    return lambda: Value(expr(), type_name)
+                return lambda: Value(convert(expr()), type_name)
+            if convert is None:
+                return expr
+            return lambda: convert(expr())
+
+        expr = self._compile_boxed(expr_node)
+        is_compatible_type = self._is_compatible_type
+        convert_type = self._convert_type
+
+        def checked() -> Value:
+            value = expr()
+            target_type = type_name if type_name is not None else slots[slot].type_name
+            if value.type_name != target_type:
+                if not is_compatible_type(value.type_name, target_type):
+                    raise TypeMismatchError(
+                        f"Невозможно присвоить значение типа {value.type_name} переменной типа {target_type} '{name}'"
+                    )
+                value = convert_type(value, target_type)
+            return value
+
+        if slot_type is None:
+            return checked
+        return lambda: checked().value
+
+    # Операторы
+
+    def _compile_sequence(self, nodes) -> Statement:
+        statements = tuple(self._compile_statement(node) for node in nodes)
+        if len(statements) == 1:
+            return statements[0]
+
+        def sequence():
+            for statement in statements:
+                statement()
+        return sequence
+
+    def _compile_declaration(self, node: Ast.Declaration) -> Statement:
+        slots = self.slots
+        slot = node.slot
+        slot_type = self._types[slot]
+        type_name = node.type_name
+
+        if node.expr is None:
+            if slot_type is None:
+                get_default_value = self._get_default_value
+
+                def declare_default():
+                    slots[slot] = get_default_value(type_name)
+                return declare_default
+
+            default = _DEFAULT_VALUES[type_name]
+
+            def declare_default_raw():
+                slots[slot] = default
+            return declare_default_raw
+
+        expr = self._compile_store(node.name, slot, type_name, node.expr)
+
+        def declare():
+            slots[slot] = expr()
+        return declare
+
+    def _compile_assignment(self, node: Ast.Assignment) -> Statement:
+        slots = self.slots
+        slot = node.slot
+        expr = self._compile_store(node.name, slot, self._types[slot], node.expr)
+
+        if not node.guarded:
+            def assign():
+                slots[slot] = expr()
+            return assign
+
+        name = node.name
+
+        def assign_guarded():
+            if slots[slot] is None:
+                raise UndefinedVariableError(f"Переменная '{name}' не объявлена")
+            slots[slot] = expr()
+        return assign_guarded
+
+    def _compile_if(self, node: Ast.If) -> Statement:
+        cond = self._compile_condition(node.cond)
+        then = self._compile_statement(node.then)
+
+        if node.orelse is None:
+            def if_then():
+                if cond():
+                    then()
+            return if_then
+
+        orelse = self._compile_statement(node.orelse)
+
+        def if_then_else():
+            if cond():
+                then()
+            else:
+                orelse()
+        return if_then_else
+
+    def _compile_while(self, node: Ast.While) -> Statement:
+        cond = self._compile_condition(node.cond)
+        body = self._compile_statement(node.body)
+        interpreter = self
+        checkpoint = self.budget.checkpoint
+
+        def while_loop():
+            while cond():
+                body()
+                interpreter._ticks = (interpreter._ticks or checkpoint()) - 1
+        return while_loop
+
+    def _compile_print(self, node: Ast.Print) -> Statement:
+        expr = self._compile_expression(node.expr)
+        write = self.sink.write
+
+        if node.expr.type_name is None:
+            print_value = self._print_value
+
+            def print_boxed():
+                print_value(expr().value)
+            return print_boxed
+
+        if node.expr.type_name == 'string':
+            # Строка может быть Rope: её части выводятся без сборки
+            print_value = self._print_value
+
+            def print_text():
+                print_value(expr())
+            return print_text
+
+        def print_raw():
+            write(str(expr()))
+        return print_raw
+
+    def _compile_block(self, node: Ast.Block) -> Statement:
+        if not node.body:
+            return lambda: None
+        return self._compile_sequence(node.body)
+
+    # Выражения
+
+    def _compile_binary(self, node: Ast.Binary) -> Expression:
+        if node.op == Ast.OP_AND or node.op == Ast.OP_OR:
+            # Правый операнд вычисляется только при необходимости
+            condition = self._compile_condition(node)
+            return lambda: 1 if condition() else 0
+
+        operation = self._raw_binary(node.op, node.left.type_name, node.right.type_name)
+        if operation is None:
+            # Тип одного из операндов известен только при исполнении: общий метод над Value
+            left = self._compile_boxed(node.left)
+            right = self._compile_boxed(node.right)
+            generic = self._binary[node.op]
+            if node.type_name is None:
+                return lambda: generic(left(), right())
+            return lambda: generic(left(), right()).value
+
+        left = self._compile_expression(node.left)
+        right = self._compile_expression(node.right)
+        return lambda: operation(left(), right())
+
+    def _raw_binary(self, op: int, left_type: Optional[str], right_type: Optional[str]) -> Optional[Callable[[Any, Any], Any]]:
+        """Операция над значениями Python для статических типов операндов или None"""
+        if left_type is None or right_type is None:
+            return None
+        numeric = left_type in _NUMERIC and right_type in _NUMERIC
+
+        if op in _ARITHMETIC and numeric:
+            return _ARITHMETIC[op]
+        # С ограничением памяти длина строки-результата проверяется до её создания
+        unchecked = self.budget.max_memory is None
+        if op == Ast.OP_ADD and 'string' in (left_type, right_type):
+            concat = rope_concat if unchecked else self._concat
+            if left_type != 'string':
+                return lambda left, right: concat(str(left), right)
+            if right_type != 'string':
+                return lambda left, right: concat(left, str(right))
+            return concat
+        if op == Ast.OP_SUB and left_type == right_type == 'string':
+            return lambda left, right: str(left).replace(str(right), '', 1)
+        if op == Ast.OP_MUL and (left_type, right_type) in (('string', 'int'), ('int', 'string')):
+            repeat = rope_repeat if unchecked else self._repeat
+            if left_type == 'string':
+                return repeat
+            return lambda left, right: repeat(right, left)
+        if op == Ast.OP_DIV and numeric:
+            return _divide
+        if op == Ast.OP_MOD and left_type == right_type == 'int':
+            return _modulo
+        if op in _COMPARISON:
+            if op in (Ast.OP_EQ, Ast.OP_NE) or numeric or left_type == right_type == 'string':
+                comparison = _COMPARISON[op]
+                return lambda left, right: 1 if comparison(left, right) else 0
+        return None
+
+    def _compile_unary(self, node: Ast.Unary) -> Expression:
+        operand_type = node.operand.type_name
+        if operand_type is None:
+            operand = self._compile_boxed(node.operand)
+            generic = self._unary[node.op]
+            if node.type_name is None:
+                return lambda: generic(operand())
+            return lambda: generic(operand()).value
+
+        operand = self._compile_expression(node.operand)
+        if node.op == Ast.OP_NOT:
+            return lambda: 0 if operand() else 1
+        if node.op == Ast.OP_NEG:
+            return lambda: -operand()
+        return operand
+
+    def _compile_var(self, node: Ast.Var) -> Expression:
+        slots = self.slots
+        slot = node.slot
+
+        if not node.guarded:
+            return lambda: slots[slot]
+
+        name = node.name
+
+        def load_guarded():
+            value = slots[slot]
+            if value is None:
+                raise UndefinedVariableError(f"Переменная '{name}' не объявлена")
+            return value
+        return load_guarded
+
+    def _compile_literal(self, node: Ast.Literal) -> Expression:
+        value = node.value.value if node.type_name is not None else node.value
+        return lambda: value
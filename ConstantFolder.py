@@ -0,0 +1,168 @@
+"""
+Свёртка константных подвыражений AST до исполнения
+Операции над литералами вычисляются общими методами Runtime, поэтому результат
+совпадает с вычислением во время исполнения. Операция, завершающаяся ошибкой
+(например, деление на ноль), не сворачивается и сообщает об ошибке при исполнении.
+Условия if и while, известные заранее, убирают недостижимую ветвь
+"""
+
+from typing import List, Optional
+
+from Runtime import Runtime, Value, TRUE, FALSE
+import Ast
+
+
+# Свёрнутая строка длиннее этого предела остаётся вычислением,
+# чтобы повторение строки не раздувало программу
+MAX_FOLDED_STRING = 4096
+# Свёрнутое целое больше этого предела (в битах) тоже остаётся вычислением:
+# очень большое целое нельзя перевести в текст, а ошибка такого перевода
+# должна произойти при исполнении, а не при разборе
+MAX_FOLDED_INT_BITS = 4096
+
+
+def _declares(node: Ast.Node) -> bool:
+    """Содержит ли оператор объявление переменной"""
+    if isinstance(node, Ast.Declaration):
+        return True
+    if isinstance(node, Ast.If):
+        return _declares(node.then) or (node.orelse is not None and _declares(node.orelse))
+    if isinstance(node, Ast.While):
+        return _declares(node.body)
+    if isinstance(node, Ast.Block):
+        return any(_declares(statement) for statement in node.body)
+    return False
+
+
+class ConstantFolder:
+    def __init__(self):
+        semantics = Runtime()
+        # Таблицы индексируются кодами операторов из модуля Ast
+        self._binary = [
+            semantics._multiply, semantics._divide, semantics._modulo, semantics._add, semantics._subtract,
+            semantics._compare_lt, semantics._compare_le, semantics._compare_gt, semantics._compare_ge,
+            semantics._compare_eq, semantics._compare_ne,
+            semantics._logical_and, semantics._logical_or,
+        ]
+        self._unary = [semantics._logical_not, semantics._unary_minus, semantics._unary_plus]
+        self._literals = {}
+        self._statements = {
+            Ast.Declaration: self._fold_declaration,
+            Ast.Assignment: self._fold_assignment,
+            Ast.If: self._fold_if,
+            Ast.While: self._fold_while,
+            Ast.Print: self._fold_print,
+            Ast.Block: self._fold_block,
+        }
+
+    def fold(self, program: Ast.Program) -> Ast.Program:
+        """Сворачивает константы на месте; вызывается до разрешения слотов"""
+        program.body = self._fold_sequence(program.body)
+        return program
+
+    def fold_expression(self, node: Ast.Node) -> Ast.Node:
+        """Сворачивает выражение; узлы выражения изменяются на месте"""
+        return self._fold_expression(node)
+
+    def _literal(self, value: Value) -> Optional[Ast.Literal]:
+        if value.type_name == 'string':
+            if len(value.value) > MAX_FOLDED_STRING:
+                return None
+            # Литерал хранит собранную строку: он попадает в кэш и в код на Python
+            if value.value.__class__ is not str:
+                value = Value(str(value.value), 'string')
+        elif value.type_name == 'int' and value.value.bit_length() > MAX_FOLDED_INT_BITS:
+            return None
+        # Одинаковые свёрнутые значения разделяют один объект
+        key = (value.type_name, repr(value.value))
+        shared = self._literals.get(key)
+        if shared is None:
+            shared = self._literals[key] = value
+        return Ast.Literal(shared)
+
+    @staticmethod
+    def _repeats_too_long(left: Value, right: Value) -> bool:
+        # Длина повторения проверяется до вычисления, а не после
+        if left.type_name == 'string' and right.type_name == 'int':
+            return len(left.value) * right.value > MAX_FOLDED_STRING
+        if left.type_name == 'int' and right.type_name == 'string':
+            return left.value * len(right.value) > MAX_FOLDED_STRING
+        return False
+
+    # Операторы
+
+    def _fold_statement(self, node: Ast.Node) -> Ast.Node:
+        return self._statements[node.__class__](node)
+
+    def _fold_sequence(self, nodes: List[Ast.Node]) -> List[Ast.Node]:
+        return [self._fold_statement(node) for node in nodes]
+
+    def _fold_declaration(self, node: Ast.Declaration) -> Ast.Node:
+        if node.expr is not None:
+            node.expr = self._fold_expression(node.expr)
+        return node
+
+    def _fold_assignment(self, node: Ast.Assignment) -> Ast.Node:
+        node.expr = self._fold_expression(node.expr)
+        return node
+
+    def _fold_if(self, node: Ast.If) -> Ast.Node:
+        node.cond = self._fold_expression(node.cond)
+        node.then = self._fold_statement(node.then)
+        if node.orelse is not None:
+            node.orelse = self._fold_statement(node.orelse)
+
+        if not isinstance(node.cond, Ast.Literal):
+            return node
+        # Ветвь с объявлениями сохраняется: имя должно остаться известным Resolver
+        if node.cond.value.is_truthy():
+            if node.orelse is None or not _declares(node.orelse):
+                return node.then
+        elif not _declares(node.then):
+            return node.orelse if node.orelse is not None else Ast.Block([])
+        return node
+
+    def _fold_while(self, node: Ast.While) -> Ast.Node:
+        node.cond = self._fold_expression(node.cond)
+        node.body = self._fold_statement(node.body)
+        if isinstance(node.cond, Ast.Literal) and not node.cond.value.is_truthy() and not _declares(node.body):
+            return Ast.Block([])
+        return node
+
+    def _fold_print(self, node: Ast.Print) -> Ast.Node:
+        node.expr = self._fold_expression(node.expr)
+        return node
+
+    def _fold_block(self, node: Ast.Block) -> Ast.Node:
+        node.body = self._fold_sequence(node.body)
+        return node
+
+    # Выражения
+
+    def _fold_expression(self, node: Ast.Node) -> Ast.Node:
+        if isinstance(node, Ast.Binary):
+            node.left = self._fold_expression(node.left)
+            if (node.op == Ast.OP_AND or node.op == Ast.OP_OR) and isinstance(node.left, Ast.Literal):
+                # Левый операнд решает исход: правый не вычисляется вовсе
+                truthy = node.left.value.is_truthy()
+                if truthy == (node.op == Ast.OP_OR):
+                    return self._literal(TRUE if truthy else FALSE)
+            node.right = self._fold_expression(node.right)
+            if isinstance(node.left, Ast.Literal) and isinstance(node.right, Ast.Literal):
+                if node.op == Ast.OP_MUL and self._repeats_too_long(node.left.value, node.right.value):
+                    return node
+                try:
+                    value = self._binary[node.op](node.left.value, node.right.value)
+                except Exception:
+                    # Ошибка остаётся на время исполнения
+                    return node
+                return self._literal(value) or node
+        elif isinstance(node, Ast.Unary):
+            node.operand = self._fold_expression(node.operand)
+            if isinstance(node.operand, Ast.Literal):
+                try:
+                    value = self._unary[node.op](node.operand.value)
+                except Exception:
+                    return node
+                return self._literal(value) or node
+        return node
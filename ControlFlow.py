@@ -0,0 +1,330 @@
+"""
+Промежуточное представление для оптимизаций: базовые блоки и граф потока управления
+Блок - последовательность простых операторов AST (объявление, присваивание,
+вывод) и завершающий переход: безусловный, ветвление if или проверка условия
+цикла while. Граф строится из AST после TypeChecker, поэтому выражения уже
+отмечены слотами и типами. Ветвление помнит точку слияния ветвей, а заголовок
+цикла - тело и выход: после оптимизаций граф снова собирается в структурное
+AST, которое исполняет любой исполнитель AST
+"""
+
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+from TypeChecker import TypeChecker
+import Ast
+
+
+# Переходы
+
+class Goto:
+    __slots__ = ('target', 'back')
+
+    def __init__(self, target: 'BasicBlock', back: bool = False):
+        self.target = target
+        # Обратный переход из конца тела цикла в его заголовок
+        self.back = back
+
+
+class Branch:
+    """Ветвление оператора if; orelse совпадает с join, если ветви else нет"""
+
+    __slots__ = ('cond', 'then', 'orelse', 'join')
+
+    def __init__(self, cond: Ast.Node, then: 'BasicBlock', orelse: 'BasicBlock', join: 'BasicBlock'):
+        self.cond = cond
+        self.then = then
+        self.orelse = orelse
+        self.join = join
+
+
+class Loop:
+    """Проверка условия цикла while в заголовке; заголовок не содержит операторов"""
+
+    __slots__ = ('cond', 'body', 'exit')
+
+    def __init__(self, cond: Ast.Node, body: 'BasicBlock', exit: 'BasicBlock'):
+        self.cond = cond
+        self.body = body
+        self.exit = exit
+
+
+class BasicBlock:
+    __slots__ = ('index', 'instructions', 'terminator')
+
+    def __init__(self, index: int):
+        self.index = index
+        # Ast.Declaration, Ast.Assignment и Ast.Print
+        self.instructions: List[Ast.Node] = []
+        # None - конец программы
+        self.terminator: Optional[object] = None
+
+    @property
+    def label(self) -> str:
+        return f"b{self.index}"
+
+    def successors(self) -> List['BasicBlock']:
+        terminator = self.terminator
+        if isinstance(terminator, Goto):
+            return [terminator.target]
+        if isinstance(terminator, Branch):
+            return [terminator.then, terminator.orelse]
+        if isinstance(terminator, Loop):
+            return [terminator.body, terminator.exit]
+        return []
+
+
+class ControlFlowGraph:
+    def __init__(self, names: List[str], types: List[Optional[str]]):
+        self.blocks: List[BasicBlock] = []
+        self.entry = self.new_block()
+        # Имена и статические типы слотов, включая временные переменные оптимизаций
+        self.names = list(names)
+        self.types = list(types)
+        self._taken = set(names)
+
+    def new_block(self) -> BasicBlock:
+        block = BasicBlock(len(self.blocks))
+        self.blocks.append(block)
+        return block
+
+    def new_temporary(self, type_name: str) -> int:
+        """Слот временной переменной с именем, не совпадающим с именами программы"""
+        number = len(self.names)
+        while f"_t{number}" in self._taken:
+            number += 1
+        name = sys.intern(f"_t{number}")
+        self._taken.add(name)
+        self.names.append(name)
+        self.types.append(type_name)
+        return len(self.names) - 1
+
+    def order(self) -> List[BasicBlock]:
+        """Достижимые блоки в обратном порядке обхода в глубину: предшественник
+        (кроме обратных переходов) идёт раньше блока"""
+        visited = {self.entry}
+        postorder = []
+        stack = [(self.entry, iter(self.entry.successors()))]
+        while stack:
+            block, successors = stack[-1]
+            for successor in successors:
+                if successor not in visited:
+                    visited.add(successor)
+                    stack.append((successor, iter(successor.successors())))
+                    break
+            else:
+                stack.pop()
+                postorder.append(block)
+        postorder.reverse()
+        return postorder
+
+    def predecessors(self) -> Dict[BasicBlock, List[BasicBlock]]:
+        """Предшественники достижимых блоков"""
+        result: Dict[BasicBlock, List[BasicBlock]] = {}
+        for block in self.order():
+            result.setdefault(block, [])
+            for successor in block.successors():
+                result.setdefault(successor, []).append(block)
+        return result
+
+    def remove_unreachable(self):
+        reachable = set(self.order())
+        self.blocks = [block for block in self.blocks if block in reachable]
+
+    def loop_blocks(self, header: BasicBlock) -> List[BasicBlock]:
+        """Блоки тела цикла с заголовком header, включая вложенные циклы"""
+        # Тело покидается только через заголовок, поэтому обход от тела без
+        # заголовка не выходит за пределы цикла
+        body = header.terminator.body
+        seen = {header, body}
+        blocks = [body]
+        for block in blocks:
+            for successor in block.successors():
+                if successor not in seen:
+                    seen.add(successor)
+                    blocks.append(successor)
+        return blocks
+
+    # Сборка структурного AST
+
+    def to_program(self) -> Ast.Program:
+        program = Ast.Program(self._region(self.entry, None))
+        program.names = self.names
+        program.types = self.types
+        return program
+
+    def _region(self, block: Optional[BasicBlock], stop: Optional[BasicBlock]) -> List[Ast.Node]:
+        """Операторы от блока block до блока stop (не включая его)"""
+        statements: List[Ast.Node] = []
+        while block is not None and block is not stop:
+            statements.extend(block.instructions)
+            terminator = block.terminator
+            if isinstance(terminator, Goto):
+                block = terminator.target
+            elif isinstance(terminator, Branch):
+                then = self._region(terminator.then, terminator.join)
+                orelse = None
+                if terminator.orelse is not terminator.join:
+                    orelse = _statement(self._region(terminator.orelse, terminator.join))
+                statements.append(Ast.If(terminator.cond, _statement(then), orelse))
+                block = terminator.join
+            elif isinstance(terminator, Loop):
+                body = self._region(terminator.body, block)
+                statements.append(Ast.While(terminator.cond, _statement(body)))
+                block = terminator.exit
+            else:
+                block = None
+        return statements
+
+    # Текстовое представление
+
+    def dump(self) -> str:
+        lines = []
+        for block in self.order():
+            lines.append(f"{block.label}:")
+            for instruction in block.instructions:
+                lines.append(f"    {format_instruction(instruction)}")
+            lines.append(f"    {_format_terminator(block.terminator)}")
+        return '\n'.join(lines)
+
+
+def _statement(statements: List[Ast.Node]) -> Ast.Node:
+    return statements[0] if len(statements) == 1 else Ast.Block(statements)
+
+
+class GraphBuilder:
+    """Построение графа из AST; пустые блоки не удаляются, они ничего не стоят
+    после обратной сборки в AST"""
+
+    def __init__(self):
+        self._graph: Optional[ControlFlowGraph] = None
+        self._statements = {
+            Ast.Declaration: self._build_simple,
+            Ast.Assignment: self._build_simple,
+            Ast.Print: self._build_simple,
+            Ast.If: self._build_if,
+            Ast.While: self._build_while,
+            Ast.Block: self._build_block,
+        }
+
+    def build(self, program: Ast.Program) -> ControlFlowGraph:
+        names = TypeChecker().check(program)
+        self._graph = ControlFlowGraph(names, program.types)
+        self._build_sequence(program.body, self._graph.entry)
+        return self._graph
+
+    def _build_sequence(self, nodes: List[Ast.Node], block: BasicBlock) -> BasicBlock:
+        statements = self._statements
+        for node in nodes:
+            block = statements[node.__class__](node, block)
+        return block
+
+    def _build_simple(self, node: Ast.Node, block: BasicBlock) -> BasicBlock:
+        block.instructions.append(node)
+        return block
+
+    def _build_block(self, node: Ast.Block, block: BasicBlock) -> BasicBlock:
+        return self._build_sequence(node.body, block)
+
+    def _build_if(self, node: Ast.If, block: BasicBlock) -> BasicBlock:
+        graph = self._graph
+        then = graph.new_block()
+        join = graph.new_block()
+        orelse = graph.new_block() if node.orelse is not None else join
+        block.terminator = Branch(node.cond, then, orelse, join)
+        self._statements[node.then.__class__](node.then, then).terminator = Goto(join)
+        if node.orelse is not None:
+            self._statements[node.orelse.__class__](node.orelse, orelse).terminator = Goto(join)
+        return join
+
+    def _build_while(self, node: Ast.While, block: BasicBlock) -> BasicBlock:
+        graph = self._graph
+        header = graph.new_block()
+        body = graph.new_block()
+        exit = graph.new_block()
+        # Блок перед заголовком - единственный вход в цикл, в него выносятся инварианты
+        block.terminator = Goto(header)
+        header.terminator = Loop(node.cond, body, exit)
+        self._statements[node.body.__class__](node.body, body).terminator = Goto(header, back=True)
+        return exit
+
+
+def build_graph(program: Ast.Program) -> ControlFlowGraph:
+    return GraphBuilder().build(program)
+
+
+# Выражения
+
+def expression_key(node: Ast.Node) -> Tuple:
+    """Ключ структурного равенства выражений"""
+    if isinstance(node, Ast.Binary):
+        return (Ast.Binary, node.op, expression_key(node.left), expression_key(node.right))
+    if isinstance(node, Ast.Unary):
+        return (Ast.Unary, node.op, expression_key(node.operand))
+    if isinstance(node, Ast.Var):
+        return (Ast.Var, node.slot)
+    return (Ast.Literal, node.type_name, repr(node.value.value))
+
+
+def reads(node: Ast.Node, slots: Set[int]):
+    """Добавляет в slots переменные, которые читает выражение"""
+    if isinstance(node, Ast.Binary):
+        reads(node.left, slots)
+        reads(node.right, slots)
+    elif isinstance(node, Ast.Unary):
+        reads(node.operand, slots)
+    elif isinstance(node, Ast.Var):
+        slots.add(node.slot)
+
+
+def temporary(graph: ControlFlowGraph, slot: int) -> Ast.Var:
+    """Чтение временной переменной: она всегда объявлена до чтения"""
+    var = Ast.Var(graph.names[slot])
+    var.slot = slot
+    var.guarded = False
+    var.type_name = graph.types[slot]
+    return var
+
+
+def declare_temporary(graph: ControlFlowGraph, slot: int, expr: Ast.Node) -> Ast.Declaration:
+    declaration = Ast.Declaration(graph.names[slot], graph.types[slot], expr)
+    declaration.slot = slot
+    return declaration
+
+
+_ESCAPED = {'\\': '\\\\', "'": "\\'", '\n': '\\n', '\t': '\\t'}
+
+
+def format_expression(node: Ast.Node) -> str:
+    if isinstance(node, Ast.Binary):
+        return f"({format_expression(node.left)} {Ast.BINARY_SYMBOLS[node.op]} {format_expression(node.right)})"
+    if isinstance(node, Ast.Unary):
+        return f"{Ast.UNARY_SYMBOLS[node.op]}{format_expression(node.operand)}"
+    if isinstance(node, Ast.Var):
+        return node.name
+    value = node.value
+    if value.type_name == 'string':
+        return "'" + ''.join(_ESCAPED.get(char, char) for char in str(value.value)) + "'"
+    return repr(value.value)
+
+
+def format_instruction(node: Ast.Node) -> str:
+    if isinstance(node, Ast.Declaration):
+        if node.expr is None:
+            return f"{node.type_name} {node.name};"
+        return f"{node.type_name} {node.name} = {format_expression(node.expr)};"
+    if isinstance(node, Ast.Assignment):
+        return f"{node.name} = {format_expression(node.expr)};"
+    return f"print({format_expression(node.expr)});"
+
+
+def _format_terminator(terminator: Optional[object]) -> str:
+    if isinstance(terminator, Goto):
+        return f"goto {terminator.target.label}" + (" (back)" if terminator.back else "")
+    if isinstance(terminator, Branch):
+        return (f"if {format_expression(terminator.cond)} goto {terminator.then.label} "
+                f"else {terminator.orelse.label} (join {terminator.join.label})")
+    if isinstance(terminator, Loop):
+        return (f"while {format_expression(terminator.cond)} goto {terminator.body.label} "
+                f"else {terminator.exit.label}")
+    return "end"
@@ -0,0 +1,317 @@
+"""
+Долгоживущий процесс, исполняющий программы по запросам через Unix-сокет
+Модули интерпретатора, ANTLR и DFA парсера загружаются один раз при запуске.
+Запросы принимает пул заранее запущенных рабочих процессов; для каждой
+программы рабочий процесс порождает копию себя (fork), в которой действуют
+ограничения запроса: время (RLIMIT_CPU и предельное время ожидания) и память
+(RLIMIT_AS). Вывод программы передаётся клиенту по мере исполнения.
+
+Протокол: кадры вида <вид: 1 байт><длина: 4 байта, big-endian><данные>.
+Клиент отправляет кадр REQUEST с JSON {"source", "engine", "lexer", "frontend",
+"time_limit", "memory_limit"}; сервер отвечает кадрами OUTPUT с выводом
+программы (UTF-8) и завершающим кадром DONE с JSON {"error": сообщение или null}.
+В режиме --stdio те же кадры читаются из stdin и пишутся в stdout
+"""
+
+import argparse
+import json
+import os
+import resource
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+
+REQUEST = b'R'
+OUTPUT = b'O'
+DONE = b'D'
+
+_HEADER = struct.Struct('>cI')
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIME_LIMIT = 10.0
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+
+_READ_SIZE = 65536
+
+# Запас времени до принудительного завершения: программа, превысившая время,
+# сначала сама прерывается с ошибкой ExecutionBudget
+_KILL_GRACE = 0.5
+
+# Доля ограничения RLIMIT_AS для строк программы: остальное адресное пространство
+# занимают сам интерпретатор и не учитываемые промежуточные значения
+_STRING_MEMORY_SHARE = 0.5
+
+
+def default_socket_path() -> str:
+    path = os.environ.get('EXPR_DAEMON_SOCKET')
+    if path:
+        return path
+    directory = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(directory, f"expr-daemon-{os.getuid()}.sock")
+
+
+# Протокол
+
+def send_frame(write: Callable[[bytes], object], kind: bytes, payload: bytes):
+    write(_HEADER.pack(kind, len(payload)) + payload)
+
+
+def read_frame(stream: BinaryIO) -> Optional[Tuple[bytes, bytes]]:
+    """Очередной кадр (вид, данные) или None, если поток закрыт"""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    kind, length = _HEADER.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return kind, payload
+
+
+# Исполнение запроса
+
+class Limits:
+    def __init__(self, time_limit: float = DEFAULT_TIME_LIMIT, memory_limit: int = DEFAULT_MEMORY_LIMIT):
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+
+    def for_request(self, request: Dict) -> 'Limits':
+        """Ограничения запроса: клиент может только ужесточить ограничения сервера"""
+        time_limit = request.get('time_limit') or self.time_limit
+        memory_limit = request.get('memory_limit') or self.memory_limit
+        return Limits(min(float(time_limit), self.time_limit), min(int(memory_limit), self.memory_limit))
+
+
+class RequestHandler:
+    def __init__(self, limits: Limits, use_cache: bool = True, cache_dir: Optional[str] = None):
+        import Driver
+        from ProgramCache import ProgramCache
+
+        self._driver = Driver
+        self.limits = limits
+        self.cache = ProgramCache(cache_dir) if use_cache else None
+
+    def warm_up(self):
+        """Загружает модули всех исполнителей и обоих способов разбора и заполняет DFA парсера ANTLR"""
+        source = "int x = 1; if (x < 2 && !(x == 0)) { print(x + 1); } else { x = -x * 2 / 1 % 3; }"
+        for engine in self._driver.AST_ENGINES:
+            self._driver.engine_class(engine)
+        # Исполнитель tree не входит в AST_ENGINES
+        import Interpreter  # noqa: F401
+        for frontend in self._driver.FRONTENDS:
+            self._driver.build_ast(source, frontend=frontend)
+        self._driver.parse(source)
+
+    def serve(self, stream: BinaryIO, write: Callable[[bytes], object]):
+        """Обрабатывает запросы из потока до его закрытия"""
+        while True:
+            frame = read_frame(stream)
+            if frame is None or frame[0] != REQUEST:
+                return
+            self.handle(json.loads(frame[1].decode('utf-8')), write)
+
+    def handle(self, request: Dict, write: Callable[[bytes], object]):
+        options = {
+            'engine': request.get('engine', 'ast'),
+            'lexer': request.get('lexer', 'fast'),
+            'frontend': request.get('frontend', 'pratt'),
+        }
+        limits = self.limits.for_request(request)
+        source = request.get('source', '')
+        invalid = self._invalid_option(options)
+        if invalid is not None:
+            send_frame(write, OUTPUT, (invalid + '\n').encode('utf-8'))
+            send_frame(write, DONE, json.dumps({'error': invalid}).encode('utf-8'))
+            return
+
+        output_read, output_write = os.pipe()
+        result_read, result_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(output_read)
+            os.close(result_read)
+            self._run_child(source, options, limits, output_write, result_write)
+
+        os.close(output_write)
+        os.close(result_write)
+        error = None
+        try:
+            error = self._relay(pid, output_read, limits, write)
+        except OSError:
+            # Клиент отключился: исполнение больше никому не нужно
+            os.kill(pid, signal.SIGKILL)
+            error = "Ошибка: клиент отключился"
+        finally:
+            os.close(output_read)
+            _, status = os.waitpid(pid, 0)
+
+        with os.fdopen(result_read, 'rb') as f:
+            result = f.read()
+        if error is None:
+            if result:
+                error = json.loads(result.decode('utf-8'))['error']
+            else:
+                error = self._exit_error(status)
+                try:
+                    send_frame(write, OUTPUT, (error + '\n').encode('utf-8'))
+                except OSError:
+                    return
+        try:
+            send_frame(write, DONE, json.dumps({'error': error}).encode('utf-8'))
+        except OSError:
+            pass
+
+    def _invalid_option(self, options: Dict) -> Optional[str]:
+        driver = self._driver
+        for name, allowed in (('engine', driver.ENGINES), ('lexer', driver.LEXERS), ('frontend', driver.FRONTENDS)):
+            if options[name] not in allowed:
+                return f"Ошибка: недопустимое значение {name}: '{options[name]}'"
+        return None
+
+    def _run_child(self, source: str, options: Dict, limits: Limits, output_fd: int, result_fd: int):
+        """Исполняет программу в отдельном процессе и завершает его"""
+        try:
+            cpu_seconds = max(1, int(limits.time_limit + _KILL_GRACE + 0.999))
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+            resource.setrlimit(resource.RLIMIT_AS, (limits.memory_limit, limits.memory_limit))
+            sys.stdout = open(output_fd, 'w', encoding='utf-8', closefd=False)
+            # Предельное время и память строк проверяются и в самой программе: так она
+            # завершается понятной ошибкой, а не сигналом или MemoryError
+            from Runtime import ExecutionBudget
+            budget = ExecutionBudget(time_limit=limits.time_limit,
+                                     max_memory=int(limits.memory_limit * _STRING_MEMORY_SHARE))
+            error = self._driver.run_source(source, cache=self.cache, budget=budget, **options)
+            sys.stdout.flush()
+            os.write(result_fd, json.dumps({'error': error}).encode('utf-8'))
+        except BaseException:
+            os._exit(1)
+        os._exit(0)
+
+    @staticmethod
+    def _relay(pid: int, output_fd: int, limits: Limits, write: Callable[[bytes], object]) -> Optional[str]:
+        """Передаёт вывод программы клиенту; возвращает ошибку, если истекло время"""
+        deadline = time.monotonic() + limits.time_limit + _KILL_GRACE
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                os.kill(pid, signal.SIGKILL)
+                error = "Ошибка: превышено ограничение времени исполнения"
+                send_frame(write, OUTPUT, (error + '\n').encode('utf-8'))
+                return error
+            ready, _, _ = select.select([output_fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(output_fd, _READ_SIZE)
+            if not data:
+                return None
+            send_frame(write, OUTPUT, data)
+
+    @staticmethod
+    def _exit_error(status: int) -> str:
+        if os.WIFSIGNALED(status) and os.WTERMSIG(status) in (signal.SIGXCPU, signal.SIGKILL):
+            return "Ошибка: превышено ограничение времени исполнения"
+        return "Ошибка: процесс исполнения аварийно завершился"
+
+
+# Сервер
+
+class Daemon:
+    def __init__(self, socket_path: str, workers: int, handler: RequestHandler):
+        self.socket_path = socket_path
+        self.workers = workers
+        self.handler = handler
+        self._children: Dict[int, None] = {}
+        self._stopping = False
+
+    def serve_forever(self):
+        self.handler.warm_up()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        listener.listen(128)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        try:
+            while not self._stopping:
+                while len(self._children) < self.workers and not self._stopping:
+                    self._spawn(listener)
+                try:
+                    pid, _ = os.wait()
+                except ChildProcessError:
+                    continue
+                except InterruptedError:
+                    continue
+                self._children.pop(pid, None)
+        finally:
+            for pid in self._children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def _stop(self, signum, frame):
+        # Завершение рабочих процессов прерывает ожидание в serve_forever
+        self._stopping = True
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, listener: socket.socket):
+        pid = os.fork()
+        if pid:
+            self._children[pid] = None
+            return
+        # Рабочий процесс обслуживает соединения по одному
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            while True:
+                connection, _ = listener.accept()
+                with connection, connection.makefile('rb') as stream:
+                    self.handler.serve(stream, connection.sendall)
+        except BaseException:
+            os._exit(1)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Сервер исполнения программ Expr")
+    arg_parser.add_argument('--socket', default=None, help="путь к Unix-сокету (по умолчанию $EXPR_DAEMON_SOCKET)")
+    arg_parser.add_argument('--stdio', action='store_true', help="читать запросы из stdin и отвечать в stdout")
+    arg_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="число рабочих процессов")
+    arg_parser.add_argument('--time-limit', type=float, default=DEFAULT_TIME_LIMIT,
+                            help="наибольшее время исполнения программы, с")
+    arg_parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+                            help="наибольший объём памяти процесса исполнения, МБ")
+    arg_parser.add_argument('--no-cache', action='store_true', help="не использовать кэш скомпилированных программ")
+    args = arg_parser.parse_args()
+
+    handler = RequestHandler(Limits(args.time_limit, args.memory_limit * 1024 * 1024), not args.no_cache)
+    if args.stdio:
+        handler.warm_up()
+        output = sys.stdout.buffer
+
+        def write(data: bytes):
+            output.write(data)
+            output.flush()
+
+        handler.serve(sys.stdin.buffer, write)
+        return
+
+    Daemon(args.socket or default_socket_path(), args.workers, handler).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
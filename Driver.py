@@ -1,37 +1,332 @@
 import sys
-from antlr4 import *
-from ExprLexer import ExprLexer
-from ExprParser import ExprParser
-from Interpreter import Interpreter, InterpreterError
+import os
+import time
+import argparse
+import importlib
+from typing import List, Optional
 
+from Runtime import InterpreterError, ExecutionBudget
+from ProgramCache import ProgramCache
+from OutputSink import OutputSink, StreamSink, CountingSink, NullSink
 
-def main():
-    if len(sys.argv) != 2:
-        print("Использование: python Driver.py <входной_файл>")
-        return
-    
-    input_file = sys.argv[1]
-    
+
+# Исполнители, работающие с AST: модуль и класс. Модуль импортируется только
+# для выбранного исполнителя, чтобы не увеличивать время запуска остальными
+AST_ENGINES = {
+    'ast': ('AstInterpreter', 'AstInterpreter'),
+    'closure': ('ClosureCompiler', 'ClosureInterpreter'),
+    'vm': ('VirtualMachine', 'VirtualMachine'),
+    'python': ('Transpiler', 'TranspiledInterpreter'),
+}
+
+ENGINES = tuple(AST_ENGINES) + ('tree',)
+
+# Исполнители со встроенными кэшами бинарных операций (модуль InlineCache)
+INLINE_CACHE_ENGINES = ('tree',)
+
+# Уровни оптимизации -O (модуль Optimizer); 0 - без оптимизаций
+OPTIMIZATION_LEVELS = (0, 1, 2)
+
+# Лексеры для разбора ExprParser (модуль AntlrFrontend)
+LEXERS = ('fast', 'antlr')
+
+# Способы построения AST: собственный парсер или ExprParser с понижением дерева разбора
+FRONTENDS = ('pratt', 'antlr')
+
+# Приёмники вывода программы для --output
+OUTPUT_SINKS = {
+    'stdout': StreamSink,
+    'count': CountingSink,
+    'null': NullSink,
+}
+
+
+def parse(input_text: str, strict: bool = False, lexer: str = 'fast'):
+    # ANTLR импортируется только тогда, когда разбор действительно нужен
+    from AntlrFrontend import parse as antlr_parse
+    return antlr_parse(input_text, strict, lexer)
+
+
+def engine_class(engine: str):
+    """Класс исполнителя AST по имени из AST_ENGINES"""
+    module_name, class_name = AST_ENGINES[engine]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def build_ast(input_text: str, lexer: str = 'fast', frontend: str = 'pratt'):
+    from ConstantFolder import ConstantFolder
+    if frontend == 'pratt':
+        from PrattParser import PrattParser
+        program = PrattParser().parse(input_text)
+    else:
+        from AstBuilder import AstBuilder
+        # Дерево разбора живёт только внутри этой ветви и освобождается после понижения.
+        # Восстановленное после ошибок дерево неполно, поэтому понижается только корректная программа
+        program = AstBuilder().visit(parse(input_text, strict=True, lexer=lexer))
+    return ConstantFolder().fold(program)
+
+
+def load_ast(input_text: str, lexer: str = 'fast', frontend: str = 'pratt', cache: Optional[ProgramCache] = None,
+             opt_level: int = 0):
+    """AST программы из кэша; при промахе программа разбирается и записывается в кэш.
+    В кэше хранится неоптимизированное AST: оптимизации уровня opt_level применяются после загрузки"""
+    if cache is None:
+        program = build_ast(input_text, lexer, frontend)
+    else:
+        program = cache.load(input_text)
+        if program is None:
+            program = build_ast(input_text, lexer, frontend)
+            cache.store(input_text, program)
+    if opt_level:
+        from Optimizer import optimize
+        program = optimize(program, opt_level)
+    return program
+
+
+def create_interpreter(engine: str, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None):
+    if engine == 'tree':
+        from Interpreter import Interpreter
+        return Interpreter(sink, budget)
+    return engine_class(engine)(sink, budget)
+
+
+def run(input_text: str, engine: str = 'ast', lexer: str = 'fast', frontend: str = 'pratt',
+        cache: Optional[ProgramCache] = None, sink: Optional[OutputSink] = None,
+        budget: Optional[ExecutionBudget] = None, interpreter=None, opt_level: int = 0):
+    """Исполняет программу; interpreter - заранее созданный исполнитель (sink и budget тогда не используются)"""
+    if interpreter is None:
+        interpreter = create_interpreter(engine, sink, budget)
+    if engine == 'tree':
+        interpreter.visit(parse(input_text, lexer=lexer))
+    else:
+        interpreter.execute(load_ast(input_text, lexer, frontend, cache, opt_level))
+    return interpreter
+
+
+def run_source(input_text: str, engine: str = 'ast', lexer: str = 'fast', frontend: str = 'pratt',
+               cache: Optional[ProgramCache] = None, sink: Optional[OutputSink] = None,
+               budget: Optional[ExecutionBudget] = None, interpreter=None, opt_level: int = 0) -> Optional[str]:
+    """Исполняет программу; сообщение об ошибке печатается и возвращается"""
+    try:
+        run(input_text, engine, lexer, frontend, cache, sink, budget, interpreter, opt_level)
+        return None
+    except Exception as e:
+        message = error_message(e)
+    print(message)
+    return message
+
+
+def error_message(error: Exception) -> str:
+    """Сообщение об ошибке программы в том виде, в каком его печатает run_source"""
+    if isinstance(error, InterpreterError):
+        return f"Ошибка выполнения: {error}"
+    if isinstance(error, MemoryError):
+        return "Ошибка: недостаточно памяти"
+    return f"Ошибка: {error}"
+
+
+def run_file(input_file: str, engine: str = 'ast', lexer: str = 'fast', frontend: str = 'pratt',
+             cache: Optional[ProgramCache] = None, sink: Optional[OutputSink] = None,
+             budget: Optional[ExecutionBudget] = None, interpreter=None, opt_level: int = 0) -> Optional[str]:
+    """Исполняет программу из файла; сообщение об ошибке печатается и возвращается"""
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            input_text = f.read()
+    except FileNotFoundError:
+        message = f"Ошибка: Файл '{input_file}' не найден"
+        print(message)
+        return message
+    except Exception as e:
+        message = f"Ошибка: {e}"
+        print(message)
+        return message
+    return run_source(input_text, engine, lexer, frontend, cache, sink, budget, interpreter, opt_level)
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """Файлы пакетного режима: файл, каталог (все *.txt в нём) или шаблон glob"""
+    import glob
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(sorted(glob.glob(os.path.join(pattern, '*.txt'))))
+        elif glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+    return paths
+
+
+class BatchResult:
+    __slots__ = ('path', 'error', 'seconds', 'output')
+
+    def __init__(self, path: str, error: Optional[str], seconds: float, output: Optional[str] = None):
+        self.path = path
+        self.error = error
+        self.seconds = seconds
+        # Перехваченный вывод программы; None - вывод напечатан сразу
+        self.output = output
+
+
+def run_batch(paths: List[str], engine: str = 'ast', lexer: str = 'fast', frontend: str = 'pratt',
+              cache: Optional[ProgramCache] = None, budget: Optional[ExecutionBudget] = None,
+              opt_level: int = 0) -> List[BatchResult]:
+    """Исполняет программы одну за другой в одном процессе.
+    Импортированные модули и кэш DFA парсера ANTLR общие, исполнитель у каждой программы свой;
+    ограничения budget отсчитываются заново для каждой программы;
+    вывод программы печатается под заголовком с её именем"""
+    results = []
+    for path in paths:
+        print(f"==> {path} <==")
+        started = time.perf_counter()
+        error = run_file(path, engine, lexer, frontend, cache, budget=budget, opt_level=opt_level)
+        results.append(BatchResult(path, error, time.perf_counter() - started))
+        sys.stdout.flush()
+    return results
+
+
+def print_summary(results: List[BatchResult], file=None):
+    file = file if file is not None else sys.stderr
+    failed = sum(1 for result in results if result.error is not None)
+    total = sum(result.seconds for result in results)
+    print(f"Программ: {len(results)}, с ошибками: {failed}, время: {total:.3f} с", file=file)
+    for result in results:
+        status = "OK    " if result.error is None else "ОШИБКА"
+        print(f"{result.seconds:9.4f} с  {status}  {result.path}", file=file)
+
+
+def dump_ir(input_file: str, lexer: str = 'fast', frontend: str = 'pratt', opt_level: int = 0):
+    """Печатает граф потока управления программы после оптимизаций уровня opt_level"""
+    from Optimizer import optimize_graph
     try:
         with open(input_file, 'r', encoding='utf-8') as f:
             input_text = f.read()
-        
-        input_stream = InputStream(input_text)
-        lexer = ExprLexer(input_stream)
-        stream = CommonTokenStream(lexer)
-        parser = ExprParser(stream)
-        
-        tree = parser.program()
-        
-        interpreter = Interpreter()
-        interpreter.visit(tree)
     except FileNotFoundError:
-        print(f"Ошибка: Файл '{input_file}' не найден")
-    except InterpreterError as e:
-        print(f"Ошибка выполнения: {e}")
+        message = f"Ошибка: Файл '{input_file}' не найден"
+        print(message)
+        return message
+    try:
+        graph = optimize_graph(build_ast(input_text, lexer, frontend), opt_level)
     except Exception as e:
+        message = error_message(e)
+        print(message)
+        return message
+    print(graph.dump())
+    return None
+
+
+def profile_file(input_file: str, lexer: str, sink: OutputSink, stacks_path: Optional[str],
+                 budget: Optional[ExecutionBudget] = None):
+    """Исполняет программу с ProfilingInterpreter и печатает отчёт в stderr"""
+    from ProfilingInterpreter import profile_source, write_annotated_source, write_collapsed_stacks
+    try:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            input_text = f.read()
+    except OSError as e:
         print(f"Ошибка: {e}")
+        return
+    profile, _ = profile_source(input_text, lexer, sink, budget)
+    write_annotated_source(profile, input_text, sys.stderr)
+    if stacks_path:
+        write_collapsed_stacks(profile, stacks_path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Интерпретатор языка Expr")
+    arg_parser.add_argument('inputs', nargs='+', metavar='input_file',
+                            help="входной файл с программой; с --batch - файлы, каталоги или шаблоны glob")
+    arg_parser.add_argument('--batch', action='store_true',
+                            help="исполнить несколько программ в одном процессе и напечатать сводку")
+    arg_parser.add_argument('--jobs', '-j', type=int, default=1,
+                            help="число процессов для --batch (0 - по числу ядер)")
+    arg_parser.add_argument('--engine', choices=ENGINES, default='ast',
+                            help="исполнитель: ast - компактное AST (по умолчанию), "
+                                 "closure - компиляция в замыкания, vm - байт-код и виртуальная машина, "
+                                 "python - трансляция в код Python, "
+                                 "tree - обход дерева ANTLR")
+    arg_parser.add_argument('--lexer', choices=LEXERS, default='fast',
+                            help="лексер: fast - регулярное выражение (по умолчанию), "
+                                 "antlr - сгенерированный ExprLexer")
+    arg_parser.add_argument('--frontend', choices=FRONTENDS, default='pratt',
+                            help="построение AST для исполнителей AST: pratt - парсер рекурсивного спуска "
+                                 "(по умолчанию), antlr - ExprParser и понижение дерева разбора")
+    arg_parser.add_argument('--output', choices=tuple(OUTPUT_SINKS), default='stdout',
+                            help="вывод программы: stdout - блоками в stdout (по умолчанию), "
+                                 "count - только число строк, null - отбросить")
+    arg_parser.add_argument('--profile', action='store_true',
+                            help="профилировать исполнение по строкам (только --engine tree); отчёт печатается в stderr")
+    arg_parser.add_argument('--profile-stacks', default=None, metavar='FILE',
+                            help="с --profile: записать свёрнутые стеки для flamegraph в файл")
+    arg_parser.add_argument('--inline-cache-stats', action='store_true',
+                            help="напечатать в stderr число мономорфных и полиморфных встроенных кэшей "
+                                 "бинарных операций (только --engine tree)")
+    arg_parser.add_argument('-O', dest='opt_level', type=int, choices=OPTIMIZATION_LEVELS, default=0,
+                            help="уровень оптимизации для исполнителей AST: 0 - без оптимизаций (по умолчанию), "
+                                 "1 - распространение констант, удаление недостижимого кода и мёртвых присваиваний, "
+                                 "2 - дополнительно общие подвыражения и вынос инвариантов из циклов")
+    arg_parser.add_argument('--dump-ir', action='store_true',
+                            help="напечатать базовые блоки программы после оптимизаций -O вместо исполнения")
+    arg_parser.add_argument('--max-steps', type=int, default=None,
+                            help="наибольшее число шагов (повторов тела цикла) программы")
+    arg_parser.add_argument('--time-limit', type=float, default=None,
+                            help="наибольшее время исполнения программы, с")
+    arg_parser.add_argument('--memory-limit', type=int, default=None,
+                            help="наибольший объём строк программы, МБ")
+    arg_parser.add_argument('--no-cache', action='store_true',
+                            help="не использовать кэш скомпилированных программ")
+    arg_parser.add_argument('--cache-dir', default=None,
+                            help="каталог кэша (по умолчанию $EXPR_CACHE_DIR или ~/.cache/expr)")
+    args = arg_parser.parse_args()
+
+    if len(args.inputs) > 1 and not args.batch:
+        arg_parser.error("несколько входных файлов допускаются только с --batch")
+    if args.profile_stacks and not args.profile:
+        arg_parser.error("--profile-stacks допускается только с --profile")
+    if args.profile and (args.engine != 'tree' or args.batch):
+        arg_parser.error("--profile поддерживается только исполнителем --engine tree для одного файла")
+    if args.inline_cache_stats and (args.engine not in INLINE_CACHE_ENGINES or args.batch):
+        arg_parser.error("--inline-cache-stats поддерживается только исполнителем --engine tree для одного файла")
+    if args.opt_level and args.engine == 'tree':
+        arg_parser.error("-O1 и -O2 поддерживаются только исполнителями AST")
+    if args.dump_ir and args.batch:
+        arg_parser.error("--dump-ir допускается только для одного файла")
+    if args.dump_ir:
+        if dump_ir(args.inputs[0], args.lexer, args.frontend, args.opt_level) is not None:
+            sys.exit(1)
+        return
+
+    max_memory = args.memory_limit * 1024 * 1024 if args.memory_limit is not None else None
+    budget = ExecutionBudget(args.max_steps, args.time_limit, max_memory)
+    if args.profile:
+        profile_file(args.inputs[0], args.lexer, OUTPUT_SINKS[args.output](), args.profile_stacks, budget)
+        return
+
+    cache = None if args.no_cache else ProgramCache(args.cache_dir)
+    if not args.batch:
+        sink = OUTPUT_SINKS[args.output]()
+        interpreter = create_interpreter(args.engine, sink, budget)
+        run_file(args.inputs[0], args.engine, args.lexer, args.frontend, cache, sink, budget, interpreter,
+                 args.opt_level)
+        if isinstance(sink, CountingSink):
+            print(f"Напечатано строк: {sink.count}", file=sys.stderr)
+        if args.inline_cache_stats:
+            from InlineCache import format_stats
+            print(format_stats(interpreter.inline_caches.stats()), file=sys.stderr)
+        return
+
+    paths = expand_inputs(args.inputs)
+    if args.jobs == 1:
+        results = run_batch(paths, args.engine, args.lexer, args.frontend, cache, budget, args.opt_level)
+    else:
+        from ParallelRunner import run_parallel, print_result
+        results = run_parallel(paths, args.engine, args.lexer, args.frontend, args.cache_dir, not args.no_cache,
+                               workers=args.jobs or None, on_result=print_result,
+                               max_steps=args.max_steps, time_limit=args.time_limit, max_memory=max_memory,
+                               opt_level=args.opt_level)
+    print_summary(results)
+    if any(result.error is not None for result in results):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,253 @@
+"""
+Лексер на одном регулярном выражении, совместимый с ExprLexer
+Выдаёт те же типы токенов (Expr.tokens), те же позиции и те же сообщения
+об ошибках распознавания, что и сгенерированный лексер ANTLR, и подключается
+к ExprParser через CommonTokenStream как источник токенов. Само разбиение
+текста находится в модуле Scanner, не зависящем от ANTLR.
+
+Запуск модуля сверяет поток токенов с ExprLexer, а также разбор ExprParser
+с обоими лексерами, включая восстановление после синтаксических ошибок:
+    python FastLexer.py [файлы...]
+По умолчанию проверяются все примеры из каталога examples и набор
+ошибочных программ
+"""
+
+from typing import List, Optional
+
+from antlr4 import InputStream
+from antlr4.CommonTokenFactory import CommonTokenFactory
+from antlr4.Lexer import TokenSource
+from antlr4.Token import CommonToken, Token
+from antlr4.error.ErrorListener import ConsoleErrorListener, ProxyErrorListener
+
+from ExprLexer import ExprLexer
+from Scanner import STRING_LITERAL, LITERAL_TOKENS, scan, token_type
+
+
+class FastLexer(TokenSource):
+    def __init__(self, input: InputStream):
+        self.inputStream = input
+        self.text = input.strdata if isinstance(input, InputStream) else str(input)
+        self._listeners = [ConsoleErrorListener.INSTANCE]
+        self._source = (self, input)
+        # Фабрика нужна парсеру при восстановлении после ошибки: он создаёт
+        # недостающие токены через tokenSource._factory
+        self._factory = CommonTokenFactory.DEFAULT
+        # Весь текст разбивается одним вызовом регулярного выражения,
+        # объекты токенов создаются по мере запросов парсера
+        self._pairs = scan(self.text)
+        self._index = 0
+        self._position = 0
+        self._line_start = 0
+        # Строка и столбец текущей позиции, как у Lexer
+        self.line = 1
+        self.column = 0
+
+    # Интерфейс источника токенов
+
+    def nextToken(self) -> Token:
+        pairs = self._pairs
+        while True:
+            skipped, text = pairs[self._index]
+            start = self._position + len(skipped)
+            if '\n' in skipped:
+                self._skip_lines(skipped, start)
+            kind = _literal_type(text)
+            if kind is None:
+                kind = token_type(text)
+                if kind == Token.EOF:
+                    return self._end_of_file(start)
+            self._index += 1
+            self._position = end = start + len(text)
+            if kind == Token.INVALID_TYPE:
+                self._recognition_error(start, text)
+                if '\n' in text:
+                    self._skip_lines(text, end)
+                continue
+
+            # Поля заполняются напрямую: конструктор CommonToken заметно медленнее
+            token = _new_token(CommonToken)
+            token.source = self._source
+            token.type = kind
+            token.channel = Token.DEFAULT_CHANNEL
+            token.start = start
+            token.stop = end - 1
+            token.tokenIndex = -1
+            token.line = self.line
+            token.column = start - self._line_start
+            token._text = text
+            # Перевод строки внутри токена возможен только в строке с escape-последовательностью
+            if kind == STRING_LITERAL and '\n' in text:
+                self._skip_lines(text, end)
+            return token
+
+    def getAllTokens(self) -> List[Token]:
+        tokens = []
+        token = self.nextToken()
+        while token.type != Token.EOF:
+            tokens.append(token)
+            token = self.nextToken()
+        return tokens
+
+    def getInputStream(self):
+        return self.inputStream
+
+    def getSourceName(self) -> str:
+        return self.inputStream.getSourceName() if isinstance(self.inputStream, InputStream) else '<unknown>'
+
+    def getTokenFactory(self):
+        return self._factory
+
+    def setTokenFactory(self, factory):
+        self._factory = factory
+
+    # Слушатели ошибок, как у Recognizer
+
+    def addErrorListener(self, listener):
+        self._listeners.append(listener)
+
+    def removeErrorListeners(self):
+        self._listeners = []
+
+    def getErrorListenerDispatch(self):
+        return ProxyErrorListener(self._listeners)
+
+    # Внутренние методы
+
+    def _skip_lines(self, text: str, end: int):
+        """Учитывает переводы строк в тексте text, заканчивающемся в позиции end"""
+        self.line += text.count('\n')
+        self._line_start = end - len(text) + text.rfind('\n') + 1
+
+    def _end_of_file(self, start: int) -> Token:
+        # Повторные запросы после конца текста возвращают тот же токен EOF
+        self._position = start
+        self._pairs[self._index] = ('', '')
+        self.column = start - self._line_start
+        token = CommonToken(self._source, Token.EOF, Token.DEFAULT_CHANNEL, start, start - 1)
+        token.text = '<EOF>'
+        return token
+
+    def _recognition_error(self, start: int, text: str):
+        # Как и ANTLR, текст ошибки включает символ, на котором разбор прекратился,
+        # а разбор продолжается со следующего за ним символа
+        display = text.replace('\n', '\\n').replace('\t', '\\t').replace('\r', '\\r')
+        message = "token recognition error at: '" + display + "'"
+        self.getErrorListenerDispatch().syntaxError(self, None, self.line, start - self._line_start, message, None)
+
+
+_new_token = object.__new__
+_literal_type = LITERAL_TOKENS.get
+
+
+def _describe(token: Token) -> tuple:
+    return token.type, token.text, token.line, token.column, token.start, token.stop, token.channel
+
+
+class _ErrorCollector(ConsoleErrorListener):
+    def __init__(self):
+        self.messages = []
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.messages.append(f"line {line}:{column} {msg}")
+
+
+def compare_with_antlr(text: str) -> Optional[str]:
+    """Сравнивает токены и ошибки с ExprLexer; возвращает описание первого расхождения"""
+    streams = []
+    for lexer_class in (ExprLexer, FastLexer):
+        lexer = lexer_class(InputStream(text))
+        errors = _ErrorCollector()
+        lexer.removeErrorListeners()
+        lexer.addErrorListener(errors)
+        tokens = lexer.getAllTokens() + [lexer.nextToken()]
+        streams.append(([_describe(token) for token in tokens], errors.messages))
+
+    (expected, expected_errors), (actual, actual_errors) = streams
+    for index, (left, right) in enumerate(zip(expected, actual)):
+        if left != right:
+            return f"токен {index}: ExprLexer {left}, FastLexer {right}"
+    if len(expected) != len(actual):
+        return f"число токенов: ExprLexer {len(expected)}, FastLexer {len(actual)}"
+    if expected_errors != actual_errors:
+        return f"ошибки: ExprLexer {expected_errors}, FastLexer {actual_errors}"
+    return None
+
+
+def compare_parse_with_antlr(text: str) -> Optional[str]:
+    """Сравнивает разбор ExprParser с токенами ExprLexer и FastLexer:
+    сообщения об ошибках и дерево разбора после восстановления"""
+    from antlr4 import CommonTokenStream
+    from ExprParser import ExprParser
+
+    # Восстановление после ошибки зависит от общего для всех экземпляров ExprParser
+    # кэша предсказаний: первый разбор текста может восстановиться иначе, чем
+    # повторный. Поэтому текст сначала разбирается без сравнения
+    results = []
+    for lexer_class in (ExprLexer, ExprLexer, FastLexer):
+        lexer = lexer_class(InputStream(text))
+        parser = ExprParser(CommonTokenStream(lexer))
+        errors = _ErrorCollector()
+        for recognizer in (lexer, parser):
+            recognizer.removeErrorListeners()
+            recognizer.addErrorListener(errors)
+        try:
+            tree = parser.program().toStringTree(recog=parser)
+        except Exception as e:
+            tree = f"исключение {e.__class__.__name__}: {e}"
+        results.append((errors.messages, tree))
+
+    _, (expected_errors, expected), (actual_errors, actual) = results
+    if expected_errors != actual_errors:
+        return f"ошибки разбора: ExprLexer {expected_errors}, FastLexer {actual_errors}"
+    if expected != actual:
+        return f"дерево разбора: ExprLexer {expected}, FastLexer {actual}"
+    return None
+
+
+# Ошибочные программы: парсер восстанавливается, создавая недостающие токены
+# фабрикой источника токенов, или пропускает лишние
+MALFORMED = (
+    "print(1)",
+    "int x = 1 print(x);",
+    "int x = ;",
+    "if (1 { print(1); }",
+    "while (1) print(1)",
+    "x = (1 + 2;",
+    "print(1 + );",
+    "{ print(1);",
+    "}",
+    "int = 5;",
+    "print('abc);",
+    "float f = 1.5 $ 2;",
+    "print(1);;",
+    "string s = \"x\";",
+)
+
+
+def main():
+    import glob
+    import os
+    import sys
+
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', '*.txt')))
+    sources = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            sources.append((path, f.read()))
+    if not sys.argv[1:]:
+        sources.extend((f"ошибочная программа {text!r}", text) for text in MALFORMED)
+
+    failures = 0
+    for name, text in sources:
+        difference = compare_with_antlr(text) or compare_parse_with_antlr(text)
+        if difference is None:
+            print(f"OK      {name}")
+        else:
+            failures += 1
+            print(f"ОТЛИЧИЕ {name}: {difference}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Встроенные кэши бинарных операций
+Узел бинарной операции при первом исполнении запоминает типы операндов и
+получает обработчик для этой пары типов (например, int + int или string + int)
+без разбора типов внутри Runtime. Последующие исполнения проверяют только
+совпадение типов и сразу вызывают обработчик; при несовпадении узел
+переходит к общей операции Runtime и больше не специализируется
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from Runtime import Runtime, Value, TRUE, FALSE, int_value
+import Ast
+
+
+# Состояния узла
+MONOMORPHIC = 'monomorphic'
+POLYMORPHIC = 'polymorphic'
+
+Operation = Callable[[Value, Value], Value]
+
+
+def generic_operations(runtime: Runtime) -> List[Operation]:
+    """Общие операции Runtime по кодам бинарных операторов Ast"""
+    return [
+        runtime._multiply, runtime._divide, runtime._modulo, runtime._add, runtime._subtract,
+        runtime._compare_lt, runtime._compare_le, runtime._compare_gt, runtime._compare_ge,
+        runtime._compare_eq, runtime._compare_ne,
+    ]
+
+
+def specialized_operations(runtime: Runtime) -> Dict[Tuple[int, str, str], Operation]:
+    """Обработчики по коду оператора и типам операндов; для остальных пар
+    типов узел использует общую операцию"""
+    operations: Dict[Tuple[int, str, str], Operation] = {
+        (Ast.OP_ADD, 'int', 'int'): lambda left, right: int_value(left.value + right.value),
+        (Ast.OP_SUB, 'int', 'int'): lambda left, right: int_value(left.value - right.value),
+        (Ast.OP_MUL, 'int', 'int'): lambda left, right: int_value(left.value * right.value),
+        # Деление на ноль обрабатывает общая операция
+        (Ast.OP_MOD, 'int', 'int'): lambda left, right: (
+            int_value(left.value % right.value) if right.value else runtime._modulo(left, right)),
+        (Ast.OP_ADD, 'string', 'string'): lambda left, right: Value(
+            runtime._concat(left.value, right.value), 'string'),
+        (Ast.OP_MUL, 'string', 'int'): lambda left, right: Value(
+            runtime._repeat(left.value, right.value), 'string'),
+        (Ast.OP_MUL, 'int', 'string'): lambda left, right: Value(
+            runtime._repeat(right.value, left.value), 'string'),
+    }
+
+    for left_type, right_type in (('float', 'float'), ('int', 'float'), ('float', 'int')):
+        operations[Ast.OP_ADD, left_type, right_type] = lambda left, right: Value(
+            float(left.value) + float(right.value), 'float')
+        operations[Ast.OP_SUB, left_type, right_type] = lambda left, right: Value(
+            float(left.value) - float(right.value), 'float')
+        operations[Ast.OP_MUL, left_type, right_type] = lambda left, right: Value(
+            float(left.value) * float(right.value), 'float')
+
+    for left_type, right_type in (('int', 'int'), ('float', 'float'), ('int', 'float'), ('float', 'int')):
+        operations[Ast.OP_DIV, left_type, right_type] = lambda left, right: (
+            Value(float(left.value) / float(right.value), 'float') if right.value else runtime._divide(left, right))
+
+    for other in ('int', 'float'):
+        operations[Ast.OP_ADD, 'string', other] = lambda left, right: Value(
+            runtime._concat(left.value, str(right.value)), 'string')
+        operations[Ast.OP_ADD, other, 'string'] = lambda left, right: Value(
+            runtime._concat(str(left.value), right.value), 'string')
+
+    # Сравнения чисел между собой и строк между собой не зависят от типов
+    comparable = (('int', 'int'), ('float', 'float'), ('int', 'float'), ('float', 'int'), ('string', 'string'))
+    for left_type, right_type in comparable:
+        operations[Ast.OP_LT, left_type, right_type] = lambda left, right: TRUE if left.value < right.value else FALSE
+        operations[Ast.OP_LE, left_type, right_type] = lambda left, right: TRUE if left.value <= right.value else FALSE
+        operations[Ast.OP_GT, left_type, right_type] = lambda left, right: TRUE if left.value > right.value else FALSE
+        operations[Ast.OP_GE, left_type, right_type] = lambda left, right: TRUE if left.value >= right.value else FALSE
+        operations[Ast.OP_EQ, left_type, right_type] = lambda left, right: TRUE if left.value == right.value else FALSE
+        operations[Ast.OP_NE, left_type, right_type] = lambda left, right: TRUE if left.value != right.value else FALSE
+    return operations
+
+
+class BinarySite:
+    """Встроенный кэш одного узла. Исполнитель сам проверяет охрану:
+        if left.type_name == site.left_type and right.type_name == site.right_type:
+            return site.handler(left, right)
+        return site.miss(left, right)"""
+
+    __slots__ = ('op', 'left', 'right', 'left_type', 'right_type', 'handler', 'state', '_caches')
+
+    def __init__(self, caches: 'InlineCaches', op: int, left: object, right: object):
+        self.op = op
+        # Операнды узла (контексты дерева разбора)
+        self.left = left
+        self.right = right
+        # До первого исполнения охрана не выполняется
+        self.left_type: Optional[str] = None
+        self.right_type: Optional[str] = None
+        self.handler: Optional[Operation] = None
+        self.state: Optional[str] = None
+        self._caches = caches
+
+    def miss(self, left: Value, right: Value) -> Value:
+        """Охрана не выполнилась: первое исполнение специализирует узел,
+        несовпадение типов после этого возвращает его к общей операции"""
+        caches = self._caches
+        if self.state is None:
+            self.state = MONOMORPHIC
+            self.left_type = left.type_name
+            self.right_type = right.type_name
+            self.handler = caches.specialized.get((self.op, left.type_name, right.type_name), caches.generic[self.op])
+        elif self.state is MONOMORPHIC:
+            self.state = POLYMORPHIC
+            # Охрана больше не выполняется: каждое исполнение идёт через miss
+            self.left_type = self.right_type = None
+            self.handler = caches.generic[self.op]
+        return self.handler(left, right)
+
+    @property
+    def specialized(self) -> bool:
+        return self.handler is not None and self.handler is not self._caches.generic[self.op]
+
+
+class InlineCaches:
+    """Встроенные кэши узлов одного исполнителя"""
+
+    def __init__(self, runtime: Runtime):
+        self.generic = generic_operations(runtime)
+        self.specialized = specialized_operations(runtime)
+        # Кэши по исполненным узлам
+        self.sites: Dict[object, BinarySite] = {}
+
+    def add(self, node: object, op: int, left: object, right: object) -> BinarySite:
+        site = self.sites[node] = BinarySite(self, op, left, right)
+        return site
+
+    def stats(self) -> Dict[str, int]:
+        """Число узлов по состояниям кэша"""
+        result = {MONOMORPHIC: 0, 'specialized': 0, POLYMORPHIC: 0}
+        for site in self.sites.values():
+            if site.state is not None:
+                result[site.state] += 1
+                result['specialized'] += site.specialized
+        return result
+
+
+def format_stats(stats: Dict[str, int]) -> str:
+    return (f"Встроенные кэши: узлов {stats[MONOMORPHIC] + stats[POLYMORPHIC]}, "
+            f"мономорфных {stats[MONOMORPHIC]} (со специализированной операцией {stats['specialized']}), "
+            f"полиморфных {stats[POLYMORPHIC]}")
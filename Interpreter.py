@@ -4,58 +4,33 @@
 Операторы: объявление переменных, присваивание, if/else, while, print
 """
 
+from typing import Dict, Optional
+
 from ExprParser import ExprParser
 from ExprVisitor import ExprVisitor
-from typing import Any, Dict, Union
-
-
-class InterpreterError(Exception):
-    pass
-
-
-class UndefinedVariableError(InterpreterError):
-    pass
-
-
-class TypeMismatchError(InterpreterError):
-    pass
-
+from InlineCache import InlineCaches
+from OutputSink import OutputSink
+from Runtime import Runtime, Value, TRUE, FALSE, int_value, ExecutionBudget, decode_string_literal, InterpreterError, UndefinedVariableError, TypeMismatchError
+import Ast
 
-class Value:
-    def __init__(self, value: Any, type_name: str):
-        self.value = value
-        self.type_name = type_name
-    
-    def __str__(self):
-        return str(self.value)
-    
-    def __repr__(self):
-        return f"Value({self.value}, {self.type_name})"
-    
-    def is_truthy(self) -> bool:
-        if self.type_name == 'int':
-            return self.value != 0
-        elif self.type_name == 'float':
-            return self.value != 0.0
-        elif self.type_name == 'string':
-            return len(self.value) > 0
-        return False
 
+class Interpreter(Runtime, ExprVisitor):
+    def __init__(self, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None):
+        super().__init__(sink, budget)
+        # Разобранные значения литералов по узлам дерева разбора
+        self._literals: Dict[ExprParser.LiteralContext, Value] = {}
+        # Встроенные кэши бинарных операций по узлам дерева разбора
+        self.inline_caches = InlineCaches(self)
+        self._sites = self.inline_caches.sites
 
-class Interpreter(ExprVisitor):
-    def __init__(self):
-        self.variables: Dict[str, Value] = {}
-        self.output = []
-    
-    def get_output(self) -> str:
-        return '\n'.join(self.output)
-    
-    def clear_output(self):
-        self.output.clear()
-    
     def visitProgram(self, ctx: ExprParser.ProgramContext):
-        for statement in ctx.statement():
-            self.visit(statement)
+        self.budget.start()
+        self._ticks = 0
+        try:
+            for statement in ctx.statement():
+                self.visit(statement)
+        finally:
+            self.sink.flush()
         return None
     
     def visitStatement(self, ctx: ExprParser.StatementContext):
@@ -111,9 +86,7 @@ class Interpreter(ExprVisitor):
         return None
     
     def visitIfStatement(self, ctx: ExprParser.IfStatementContext):
-        condition = self.visit(ctx.expression())
-        
-        if condition.is_truthy():
+        if self._is_true(ctx.expression()):
             self.visit(ctx.statement(0))
         elif len(ctx.statement()) > 1:  # есть else
             self.visit(ctx.statement(1))
@@ -121,19 +94,18 @@ class Interpreter(ExprVisitor):
         return None
     
     def visitWhileStatement(self, ctx: ExprParser.WhileStatementContext):
-        while True:
-            condition = self.visit(ctx.expression())
-            if not condition.is_truthy():
-                break
-            self.visit(ctx.statement())
+        condition = ctx.expression()
+        body = ctx.statement()
+        checkpoint = self.budget.checkpoint
+        while self._is_true(condition):
+            self.visit(body)
+            self._ticks = (self._ticks or checkpoint()) - 1
         
         return None
     
     def visitPrintStatement(self, ctx: ExprParser.PrintStatementContext):
         value = self.visit(ctx.expression())
-        output_str = str(value.value)
-        print(output_str)
-        self.output.append(output_str)
+        self._print_value(value.value)
         return None
     
     def visitBlock(self, ctx: ExprParser.BlockContext):
@@ -145,42 +117,32 @@ class Interpreter(ExprVisitor):
         return ctx.getText()
     
     def visitExpression(self, ctx: ExprParser.ExpressionContext):
+        # Уже исполненная бинарная операция: оператор и операнды известны, охрана по типам
+        site = self._sites.get(ctx)
+        if site is not None:
+            left = self.visit(site.left)
+            right = self.visit(site.right)
+            if left.type_name == site.left_type and right.type_name == site.right_type:
+                return site.handler(left, right)
+            return site.miss(left, right)
+
         if ctx.getChildCount() == 3 and ctx.getChild(0).getText() == '(':
             return self.visit(ctx.expression(0))
         
         if len(ctx.expression()) == 2:
-            left = self.visit(ctx.expression(0))
-            right = self.visit(ctx.expression(1))
             op = ctx.getChild(1).getText()
             
-            if op == '*':
-                return self._multiply(left, right)
-            elif op == '/':
-                return self._divide(left, right)
-            elif op == '%':
-                return self._modulo(left, right)
-            elif op == '+':
-                return self._add(left, right)
-            elif op == '-':
-                return self._subtract(left, right)
-            
-            elif op == '<':
-                return self._compare_lt(left, right)
-            elif op == '<=':
-                return self._compare_le(left, right)
-            elif op == '>':
-                return self._compare_gt(left, right)
-            elif op == '>=':
-                return self._compare_ge(left, right)
-            elif op == '==':
-                return self._compare_eq(left, right)
-            elif op == '!=':
-                return self._compare_ne(left, right)
-            
-            elif op == '&&':
-                return self._logical_and(left, right)
+            # Правый операнд логических операций вычисляется только при необходимости
+            if op == '&&':
+                return TRUE if self._is_true(ctx.expression(0)) and self._is_true(ctx.expression(1)) else FALSE
             elif op == '||':
-                return self._logical_or(left, right)
+                return TRUE if self._is_true(ctx.expression(0)) or self._is_true(ctx.expression(1)) else FALSE
+            
+            # Первое исполнение: оператор разбирается один раз, операция выбирается кэшем по типам
+            site = self.inline_caches.add(ctx, Ast.BINARY_OPS[op], ctx.expression(0), ctx.expression(1))
+            left = self.visit(site.left)
+            right = self.visit(site.right)
+            return site.miss(left, right)
         
         elif len(ctx.expression()) == 1:
             operand = self.visit(ctx.expression(0))
@@ -204,191 +166,34 @@ class Interpreter(ExprVisitor):
         
         raise InterpreterError(f"Неизвестный тип выражения: {ctx.getText()}")
     
+    def _is_true(self, ctx: ExprParser.ExpressionContext) -> bool:
+        """Вычисляет условие сразу в bool, без промежуточного Value для &&, || и !"""
+        count = ctx.getChildCount()
+        if count == 3:
+            if ctx.getChild(0).getText() == '(':
+                return self._is_true(ctx.expression(0))
+            op = ctx.getChild(1).getText()
+            if op == '&&':
+                return self._is_true(ctx.expression(0)) and self._is_true(ctx.expression(1))
+            elif op == '||':
+                return self._is_true(ctx.expression(0)) or self._is_true(ctx.expression(1))
+        elif count == 2 and ctx.getChild(0).getText() == '!':
+            return not self._is_true(ctx.expression(0))
+        return self.visit(ctx).is_truthy()
+    
     def visitLiteral(self, ctx: ExprParser.LiteralContext):
+        # Литерал разбирается один раз, повторные вычисления берут значение из кэша
+        value = self._literals.get(ctx)
+        if value is None:
+            value = self._literals[ctx] = self._parse_literal(ctx)
+        return value
+
+    def _parse_literal(self, ctx: ExprParser.LiteralContext) -> Value:
         if ctx.INT_LITERAL():
-            return Value(int(ctx.INT_LITERAL().getText()), 'int')
+            return int_value(int(ctx.INT_LITERAL().getText()))
         elif ctx.FLOAT_LITERAL():
             return Value(float(ctx.FLOAT_LITERAL().getText()), 'float')
         elif ctx.STRING_LITERAL():
-            # Убираем кавычки и обрабатываем escape-последовательности
-            text = ctx.STRING_LITERAL().getText()[1:-1]  # убираем кавычки
-            text = text.replace('\\n', '\n').replace('\\t', '\t').replace('\\\\', '\\').replace("\\'", "'")
-            return Value(text, 'string')
+            return Value(decode_string_literal(ctx.STRING_LITERAL().getText()), 'string')
         
         raise InterpreterError(f"Неизвестный тип литерала: {ctx.getText()}")
-    
-    # Вспомогательные методы для операций
-    
-    def _is_compatible_type(self, from_type: str, to_type: str) -> bool:
-        """Проверка совместимости типов"""
-        if from_type == to_type:
-            return True
-        # int можно привести к float
-        if from_type == 'int' and to_type == 'float':
-            return True
-        # Любой тип можно привести к string
-        if to_type == 'string':
-            return True
-        return False
-    
-    def _convert_type(self, value: Value, target_type: str) -> Value:
-        """Приведение типа"""
-        if value.type_name == target_type:
-            return value
-        
-        if target_type == 'float' and value.type_name == 'int':
-            return Value(float(value.value), 'float')
-        elif target_type == 'string':
-            return Value(str(value.value), 'string')
-        
-        raise TypeMismatchError(f"Невозможно преобразовать тип {value.type_name} в {target_type}")
-    
-    def _get_default_value(self, type_name: str) -> Value:
-        """Получение значения по умолчанию для типа"""
-        if type_name == 'int':
-            return Value(0, 'int')
-        elif type_name == 'float':
-            return Value(0.0, 'float')
-        elif type_name == 'string':
-            return Value('', 'string')
-        
-        raise InterpreterError(f"Неизвестный тип: {type_name}")
-    
-    # Арифметические операции
-    def _add(self, left: Value, right: Value) -> Value:
-        """Сложение"""
-        if left.type_name == 'string' or right.type_name == 'string':
-            # Конкатенация строк
-            return Value(str(left.value) + str(right.value), 'string')
-        elif left.type_name == 'float' or right.type_name == 'float':
-            # Вещественная арифметика
-            left_val = float(left.value) if left.type_name in ['int', 'float'] else 0.0
-            right_val = float(right.value) if right.type_name in ['int', 'float'] else 0.0
-            return Value(left_val + right_val, 'float')
-        else:
-            # Целочисленная арифметика
-            return Value(left.value + right.value, 'int')
-    
-    def _subtract(self, left: Value, right: Value) -> Value:
-        """Вычитание"""
-        if left.type_name == 'string' and right.type_name == 'string':
-            # Удаление подстроки
-            result = left.value.replace(right.value, '', 1)
-            return Value(result, 'string')
-        elif left.type_name == 'float' or right.type_name == 'float':
-            left_val = float(left.value) if left.type_name in ['int', 'float'] else 0.0
-            right_val = float(right.value) if right.type_name in ['int', 'float'] else 0.0
-            return Value(left_val - right_val, 'float')
-        else:
-            return Value(left.value - right.value, 'int')
-    
-    def _multiply(self, left: Value, right: Value) -> Value:
-        """Умножение"""
-        if left.type_name == 'string' and right.type_name == 'int':
-            # Повторение строки
-            return Value(left.value * right.value, 'string')
-        elif left.type_name == 'int' and right.type_name == 'string':
-            return Value(left.value * right.value, 'string')
-        elif left.type_name == 'float' or right.type_name == 'float':
-            left_val = float(left.value) if left.type_name in ['int', 'float'] else 0.0
-            right_val = float(right.value) if right.type_name in ['int', 'float'] else 0.0
-            return Value(left_val * right_val, 'float')
-        else:
-            return Value(left.value * right.value, 'int')
-    
-    def _divide(self, left: Value, right: Value) -> Value:
-        """Деление"""
-        if right.value == 0:
-            raise InterpreterError("Деление на ноль")
-        
-        if left.type_name in ['int', 'float'] and right.type_name in ['int', 'float']:
-            left_val = float(left.value)
-            right_val = float(right.value)
-            return Value(left_val / right_val, 'float')
-        else:
-            raise TypeMismatchError("Деление поддерживается только для числовых типов")
-    
-    def _modulo(self, left: Value, right: Value) -> Value:
-        """Остаток от деления"""
-        if right.value == 0:
-            raise InterpreterError("Деление на ноль при вычислении остатка")
-        
-        if left.type_name == 'int' and right.type_name == 'int':
-            return Value(left.value % right.value, 'int')
-        else:
-            raise TypeMismatchError("Операция остатка поддерживается только для целых чисел")
-    
-    # Операции сравнения
-    def _compare_lt(self, left: Value, right: Value) -> Value:
-        """Меньше"""
-        if left.type_name in ['int', 'float'] and right.type_name in ['int', 'float']:
-            return Value(1 if left.value < right.value else 0, 'int')
-        elif left.type_name == 'string' and right.type_name == 'string':
-            return Value(1 if left.value < right.value else 0, 'int')
-        else:
-            raise TypeMismatchError("Невозможно сравнить значения разных типов")
-    
-    def _compare_le(self, left: Value, right: Value) -> Value:
-        """Меньше или равно"""
-        if left.type_name in ['int', 'float'] and right.type_name in ['int', 'float']:
-            return Value(1 if left.value <= right.value else 0, 'int')
-        elif left.type_name == 'string' and right.type_name == 'string':
-            return Value(1 if left.value <= right.value else 0, 'int')
-        else:
-            raise TypeMismatchError("Невозможно сравнить значения разных типов")
-    
-    def _compare_gt(self, left: Value, right: Value) -> Value:
-        """Больше"""
-        if left.type_name in ['int', 'float'] and right.type_name in ['int', 'float']:
-            return Value(1 if left.value > right.value else 0, 'int')
-        elif left.type_name == 'string' and right.type_name == 'string':
-            return Value(1 if left.value > right.value else 0, 'int')
-        else:
-            raise TypeMismatchError("Невозможно сравнить значения разных типов")
-    
-    def _compare_ge(self, left: Value, right: Value) -> Value:
-        """Больше или равно"""
-        if left.type_name in ['int', 'float'] and right.type_name in ['int', 'float']:
-            return Value(1 if left.value >= right.value else 0, 'int')
-        elif left.type_name == 'string' and right.type_name == 'string':
-            return Value(1 if left.value >= right.value else 0, 'int')
-        else:
-            raise TypeMismatchError("Невозможно сравнить значения разных типов")
-    
-    def _compare_eq(self, left: Value, right: Value) -> Value:
-        """Равно"""
-        return Value(1 if left.value == right.value else 0, 'int')
-    
-    def _compare_ne(self, left: Value, right: Value) -> Value:
-        """Не равно"""
-        return Value(1 if left.value != right.value else 0, 'int')
-    
-    # Логические операции
-    def _logical_and(self, left: Value, right: Value) -> Value:
-        """Логическое И"""
-        return Value(1 if left.is_truthy() and right.is_truthy() else 0, 'int')
-    
-    def _logical_or(self, left: Value, right: Value) -> Value:
-        """Логическое ИЛИ"""
-        return Value(1 if left.is_truthy() or right.is_truthy() else 0, 'int')
-    
-    def _logical_not(self, operand: Value) -> Value:
-        """Логическое НЕ"""
-        return Value(1 if not operand.is_truthy() else 0, 'int')
-    
-    # Унарные операции
-    def _unary_minus(self, operand: Value) -> Value:
-        """Унарный минус"""
-        if operand.type_name == 'int':
-            return Value(-operand.value, 'int')
-        elif operand.type_name == 'float':
-            return Value(-operand.value, 'float')
-        else:
-            raise TypeMismatchError("Унарный минус поддерживается только для числовых типов")
-    
-    def _unary_plus(self, operand: Value) -> Value:
-        """Унарный плюс"""
-        if operand.type_name in ['int', 'float']:
-            return operand
-        else:
-            raise TypeMismatchError("Унарный плюс поддерживается только для числовых типов") 
\ No newline at end of file
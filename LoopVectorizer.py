@@ -0,0 +1,393 @@
+"""
+Векторное исполнение циклов со счётчиком
+Анализ находит циклы вида
+    while (i < n) { acc = acc + f(i); ... i = i + 1; }
+без вывода и без других побочных эффектов: тело состоит из накоплений суммы,
+условной суммы (счётчика) и минимума или максимума выражений от счётчика и
+переменных, не изменяемых в цикле. Такой цикл исполняется частями: выражение
+вычисляется списком сразу для всех значений счётчика части (range), а
+накопление - встроенными sum, min, max и reduce, без Value на каждом шаге.
+
+Результат совпадает с обычным исполнением: целые суммируются точно в любом
+порядке, вещественные - по одному слагаемому в порядке возрастания счётчика
+(reduce, а не sum, который в новых версиях Python суммирует с компенсацией
+погрешности), min и max выбирают значение тем же строгим сравнением.
+Части не длиннее порции шагов бюджета, поэтому ограничения проверяются на тех
+же шагах. Если вычисление части завершилось исключением (например, делением
+на ноль), эта часть и остаток цикла исполняются обычным образом, и ошибка
+возникает там же, где и без векторизации; остальные циклы исполняются как обычно
+"""
+
+from functools import reduce
+from operator import add, sub
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from Runtime import Value, int_value
+import Ast
+
+
+_NUMERIC = ('int', 'float')
+
+# Виды накоплений: acc = acc + e, acc = acc - e (вещественные), if (e < acc) acc = e, if (e > acc) acc = e
+SUM = 'sum'
+DIFFERENCE = 'difference'
+MINIMUM = 'min'
+MAXIMUM = 'max'
+
+_COMPARISON_SYMBOLS = {
+    Ast.OP_LT: '<', Ast.OP_LE: '<=', Ast.OP_GT: '>', Ast.OP_GE: '>=', Ast.OP_EQ: '==', Ast.OP_NE: '!=',
+}
+
+
+class Reduction:
+    __slots__ = ('slot', 'type_name', 'kind', 'value', 'condition')
+
+    def __init__(self, slot: int, type_name: str, kind: str, value: Ast.Node, condition: Optional[Ast.Node] = None):
+        self.slot = slot
+        self.type_name = type_name
+        self.kind = kind
+        # Накапливаемое выражение и условие накопления (только для сумм)
+        self.value = value
+        self.condition = condition
+
+
+class CountedLoop:
+    """Распознанный цикл и функция, вычисляющая накопления для части значений счётчика"""
+
+    __slots__ = ('counter', 'bound', 'bound_slot', 'inclusive', 'step', 'invariants', 'reductions', 'kernel')
+
+    def __init__(self, counter: int, bound: Optional[int], bound_slot: Optional[int], inclusive: bool, step: int,
+                 invariants: List[int], reductions: List[Reduction], kernel: Callable):
+        self.counter = counter
+        # Граница - литерал (bound) или переменная, не изменяемая в цикле (bound_slot)
+        self.bound = bound
+        self.bound_slot = bound_slot
+        # Условие i <= n, а не i < n
+        self.inclusive = inclusive
+        self.step = step
+        # Слоты переменных, которые выражения только читают
+        self.invariants = invariants
+        self.reductions = reductions
+        self.kernel = kernel
+
+    def run(self, interpreter) -> bool:
+        """Исполняет цикл над слотами interpreter. False - цикл нужно продолжить
+        обычным исполнением с текущего состояния: переменные ещё не объявлены,
+        цикл не исполняется ни разу или вычисление части завершилось исключением"""
+        slots = interpreter.slots
+        counter = slots[self.counter]
+        bound = self.bound if self.bound_slot is None else slots[self.bound_slot]
+        if counter is None or bound is None:
+            return False
+        values = [slots[slot] for slot in self.invariants]
+        accumulators = [slots[reduction.slot] for reduction in self.reductions]
+        if None in values or None in accumulators:
+            return False
+        start = counter.value
+        stop = (bound if self.bound_slot is None else bound.value) + self.inclusive
+        if start >= stop:
+            return False
+
+        invariants = [value.value for value in values]
+        totals = tuple(accumulator.value for accumulator in accumulators)
+        kernel = self.kernel
+        step = self.step
+        checkpoint = interpreter.budget.checkpoint
+        ticks = interpreter._ticks
+        completed = True
+        try:
+            while start < stop:
+                # Часть - оставшиеся шаги порции бюджета; после исчерпания порции
+                # одна итерация исполняется перед проверкой ограничений, как в обычном цикле
+                count = min(ticks, -(-(stop - start) // step)) if ticks else 1
+                end = start + count * step
+                try:
+                    totals = kernel(start, end, *invariants, *totals)
+                except Exception:
+                    completed = False
+                    break
+                start = end
+                ticks = (ticks or checkpoint()) - count
+        finally:
+            slots[self.counter] = int_value(start)
+            for reduction, total in zip(self.reductions, totals):
+                slots[reduction.slot] = Value(total, reduction.type_name)
+            interpreter._ticks = ticks
+        return completed
+
+
+class LoopVectorizer:
+    """Находит векторизуемые циклы программы, уже проверенной TypeChecker"""
+
+    def __init__(self):
+        self._types: List[Optional[str]] = []
+        self._constants: Dict[str, object] = {}
+
+    def analyze(self, program: Ast.Program) -> Dict[Ast.While, CountedLoop]:
+        self._types = program.types
+        loops: Dict[Ast.While, CountedLoop] = {}
+        pending = list(program.body)
+        while pending:
+            node = pending.pop()
+            if isinstance(node, Ast.While):
+                loop = self._match(node)
+                if loop is not None:
+                    loops[node] = loop
+                else:
+                    pending.append(node.body)
+            elif isinstance(node, Ast.If):
+                pending.append(node.then)
+                if node.orelse is not None:
+                    pending.append(node.orelse)
+            elif isinstance(node, Ast.Block):
+                pending.extend(node.body)
+        return loops
+
+    # Распознавание
+
+    def _match(self, node: Ast.While) -> Optional[CountedLoop]:
+        cond = node.cond
+        if not (isinstance(cond, Ast.Binary) and cond.op in (Ast.OP_LT, Ast.OP_LE)
+                and isinstance(cond.left, Ast.Var) and self._types[cond.left.slot] == 'int'):
+            return None
+        counter = cond.left.slot
+        if not isinstance(node.body, Ast.Block) or not node.body.body:
+            return None
+        step = self._increment(node.body.body[-1], counter)
+        if step is None:
+            return None
+
+        reductions = []
+        for statement in node.body.body[:-1]:
+            reduction = self._reduction(statement)
+            if reduction is None:
+                return None
+            reductions.append(reduction)
+        assigned = {counter} | {reduction.slot for reduction in reductions}
+        if len(assigned) != len(reductions) + 1:
+            return None
+
+        bound, bound_slot = None, None
+        if isinstance(cond.right, Ast.Literal) and cond.right.type_name == 'int':
+            bound = cond.right.value.value
+        elif isinstance(cond.right, Ast.Var) and self._types[cond.right.slot] == 'int':
+            bound_slot = cond.right.slot
+            if bound_slot in assigned:
+                return None
+        else:
+            return None
+
+        # Выражения читают только счётчик и переменные, не изменяемые в цикле
+        read: Set[int] = set()
+        for reduction in reductions:
+            for expression in (reduction.value, reduction.condition):
+                if expression is not None:
+                    self._collect_reads(expression, read)
+        if read & (assigned - {counter}):
+            return None
+        invariants = sorted(read - {counter})
+
+        kernel = self._compile(counter, step, invariants, reductions)
+        if kernel is None:
+            return None
+        return CountedLoop(counter, bound, bound_slot, cond.op == Ast.OP_LE, step, invariants, reductions, kernel)
+
+    @staticmethod
+    def _increment(statement: Ast.Node, counter: int) -> Optional[int]:
+        """Шаг счётчика для оператора i = i + c (c - положительный целый литерал)"""
+        if not (isinstance(statement, Ast.Assignment) and statement.slot == counter):
+            return None
+        expr = statement.expr
+        if not (isinstance(expr, Ast.Binary) and expr.op == Ast.OP_ADD):
+            return None
+        for var, literal in ((expr.left, expr.right), (expr.right, expr.left)):
+            if (isinstance(var, Ast.Var) and var.slot == counter and isinstance(literal, Ast.Literal)
+                    and literal.type_name == 'int' and literal.value.value > 0):
+                return literal.value.value
+        return None
+
+    def _reduction(self, statement: Ast.Node) -> Optional[Reduction]:
+        if isinstance(statement, Ast.Assignment):
+            return self._accumulation(statement, None)
+        if not isinstance(statement, Ast.If) or statement.orelse is not None:
+            return None
+        then = statement.then
+        if isinstance(then, Ast.Block) and len(then.body) == 1:
+            then = then.body[0]
+        if not isinstance(then, Ast.Assignment):
+            return None
+        return self._extremum(statement.cond, then) or self._accumulation(then, statement.cond)
+
+    def _accumulation(self, statement: Ast.Assignment, condition: Optional[Ast.Node]) -> Optional[Reduction]:
+        """acc = acc + e, acc = e + acc или acc = acc - e"""
+        slot = statement.slot
+        type_name = self._types[slot]
+        expr = statement.expr
+        if type_name not in _NUMERIC or not isinstance(expr, Ast.Binary):
+            return None
+        if type_name == 'int':
+            return self._int_accumulation(slot, expr, condition)
+        if expr.op == Ast.OP_ADD and self._is_slot(expr.left, slot):
+            kind, value = SUM, expr.right
+        elif expr.op == Ast.OP_ADD and self._is_slot(expr.right, slot):
+            kind, value = SUM, expr.left
+        elif expr.op == Ast.OP_SUB and self._is_slot(expr.left, slot):
+            kind, value = DIFFERENCE, expr.right
+        else:
+            return None
+        if value.type_name not in _NUMERIC:
+            return None
+        return Reduction(slot, type_name, kind, value, condition)
+
+    def _int_accumulation(self, slot: int, expr: Ast.Binary, condition: Optional[Ast.Node]) -> Optional[Reduction]:
+        """Целая сумма с acc в любом месте цепочки сложений и вычитаний, например
+        acc = acc + e1 - e2: сложение целых точно, поэтому слагаемые можно переставить"""
+        terms: List[Tuple[bool, Ast.Node]] = []
+        _additive_terms(expr, False, terms)
+        own = [negative for negative, term in terms if self._is_slot(term, slot)]
+        if own != [False]:
+            return None
+        value = None
+        for negative, term in terms:
+            if self._is_slot(term, slot):
+                continue
+            if value is None:
+                value = _typed(Ast.Unary(Ast.OP_NEG, term), 'int') if negative else term
+            else:
+                value = _typed(Ast.Binary(Ast.OP_SUB if negative else Ast.OP_ADD, value, term), 'int')
+        if value is None:
+            return None
+        return Reduction(slot, 'int', SUM, value, condition)
+
+    def _extremum(self, cond: Ast.Node, statement: Ast.Assignment) -> Optional[Reduction]:
+        """if (e < m) m = e; - минимум, if (e > m) m = e; - максимум (и те же условия с m слева)"""
+        slot = statement.slot
+        value = statement.expr
+        if not isinstance(cond, Ast.Binary) or cond.op not in (Ast.OP_LT, Ast.OP_GT):
+            return None
+        if _same(cond.left, value) and self._is_slot(cond.right, slot):
+            kind = MINIMUM if cond.op == Ast.OP_LT else MAXIMUM
+        elif _same(cond.right, value) and self._is_slot(cond.left, slot):
+            kind = MAXIMUM if cond.op == Ast.OP_LT else MINIMUM
+        else:
+            return None
+        # Значение присваивается без приведения типа, поэтому сравнение то же
+        if self._types[slot] not in _NUMERIC or value.type_name != self._types[slot]:
+            return None
+        return Reduction(slot, value.type_name, kind, value)
+
+    @staticmethod
+    def _is_slot(node: Ast.Node, slot: int) -> bool:
+        return isinstance(node, Ast.Var) and node.slot == slot
+
+    def _collect_reads(self, node: Ast.Node, read: Set[int]):
+        if isinstance(node, Ast.Binary):
+            self._collect_reads(node.left, read)
+            self._collect_reads(node.right, read)
+        elif isinstance(node, Ast.Unary):
+            self._collect_reads(node.operand, read)
+        elif isinstance(node, Ast.Var):
+            read.add(node.slot)
+
+    # Генерация функции части цикла
+
+    def _compile(self, counter: int, step: int, invariants: List[int],
+                 reductions: List[Reduction]) -> Optional[Callable]:
+        """Функция (начало, конец, инварианты..., накопления...) -> новые накопления"""
+        self._constants = {}
+        totals = [f's{reduction.slot}' for reduction in reductions]
+        parameters = ['_start', '_stop'] + [f's{slot}' for slot in invariants] + totals
+        lines = [f"def _kernel({', '.join(parameters)}):",
+                 f"    _range = range(_start, _stop, {step})"]
+        for reduction, total in zip(reductions, totals):
+            value = self._expression(reduction.value)
+            if value is None:
+                return None
+            values = f'[{value} for s{counter} in _range'
+            if reduction.condition is not None:
+                condition = self._expression(reduction.condition)
+                if condition is None:
+                    return None
+                values += f' if {condition}'
+            values += ']'
+            if reduction.kind in (MINIMUM, MAXIMUM):
+                lines.append(f'    {total} = {reduction.kind}([{total}, *{values}])')
+            elif reduction.type_name == 'int':
+                lines.append(f'    {total} = sum({values}, {total})')
+            else:
+                function = '_add' if reduction.kind == SUM else '_sub'
+                lines.append(f'    {total} = _reduce({function}, {values}, {total})')
+        lines.append(f"    return ({''.join(total + ', ' for total in totals)})")
+
+        namespace = {'_reduce': reduce, '_add': add, '_sub': sub, **self._constants}
+        exec(compile('\n'.join(lines) + '\n', '<counted-loop>', 'exec'), namespace)
+        return namespace['_kernel']
+
+    def _expression(self, node: Ast.Node) -> Optional[str]:
+        """Код Python над числами с семантикой Runtime; None - выражение не векторизуется"""
+        if node.type_name not in _NUMERIC:
+            return None
+        if isinstance(node, Ast.Var):
+            return f's{node.slot}'
+        if isinstance(node, Ast.Literal):
+            # Литерал передаётся значением: repr бесконечности - не код Python
+            name = f'_c{len(self._constants)}'
+            self._constants[name] = node.value.value
+            return name
+        if isinstance(node, Ast.Unary):
+            operand = self._expression(node.operand)
+            if operand is None:
+                return None
+            if node.op == Ast.OP_NOT:
+                return f'(0 if {operand} else 1)'
+            return f'(-{operand})' if node.op == Ast.OP_NEG else operand
+        if not isinstance(node, Ast.Binary):
+            return None
+
+        left = self._expression(node.left)
+        right = self._expression(node.right)
+        if left is None or right is None:
+            return None
+        op = node.op
+        if op == Ast.OP_AND or op == Ast.OP_OR:
+            keyword = 'and' if op == Ast.OP_AND else 'or'
+            return f'(1 if ({left} {keyword} {right}) else 0)'
+        if op in _COMPARISON_SYMBOLS:
+            return f'(1 if {left} {_COMPARISON_SYMBOLS[op]} {right} else 0)'
+        if op == Ast.OP_DIV:
+            # Деление на ноль прерывает часть, ошибку сообщает обычное исполнение
+            return f'(float({left}) / float({right}))'
+        if op == Ast.OP_MOD:
+            if node.left.type_name != 'int' or node.right.type_name != 'int':
+                return None
+            return f'({left} % {right})'
+        return f'({left} {Ast.BINARY_SYMBOLS[op]} {right})'
+
+
+def _additive_terms(node: Ast.Node, negative: bool, terms: List[Tuple[bool, Ast.Node]]):
+    """Слагаемые целой цепочки сложений и вычитаний со знаками (True - вычитается)"""
+    if isinstance(node, Ast.Binary) and node.op in (Ast.OP_ADD, Ast.OP_SUB) and node.type_name == 'int':
+        _additive_terms(node.left, negative, terms)
+        _additive_terms(node.right, negative != (node.op == Ast.OP_SUB), terms)
+    else:
+        terms.append((negative, node))
+
+
+def _typed(node: Ast.Node, type_name: str) -> Ast.Node:
+    node.type_name = type_name
+    return node
+
+
+def _same(left: Ast.Node, right: Ast.Node) -> bool:
+    """Структурное равенство выражений"""
+    if left.__class__ is not right.__class__:
+        return False
+    if isinstance(left, Ast.Binary):
+        return left.op == right.op and _same(left.left, right.left) and _same(left.right, right.right)
+    if isinstance(left, Ast.Unary):
+        return left.op == right.op and _same(left.operand, right.operand)
+    if isinstance(left, Ast.Var):
+        return left.slot == right.slot
+    if isinstance(left, Ast.Literal):
+        return left.type_name == right.type_name and repr(left.value.value) == repr(right.value.value)
+    return False
@@ -0,0 +1,497 @@
+"""
+Оптимизации программы над графом потока управления (модуль ControlFlow)
+Уровни, как у компиляторов:
+    -O0 - без оптимизаций (только свёртка констант ConstantFolder при разборе);
+    -O1 - распространение констант, удаление недостижимого кода и мёртвых присваиваний;
+    -O2 - дополнительно устранение общих подвыражений в базовом блоке
+          и вынос инвариантов из циклов.
+Ошибки исполнения сохраняются: вычисление, которое может завершиться ошибкой
+(деление, операции над строками, смешанная арифметика, чтение переменной без
+гарантированного объявления), никогда не переносится, не объединяется с другим
+и не удаляется. Ошибочные операции над константами остаются вычислением, как и
+в ConstantFolder. Переносятся только вычисления без ошибок и побочных эффектов,
+поэтому вынос из цикла, который не выполнится ни разу, ничего не меняет
+"""
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from Runtime import Runtime, Value, NUMERIC_TYPES
+from ConstantFolder import ConstantFolder, MAX_FOLDED_STRING, MAX_FOLDED_INT_BITS
+from ControlFlow import (
+    ControlFlowGraph, BasicBlock, Goto, Branch, Loop,
+    build_graph, expression_key, reads, temporary, declare_temporary,
+)
+import Ast
+
+
+LEVELS = (0, 1, 2)
+
+_COMPARISONS = (Ast.OP_LT, Ast.OP_LE, Ast.OP_GT, Ast.OP_GE)
+_ARITHMETIC = (Ast.OP_ADD, Ast.OP_SUB, Ast.OP_MUL)
+_TOTAL = (Ast.OP_EQ, Ast.OP_NE, Ast.OP_AND, Ast.OP_OR)
+
+
+def safe_operation(node: Ast.Node) -> bool:
+    """Не завершается ли ошибкой сама операция узла при операндах известных типов"""
+    if isinstance(node, Ast.Unary):
+        return node.op == Ast.OP_NOT or node.operand.type_name in NUMERIC_TYPES
+    left, right = node.left.type_name, node.right.type_name
+    if left is None or right is None:
+        return False
+    if node.op in _TOTAL:
+        return True
+    if node.op in _COMPARISONS:
+        return left in NUMERIC_TYPES and right in NUMERIC_TYPES or left == right == 'string'
+    if node.op in _ARITHMETIC:
+        # Смешанная арифметика переводит int во float и может переполниться,
+        # строки ограничены памятью программы
+        return left == right and left in NUMERIC_TYPES
+    divisor = node.right
+    if not isinstance(divisor, Ast.Literal) or divisor.value.value == 0:
+        return False
+    if node.op == Ast.OP_MOD:
+        return left == right == 'int'
+    return left == right == 'float'
+
+
+def is_safe(node: Ast.Node) -> bool:
+    """Вычисление выражения не может завершиться ошибкой"""
+    if isinstance(node, Ast.Literal):
+        return True
+    if isinstance(node, Ast.Var):
+        return not node.guarded and node.type_name is not None
+    if isinstance(node, Ast.Unary):
+        return is_safe(node.operand) and safe_operation(node)
+    return is_safe(node.left) and is_safe(node.right) and safe_operation(node)
+
+
+def _computation(node: Ast.Node) -> bool:
+    """Операция с известным типом результата, которую стоит сохранить во временной переменной"""
+    return isinstance(node, (Ast.Binary, Ast.Unary)) and node.type_name is not None
+
+
+def _expressions(block: BasicBlock) -> List[Optional[Ast.Node]]:
+    """Выражения операторов блока и условие ветвления в конце блока"""
+    result = [node.expr for node in block.instructions]
+    if isinstance(block.terminator, (Branch, Loop)):
+        result.append(block.terminator.cond)
+    return result
+
+
+def _set_expression(block: BasicBlock, index: int, expr: Ast.Node):
+    if index < len(block.instructions):
+        block.instructions[index].expr = expr
+    else:
+        block.terminator.cond = expr
+
+
+def _instructions(blocks: List[BasicBlock]) -> List[Ast.Node]:
+    return [node for block in blocks for node in block.instructions]
+
+
+def _written(node: Ast.Node) -> Optional[int]:
+    return None if isinstance(node, Ast.Print) else node.slot
+
+
+class ConstantPropagation:
+    """Переменная, у которой на всех путях к чтению одно и то же известное
+    значение, заменяется литералом, и выражение сворачивается заново.
+    Константа на всех путях означает и объявление на всех путях, поэтому
+    проверка объявления при замене не теряется.
+    Граф обходится по структуре if и while, как AST в Resolver: ветви
+    обходятся с отдельными значениями и сливаются в точке слияния, ветвь,
+    исключённая константным условием, не обходится, а переменные, изменяемые
+    в цикле, на входе в цикл считаются неизвестными"""
+
+    def __init__(self):
+        self._folder = ConstantFolder()
+        self._semantics = Runtime()
+        self._graph: Optional[ControlFlowGraph] = None
+        # Состояние хранит ключи (тип, repr значения), которые сравниваются
+        # без Value; значения констант - по ключам
+        self._values: Dict[Tuple[str, str], Value] = {}
+
+    def run(self, graph: ControlFlowGraph):
+        self._graph = graph
+        self._region(graph.entry, None, {})
+
+    def _region(self, block: Optional[BasicBlock], stop: Optional[BasicBlock], state: Dict[int, Tuple[str, str]]):
+        while block is not None and block is not stop:
+            self._transfer(block, state)
+            terminator = block.terminator
+            if isinstance(terminator, Goto):
+                block = terminator.target
+            elif isinstance(terminator, Branch):
+                terminator.cond = self._substitute(terminator.cond, state)
+                if isinstance(terminator.cond, Ast.Literal):
+                    taken = terminator.then if terminator.cond.value.is_truthy() else terminator.orelse
+                    self._region(taken, terminator.join, state)
+                else:
+                    then_state = dict(state)
+                    self._region(terminator.then, terminator.join, then_state)
+                    self._region(terminator.orelse, terminator.join, state)
+                    common = state.items() & then_state.items()
+                    state.clear()
+                    state.update(common)
+                block = terminator.join
+            elif isinstance(terminator, Loop):
+                for node in _instructions(self._graph.loop_blocks(block)):
+                    if not isinstance(node, Ast.Print):
+                        state.pop(node.slot, None)
+                terminator.cond = self._substitute(terminator.cond, state)
+                cond = terminator.cond
+                if not isinstance(cond, Ast.Literal) or cond.value.is_truthy():
+                    self._region(terminator.body, block, dict(state))
+                block = terminator.exit
+            else:
+                block = None
+
+    def _transfer(self, block: BasicBlock, state: Dict[int, Tuple[str, str]]):
+        types = self._graph.types
+        for node in block.instructions:
+            expr = node.expr
+            if expr is not None:
+                expr = node.expr = self._substitute(expr, state)
+            if isinstance(node, Ast.Print):
+                continue
+            target = types[node.slot]
+            if expr is None:
+                value = self._semantics._get_default_value(node.type_name)
+            else:
+                value = expr.value if isinstance(expr, Ast.Literal) else None
+            if value is not None and target is not None and self._constant(value, target):
+                value = self._convert(value, target)
+            else:
+                value = None
+            if value is None:
+                state.pop(node.slot, None)
+                continue
+            key = (value.type_name, repr(value.value))
+            self._values.setdefault(key, value)
+            state[node.slot] = key
+
+    def _constant(self, value: Value, target: str) -> bool:
+        if not self._semantics._is_compatible_type(value.type_name, target):
+            return False
+        # Очень большое целое не переводится в текст, как и в ConstantFolder
+        if value.type_name == 'int' and value.value.bit_length() > MAX_FOLDED_INT_BITS:
+            return False
+        # Длинная строка не размножается литералами
+        return target != 'string' or len(str(value.value)) <= MAX_FOLDED_STRING
+
+    def _convert(self, value: Value, target: str) -> Optional[Value]:
+        """Значение после приведения к типу переменной; None, если приведение
+        завершается ошибкой: она произойдёт при исполнении"""
+        try:
+            return self._semantics._convert_type(value, target)
+        except (OverflowError, ValueError):
+            return None
+
+    def _substitute(self, node: Ast.Node, state: Dict[int, Tuple[str, str]]) -> Ast.Node:
+        """Выражение с подставленными константами; неизменённые узлы не копируются"""
+        if isinstance(node, Ast.Var):
+            key = state.get(node.slot)
+            return node if key is None else Ast.Literal(self._values[key])
+        if isinstance(node, Ast.Binary):
+            left = self._substitute(node.left, state)
+            right = self._substitute(node.right, state)
+            if left is node.left and right is node.right:
+                return node
+            copy = Ast.Binary(node.op, left, right)
+        elif isinstance(node, Ast.Unary):
+            operand = self._substitute(node.operand, state)
+            if operand is node.operand:
+                return node
+            copy = Ast.Unary(node.op, operand)
+        else:
+            return node
+        copy.type_name = node.type_name
+        return self._folder.fold_expression(copy)
+
+
+class UnreachableCodeElimination:
+    """Ветвление с известным условием становится переходом, цикл с ложным
+    условием - переходом на выход; блоки, ставшие недостижимыми, удаляются"""
+
+    def run(self, graph: ControlFlowGraph):
+        for block in graph.order():
+            terminator = block.terminator
+            if not isinstance(terminator, (Branch, Loop)) or not isinstance(terminator.cond, Ast.Literal):
+                continue
+            truthy = terminator.cond.value.is_truthy()
+            if isinstance(terminator, Branch):
+                block.terminator = Goto(terminator.then if truthy else terminator.orelse)
+            elif not truthy:
+                block.terminator = Goto(terminator.exit)
+        graph.remove_unreachable()
+
+
+class DeadStoreElimination:
+    """Удаляет присваивание, значение которого не читается ни на одном пути
+    дальше. Чтения в самих удаляемых присваиваниях не учитываются, поэтому
+    удаляется и накопление, которое читает только себя (s = s + 1).
+    Удаляются только присваивания без проверки объявления, с вычислением
+    без ошибок и числовой переменной того же типа, что и выражение: строки
+    учитываются ограничением памяти, а перевод большого int во float
+    переполняется, поэтому такие присваивания остаются наблюдаемыми"""
+
+    def run(self, graph: ControlFlowGraph):
+        order = graph.order()
+        live_in: Dict[BasicBlock, Set[int]] = {block: set() for block in order}
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(order):
+                live = self._transfer(graph, block, self._live_out(block, live_in), False)
+                if live != live_in[block]:
+                    live_in[block] = live
+                    changed = True
+
+        for block in order:
+            self._transfer(graph, block, self._live_out(block, live_in), True)
+
+    @staticmethod
+    def _live_out(block: BasicBlock, live_in: Dict[BasicBlock, Set[int]]) -> Set[int]:
+        live: Set[int] = set()
+        for successor in block.successors():
+            live |= live_in[successor]
+        return live
+
+    def _transfer(self, graph: ControlFlowGraph, block: BasicBlock, live: Set[int], remove: bool) -> Set[int]:
+        if isinstance(block.terminator, (Branch, Loop)):
+            reads(block.terminator.cond, live)
+        kept = []
+        for node in reversed(block.instructions):
+            if not isinstance(node, Ast.Print):
+                if self._dead(graph, node, live):
+                    continue
+                live.discard(node.slot)
+            if node.expr is not None:
+                reads(node.expr, live)
+            kept.append(node)
+        if remove:
+            kept.reverse()
+            block.instructions = kept
+        return live
+
+    @staticmethod
+    def _dead(graph: ControlFlowGraph, node: Ast.Node, live: Set[int]) -> bool:
+        return (isinstance(node, Ast.Assignment) and node.slot not in live and not node.guarded
+                and graph.types[node.slot] in NUMERIC_TYPES and graph.types[node.slot] == node.expr.type_name
+                and is_safe(node.expr))
+
+
+class _Common:
+    """Повторяющееся подвыражение блока между изменениями его переменных"""
+
+    __slots__ = ('key', 'node', 'reads', 'first', 'last', 'count', 'var')
+
+    def __init__(self, key: Tuple, node: Ast.Node, first: int):
+        self.key = key
+        self.node = node
+        self.reads: Set[int] = set()
+        reads(node, self.reads)
+        self.first = first
+        self.last = first
+        self.count = 0
+        self.var: Optional[Ast.Var] = None
+
+
+class CommonSubexpressionElimination:
+    """Подвыражение, вычисляемое в базовом блоке несколько раз при неизменных
+    переменных, вычисляется один раз во временную переменную перед оператором
+    с его первым вхождением"""
+
+    def run(self, graph: ControlFlowGraph):
+        for block in graph.order():
+            # Заголовок цикла не содержит операторов: условие вычисляется на каждом шаге
+            if not isinstance(block.terminator, Loop):
+                self._run_block(graph, block)
+
+    def _run_block(self, graph: ControlFlowGraph, block: BasicBlock):
+        expressions = _expressions(block)
+        finished: List[_Common] = []
+        active: Dict[Tuple, _Common] = {}
+        for index, expr in enumerate(expressions):
+            if expr is not None:
+                found: List[Ast.Node] = []
+                _safe_computations(expr, found)
+                for node in found:
+                    key = expression_key(node)
+                    common = active.get(key)
+                    if common is None:
+                        common = active[key] = _Common(key, node, index)
+                    common.last = index
+                    common.count += 1
+            slot = _written(block.instructions[index]) if index < len(block.instructions) else None
+            if slot is not None:
+                for key, common in list(active.items()):
+                    if slot in common.reads:
+                        finished.append(active.pop(key))
+        finished.extend(active.values())
+
+        repeated = [common for common in finished if common.count > 1]
+        repeated = [common for common in repeated if not _nested(common, repeated)]
+        if not repeated:
+            return
+        # Вложенные подвыражения объявляются раньше содержащих их
+        repeated.sort(key=lambda common: (common.first, len(repr(common.key))))
+        declarations: Dict[int, List[Ast.Node]] = {}
+        for common in repeated:
+            slot = graph.new_temporary(common.node.type_name)
+            expr = self._replace(_copy(common.node), [other for other in repeated if other.var is not None
+                                                      and other.first <= common.first <= other.last])
+            declarations.setdefault(common.first, []).append(declare_temporary(graph, slot, expr))
+            common.var = temporary(graph, slot)
+
+        for index, expr in enumerate(expressions):
+            if expr is not None:
+                visible = [common for common in repeated if common.first <= index <= common.last]
+                _set_expression(block, index, self._replace(expr, visible))
+        instructions = []
+        for index, node in enumerate(block.instructions):
+            instructions.extend(declarations.get(index, ()))
+            instructions.append(node)
+        instructions.extend(declarations.get(len(block.instructions), ()))
+        block.instructions = instructions
+
+    def _replace(self, node: Ast.Node, visible: List[_Common]) -> Ast.Node:
+        if not visible or not isinstance(node, (Ast.Binary, Ast.Unary)):
+            return node
+        key = expression_key(node)
+        for common in visible:
+            if common.key == key:
+                return _copy(common.var)
+        if isinstance(node, Ast.Binary):
+            node.left = self._replace(node.left, visible)
+            node.right = self._replace(node.right, visible)
+        else:
+            node.operand = self._replace(node.operand, visible)
+        return node
+
+
+def _safe_computations(node: Ast.Node, found: List[Ast.Node]) -> bool:
+    """Добавляет в found подвыражения без ошибок (вложенные раньше содержащих);
+    возвращает, безопасно ли всё выражение"""
+    if isinstance(node, Ast.Binary):
+        left = _safe_computations(node.left, found)
+        right = _safe_computations(node.right, found)
+        safe = left and right and safe_operation(node)
+    elif isinstance(node, Ast.Unary):
+        safe = _safe_computations(node.operand, found) and safe_operation(node)
+    else:
+        return is_safe(node)
+    if safe and node.type_name is not None:
+        found.append(node)
+    return safe
+
+
+def _nested(common: _Common, repeated: List[_Common]) -> bool:
+    """Все вхождения подвыражения лежат внутри вхождений одного содержащего его"""
+    for other in repeated:
+        if (other is not common and other.count == common.count and other.first == common.first
+                and other.last == common.last and _contains(other.key, common.key)):
+            return True
+    return False
+
+
+def _contains(outer: Tuple, inner: Tuple) -> bool:
+    return any(part == inner or part[0] in (Ast.Binary, Ast.Unary) and _contains(part, inner) for part in outer[2:])
+
+
+def _copy(node: Ast.Node) -> Ast.Node:
+    if isinstance(node, Ast.Binary):
+        copy = Ast.Binary(node.op, _copy(node.left), _copy(node.right))
+    elif isinstance(node, Ast.Unary):
+        copy = Ast.Unary(node.op, _copy(node.operand))
+    elif isinstance(node, Ast.Var):
+        copy = Ast.Var(node.name)
+        copy.slot = node.slot
+        copy.guarded = node.guarded
+    else:
+        return node
+    copy.type_name = node.type_name
+    return copy
+
+
+class LoopInvariantCodeMotion:
+    """Наибольшие подвыражения тела и условия цикла без ошибок, переменные
+    которых в цикле не изменяются, вычисляются один раз в блоке перед циклом.
+    Внешние циклы обрабатываются раньше вложенных: инвариант внешнего цикла
+    выносится за него целиком"""
+
+    def run(self, graph: ControlFlowGraph):
+        predecessors = graph.predecessors()
+        for header in graph.order():
+            if not isinstance(header.terminator, Loop):
+                continue
+            blocks = graph.loop_blocks(header)
+            assigned = {node.slot for node in _instructions(blocks) if not isinstance(node, Ast.Print)}
+            # Единственный вход в цикл, кроме обратного перехода
+            preheader = next(source for source in predecessors[header] if not source.terminator.back)
+            hoisted: Dict[Tuple, Ast.Var] = {}
+
+            def hoist(node: Ast.Node) -> Ast.Node:
+                if not _computation(node):
+                    return node
+                key = expression_key(node)
+                var = hoisted.get(key)
+                if var is None:
+                    slot = graph.new_temporary(node.type_name)
+                    preheader.instructions.append(declare_temporary(graph, slot, node))
+                    var = hoisted[key] = temporary(graph, slot)
+                return _copy(var)
+
+            for block in [header] + blocks:
+                for index, expr in enumerate(_expressions(block)):
+                    if expr is not None:
+                        _set_expression(block, index, self._rewrite(expr, assigned, hoist))
+
+    def _rewrite(self, node: Ast.Node, assigned: Set[int], hoist: Callable[[Ast.Node], Ast.Node]) -> Ast.Node:
+        return hoist(node) if self._invariant(node, assigned, hoist) else node
+
+    def _invariant(self, node: Ast.Node, assigned: Set[int], hoist: Callable[[Ast.Node], Ast.Node]) -> bool:
+        """Инвариантно ли выражение; инвариантные части неинвариантного выражения выносятся"""
+        if isinstance(node, Ast.Literal):
+            return True
+        if isinstance(node, Ast.Var):
+            return is_safe(node) and node.slot not in assigned
+        if isinstance(node, Ast.Unary):
+            operand = self._invariant(node.operand, assigned, hoist)
+            if operand and safe_operation(node):
+                return True
+            if operand:
+                node.operand = hoist(node.operand)
+            return False
+        left = self._invariant(node.left, assigned, hoist)
+        right = self._invariant(node.right, assigned, hoist)
+        if left and right and safe_operation(node):
+            return True
+        if left:
+            node.left = hoist(node.left)
+        if right:
+            node.right = hoist(node.right)
+        return False
+
+
+PASSES = {
+    0: (),
+    1: (ConstantPropagation, UnreachableCodeElimination, DeadStoreElimination),
+    2: (ConstantPropagation, UnreachableCodeElimination, CommonSubexpressionElimination,
+        LoopInvariantCodeMotion, DeadStoreElimination),
+}
+
+
+def optimize_graph(program: Ast.Program, level: int) -> ControlFlowGraph:
+    """Граф программы после оптимизаций уровня level"""
+    graph = build_graph(program)
+    for optimization in PASSES[level]:
+        optimization().run(graph)
+    return graph
+
+
+def optimize(program: Ast.Program, level: int) -> Ast.Program:
+    """Оптимизированная программа; на уровне 0 программа не изменяется"""
+    if level == 0:
+        return program
+    return optimize_graph(program, level).to_program()
@@ -0,0 +1,136 @@
+"""
+Приёмники вывода программы
+Исполнители передают каждую напечатанную строку методу write приёмника.
+Приёмник по умолчанию копит строки и пишет их в sys.stdout блоками,
+а не отдельным вызовом print() на каждую строку
+"""
+
+import os
+import sys
+from collections import deque
+from typing import Iterable, Optional, TextIO
+
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class OutputSink:
+    def write(self, line: str):
+        """Принимает одну напечатанную строку без перевода строки"""
+        raise NotImplementedError
+
+    def write_parts(self, parts: Iterable[str]):
+        """Принимает одну строку, переданную частями, например частями Rope"""
+        self.write(''.join(parts))
+
+    def flush(self):
+        pass
+
+    def get_output(self) -> str:
+        """Сохранённый вывод; строки сохраняет только CaptureSink"""
+        raise ValueError("Вывод программы не сохраняется: используйте CaptureSink")
+
+    def clear(self):
+        pass
+
+
+class NullSink(OutputSink):
+    """Отбрасывает вывод"""
+
+    def write(self, line: str):
+        pass
+
+    def write_parts(self, parts: Iterable[str]):
+        pass
+
+
+class _BufferedSink(OutputSink):
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self._lines = []
+        self._size = 0
+
+    def write(self, line: str):
+        self._lines.append(line)
+        self._size += len(line) + 1
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def write_parts(self, parts: Iterable[str]):
+        # Длинная строка пишется блоками по мере накопления частей, без сборки целиком
+        pending = []
+        size = self._size
+        for part in parts:
+            pending.append(part)
+            size += len(part)
+            if size >= self.buffer_size:
+                self.flush()
+                self._write_block(''.join(pending))
+                pending = []
+                size = 0
+        self.write(''.join(pending))
+
+    def flush(self):
+        if self._lines:
+            self._lines.append('')
+            text = '\n'.join(self._lines)
+            self._lines = []
+            self._size = 0
+            self._write_block(text)
+
+    def _write_block(self, text: str):
+        raise NotImplementedError
+
+
+class StreamSink(_BufferedSink):
+    """Блочная запись в текстовый поток, по умолчанию в текущий sys.stdout"""
+
+    def __init__(self, stream: Optional[TextIO] = None, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        super().__init__(buffer_size)
+        self.stream = stream if stream is not None else sys.stdout
+
+    def _write_block(self, text: str):
+        self.stream.write(text)
+        self.stream.flush()
+
+
+class FdSink(_BufferedSink):
+    """Блочная запись в файловый дескриптор в обход sys.stdout"""
+
+    def __init__(self, fd: int = 1, buffer_size: int = DEFAULT_BUFFER_SIZE, encoding: str = 'utf-8'):
+        super().__init__(buffer_size)
+        self.fd = fd
+        self.encoding = encoding
+
+    def _write_block(self, text: str):
+        data = memoryview(text.encode(self.encoding, 'surrogateescape'))
+        while data:
+            written = os.write(self.fd, data)
+            data = data[written:]
+
+
+class CaptureSink(OutputSink):
+    """Сохраняет строки в памяти; с limit хранит только последние limit строк"""
+
+    def __init__(self, limit: Optional[int] = None):
+        self.lines = deque(maxlen=limit) if limit is not None else []
+        self.write = self.lines.append
+
+    def get_output(self) -> str:
+        return '\n'.join(self.lines)
+
+    def clear(self):
+        self.lines.clear()
+
+
+class CountingSink(OutputSink):
+    """Только считает строки, например для измерений"""
+
+    def __init__(self):
+        self.count = 0
+
+    def write(self, line: str):
+        self.count += 1
+
+    def write_parts(self, parts: Iterable[str]):
+        self.count += 1
@@ -0,0 +1,129 @@
+"""
+Параллельное исполнение набора программ в пуле процессов
+Программы раздаются процессам пула порциями; каждый процесс исполняет свою порцию
+так же, как пакетный режим Driver, перехватывая вывод каждой программы. Результаты
+печатаются в исходном порядке программ, независимо от порядка завершения.
+Ошибки программ (InterpreterError, RecursionError и т.д.) остаются внутри процесса.
+Аварийное завершение процесса ломает пул: тогда незавершённые программы
+перезапускаются по одной, а программа, аварийно завершившая процесс и в
+одиночку, получает сообщение об ошибке вместо результата
+"""
+
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+
+import Driver
+from Driver import BatchResult
+from ProgramCache import ProgramCache
+from Runtime import ExecutionBudget
+
+
+CRASH_MESSAGE = "Ошибка: процесс исполнителя аварийно завершился"
+
+# Порций на процесс: несколько порций сглаживают разную длительность программ
+_CHUNKS_PER_WORKER = 4
+_MAX_CHUNK_SIZE = 64
+
+# Настройки исполнения в процессе пула, задаются инициализатором
+_worker_options: Dict[str, object] = {}
+
+
+def _init_worker(options: Dict[str, object]):
+    cache_dir = options.pop('cache_dir', None)
+    use_cache = options.pop('use_cache', True)
+    options['cache'] = ProgramCache(cache_dir) if use_cache else None
+    # Ограничения отсчитываются заново для каждой программы
+    options['budget'] = ExecutionBudget(options.pop('max_steps', None), options.pop('time_limit', None),
+                                        options.pop('max_memory', None))
+    _worker_options.update(options)
+
+
+def _run_chunk(paths: List[str]) -> List[BatchResult]:
+    results = []
+    for path in paths:
+        buffer = io.StringIO()
+        started = time.perf_counter()
+        with redirect_stdout(buffer):
+            error = Driver.run_file(path, **_worker_options)
+        results.append(BatchResult(path, error, time.perf_counter() - started, buffer.getvalue()))
+    return results
+
+
+def chunk_size_for(count: int, workers: int) -> int:
+    return max(1, min(_MAX_CHUNK_SIZE, -(-count // (workers * _CHUNKS_PER_WORKER))))
+
+
+def run_parallel(paths: List[str], engine: str = 'ast', lexer: str = 'fast', frontend: str = 'pratt',
+                 cache_dir: Optional[str] = None, use_cache: bool = True,
+                 workers: Optional[int] = None, chunk_size: Optional[int] = None,
+                 on_result: Optional[Callable[[BatchResult], None]] = None,
+                 max_steps: Optional[int] = None, time_limit: Optional[float] = None,
+                 max_memory: Optional[int] = None, opt_level: int = 0) -> List[BatchResult]:
+    """Исполняет программы в пуле процессов и возвращает результаты в порядке paths.
+    on_result вызывается для каждого результата в том же порядке, как только
+    готовы все предыдущие"""
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or chunk_size_for(len(paths), workers)
+    options = {
+        'engine': engine, 'lexer': lexer, 'frontend': frontend, 'opt_level': opt_level,
+        'cache_dir': cache_dir, 'use_cache': use_cache,
+        'max_steps': max_steps, 'time_limit': time_limit, 'max_memory': max_memory,
+    }
+
+    results: List[Optional[BatchResult]] = [None] * len(paths)
+    reported = 0
+
+    def report():
+        nonlocal reported
+        while reported < len(results) and results[reported] is not None:
+            if on_result is not None:
+                on_result(results[reported])
+            reported += 1
+
+    pending = [list(range(start, min(start + chunk_size, len(paths)))) for start in range(0, len(paths), chunk_size)]
+    # Первый проход - порциями, второй - по одной программе, третий - каждая в отдельном пуле
+    for isolated in (False, False, True):
+        if not pending:
+            break
+        failed = []
+        groups = [[chunk] for chunk in pending] if isolated else [pending]
+        for group in groups:
+            failed.extend(_run_round(paths, group, min(workers, len(group)), options, results, report))
+        pending = [[index] for chunk in failed for index in chunk]
+
+    for chunk in pending:
+        for index in chunk:
+            results[index] = BatchResult(paths[index], CRASH_MESSAGE, 0.0, CRASH_MESSAGE + '\n')
+    report()
+    return results
+
+
+def _run_round(paths: List[str], chunks: List[List[int]], workers: int, options: Dict[str, object],
+               results: List[Optional[BatchResult]], report: Callable[[], None]) -> List[List[int]]:
+    """Исполняет порции в новом пуле; возвращает порции, потерянные из-за аварии процесса"""
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dict(options),)) as pool:
+        futures = {pool.submit(_run_chunk, [paths[index] for index in chunk]): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                chunk_results = future.result()
+            except BrokenProcessPool:
+                failed.append(chunk)
+                continue
+            for index, result in zip(chunk, chunk_results):
+                results[index] = result
+            report()
+    return failed
+
+
+def print_result(result: BatchResult):
+    print(f"==> {result.path} <==")
+    sys.stdout.write(result.output)
+    sys.stdout.flush()
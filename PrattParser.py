@@ -0,0 +1,335 @@
+"""
+Парсер рекурсивного спуска, строящий AST без ANTLR
+Реализует грамматику Expr.g4: операторы разбираются рекурсивным спуском,
+выражения - подъёмом по приоритетам (Pratt). Токены берутся из разбиения
+Scanner без создания объектов токенов и без импорта ANTLR. Программа с
+лексической или синтаксической ошибкой отвергается с ParseError, как и
+строгий разбор ExprParser.
+
+Запуск модуля сверяет парсер с ExprParser (с токенами ExprLexer и FastLexer)
+на примерах, их искажениях и наборе ошибочных программ:
+    python PrattParser.py [файлы...]
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from Scanner import INVALID_TYPE, scan, token_type
+from Runtime import Value, int_value, ParseError, decode_string_literal
+import Ast
+
+
+# Приоритеты бинарных операторов; все операторы левоассоциативны
+_BINARY = {
+    '||': (1, Ast.OP_OR),
+    '&&': (2, Ast.OP_AND),
+    '<': (3, Ast.OP_LT), '<=': (3, Ast.OP_LE), '>': (3, Ast.OP_GT), '>=': (3, Ast.OP_GE),
+    '==': (3, Ast.OP_EQ), '!=': (3, Ast.OP_NE),
+    '+': (4, Ast.OP_ADD), '-': (4, Ast.OP_SUB),
+    '*': (5, Ast.OP_MUL), '/': (5, Ast.OP_DIV), '%': (5, Ast.OP_MOD),
+}
+
+_KEYWORDS = frozenset(('if', 'else', 'while', 'print') + Ast.TYPE_NAMES)
+_DIGITS = frozenset('0123456789')
+_ID_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+
+
+class PrattParser:
+    def __init__(self):
+        self._text = ''
+        self._pairs = []
+        self._tokens: List[str] = []
+        self._index = 0
+        # Одинаковые литералы разделяют одно разобранное значение
+        self._literals: Dict[str, Value] = {}
+        self._statements = {
+            'int': self._parse_declaration,
+            'float': self._parse_declaration,
+            'string': self._parse_declaration,
+            'if': self._parse_if,
+            'while': self._parse_while,
+            'print': self._parse_print,
+            '{': self._parse_block,
+        }
+
+    def parse(self, text: str) -> Ast.Program:
+        # Разбиение завершается пустым токеном, он же признак конца текста
+        self._text = text
+        self._pairs = scan(text)
+        self._tokens = [token for _, token in self._pairs]
+        self._index = 0
+        body = []
+        while self._tokens[self._index]:
+            body.append(self._parse_statement())
+        return Ast.Program(body)
+
+    # Операторы
+
+    def _parse_statement(self) -> Ast.Node:
+        token = self._tokens[self._index]
+        parse = self._statements.get(token)
+        if parse is not None:
+            return parse()
+        if self._is_identifier(token):
+            return self._parse_assignment()
+        raise self._error("ожидался оператор")
+
+    def _parse_declaration(self) -> Ast.Node:
+        type_name = self._tokens[self._index]
+        self._index += 1
+        name = self._expect_identifier()
+        expr = None
+        if self._tokens[self._index] == '=':
+            self._index += 1
+            expr = self._parse_expression()
+        self._expect(';')
+        return Ast.Declaration(name, type_name, expr)
+
+    def _parse_assignment(self) -> Ast.Node:
+        name = self._tokens[self._index]
+        self._index += 1
+        self._expect('=')
+        expr = self._parse_expression()
+        self._expect(';')
+        return Ast.Assignment(name, expr)
+
+    def _parse_if(self) -> Ast.Node:
+        self._index += 1
+        cond = self._parse_parenthesized()
+        then = self._parse_statement()
+        orelse = None
+        # else относится к ближайшему if, как и в ExprParser
+        if self._tokens[self._index] == 'else':
+            self._index += 1
+            orelse = self._parse_statement()
+        return Ast.If(cond, then, orelse)
+
+    def _parse_while(self) -> Ast.Node:
+        self._index += 1
+        cond = self._parse_parenthesized()
+        return Ast.While(cond, self._parse_statement())
+
+    def _parse_print(self) -> Ast.Node:
+        self._index += 1
+        expr = self._parse_parenthesized()
+        self._expect(';')
+        return Ast.Print(expr)
+
+    def _parse_block(self) -> Ast.Node:
+        self._index += 1
+        tokens = self._tokens
+        body = []
+        while tokens[self._index] != '}':
+            if not tokens[self._index]:
+                raise self._error("ожидалась '}'")
+            body.append(self._parse_statement())
+        self._index += 1
+        return Ast.Block(body)
+
+    def _parse_parenthesized(self) -> Ast.Node:
+        """Выражение в скобках"""
+        self._expect('(')
+        expr = self._parse_expression()
+        self._expect(')')
+        return expr
+
+    # Выражения
+
+    def _parse_expression(self, min_precedence: int = 1) -> Ast.Node:
+        left = self._parse_unary()
+        tokens = self._tokens
+        while True:
+            operator = _BINARY.get(tokens[self._index])
+            if operator is None or operator[0] < min_precedence:
+                return left
+            precedence, op = operator
+            self._index += 1
+            left = Ast.Binary(op, left, self._parse_expression(precedence + 1))
+
+    def _parse_unary(self) -> Ast.Node:
+        token = self._tokens[self._index]
+        op = Ast.UNARY_OPS.get(token)
+        if op is not None:
+            # Унарные операторы связывают сильнее любых бинарных
+            self._index += 1
+            return Ast.Unary(op, self._parse_unary())
+        if token == '(':
+            return self._parse_parenthesized()
+
+        first = token[:1]
+        if first in _DIGITS or (first == "'" and len(token) > 1 and token[-1] == "'"):
+            self._index += 1
+            return Ast.Literal(self._literal(token))
+        if self._is_identifier(token):
+            self._index += 1
+            return Ast.Var(token)
+        raise self._error("ожидалось выражение")
+
+    def _literal(self, text: str) -> Value:
+        value = self._literals.get(text)
+        if value is None:
+            if text[0] == "'":
+                value = Value(decode_string_literal(text), 'string')
+            elif '.' in text:
+                value = Value(float(text), 'float')
+            else:
+                value = int_value(int(text))
+            self._literals[text] = value
+        return value
+
+    # Вспомогательные методы
+
+    @staticmethod
+    def _is_identifier(token: str) -> bool:
+        return token[:1] in _ID_START and token not in _KEYWORDS
+
+    def _expect(self, expected: str):
+        if self._tokens[self._index] != expected:
+            raise self._error(f"ожидалось '{expected}'")
+        self._index += 1
+
+    def _expect_identifier(self) -> str:
+        token = self._tokens[self._index]
+        if not self._is_identifier(token):
+            raise self._error("ожидалось имя переменной")
+        self._index += 1
+        return token
+
+    def _error(self, message: str) -> ParseError:
+        # Позиция вычисляется только при ошибке: до неё токены не хранят координат
+        skipped, token = self._pairs[self._index]
+        position = sum(len(skipped) + len(token) for skipped, token in self._pairs[:self._index]) + len(skipped)
+        line = self._text.count('\n', 0, position) + 1
+        column = position - (self._text.rfind('\n', 0, position) + 1)
+
+        if not token:
+            found = "конец программы"
+        elif token_type(token) == INVALID_TYPE:
+            found = f"нераспознанный текст '{token}'"
+        else:
+            found = f"'{token}'"
+        return ParseError(f"Синтаксическая ошибка в строке {line}:{column}: {message}, найдено {found}")
+
+
+def _dump(node) -> object:
+    """Структура AST без полей, заполняемых после разбора"""
+    if isinstance(node, list):
+        return [_dump(item) for item in node]
+    if isinstance(node, Value):
+        return node.type_name, node.value
+    if not isinstance(node, Ast.Node):
+        return node
+    fields = [name for name in node.__slots__ if name not in ('slot', 'guarded', 'type_name', 'names', 'types')]
+    if isinstance(node, (Ast.Declaration, Ast.Literal)):
+        fields.append('type_name')
+    return (node.__class__.__name__,) + tuple(_dump(getattr(node, name)) for name in fields)
+
+
+def _position(message: str) -> tuple:
+    """Строка и столбец из сообщения об ошибке ANTLR или ParseError"""
+    match = re.search(r'(\d+):(\d+)', message)
+    return (int(match.group(1)), int(match.group(2))) if match else (0, 0)
+
+
+def _antlr_result(text: str, lexer_class) -> tuple:
+    """Результат разбора ExprParser: AST или позиция первой ошибки"""
+    from antlr4 import CommonTokenStream, InputStream
+    from AstBuilder import AstBuilder
+    from ExprParser import ExprParser
+    from FastLexer import _ErrorCollector
+
+    lexer = lexer_class(InputStream(text))
+    parser = ExprParser(CommonTokenStream(lexer))
+    errors = _ErrorCollector()
+    for recognizer in (lexer, parser):
+        recognizer.removeErrorListeners()
+        recognizer.addErrorListener(errors)
+    tree = parser.program()
+    if errors.messages:
+        # Лексер читает токены с опережением, поэтому его ошибка может быть
+        # сообщена раньше синтаксической ошибки в более ранней позиции
+        first = min(errors.messages, key=_position)
+        return 'ошибка', _position(first), first
+    return 'AST', _dump(AstBuilder().visit(tree)), None
+
+
+def compare_with_antlr(text: str) -> Optional[str]:
+    """Сравнивает результат разбора с ExprParser при токенах ExprLexer и FastLexer:
+    все должны построить одно и то же AST или отвергнуть программу с ошибкой
+    в одной и той же позиции; возвращает описание расхождения"""
+    from ExprLexer import ExprLexer
+    from FastLexer import FastLexer
+
+    results = []
+    for lexer_class in (ExprLexer, FastLexer):
+        try:
+            results.append(_antlr_result(text, lexer_class))
+        except Exception as e:
+            return f"ExprParser с {lexer_class.__name__}: исключение {e.__class__.__name__}: {e}"
+    expected, with_fast_lexer = results
+    if expected[:2] != with_fast_lexer[:2]:
+        return (f"ExprParser: с ExprLexer {expected[0]} {expected[2] or ''}, "
+                f"с FastLexer {with_fast_lexer[0]} {with_fast_lexer[2] or ''}")
+
+    kind, expected_result, message = expected
+    try:
+        actual = _dump(PrattParser().parse(text))
+    except ParseError as e:
+        if kind == 'AST':
+            return f"ExprParser принимает программу, PrattParser отвергает: {e}"
+        if _position(str(e)) != expected_result:
+            return f"различаются позиции ошибки: ExprParser {message}, PrattParser {e}"
+        return None
+    except RecursionError:
+        return None if kind == 'ошибка' else "PrattParser: превышена глубина рекурсии"
+    if kind == 'ошибка':
+        return f"ExprParser отвергает программу ({message}), PrattParser принимает"
+    if expected_result != actual:
+        return "различаются построенные AST"
+    return None
+
+
+def mutations(text: str):
+    """Программа и её искажения: удаление, повтор и перестановка соседних токенов"""
+    tokens = [skipped + token for skipped, token in scan(text)]
+    yield text
+    for index in range(len(tokens) - 1):
+        yield ''.join(tokens[:index] + tokens[index + 1:])
+        yield ''.join(tokens[:index + 1] + tokens[index:])
+        yield ''.join(tokens[:index] + [tokens[index + 1], tokens[index]] + tokens[index + 2:])
+
+
+def main():
+    import glob
+    import os
+    import sys
+
+    from FastLexer import MALFORMED
+
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'examples', '*.txt')))
+    sources = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            sources.append((path, f.read()))
+    if not sys.argv[1:]:
+        sources.extend((f"ошибочная программа {text!r}", text) for text in MALFORMED)
+
+    failures = 0
+    for path, text in sources:
+        checked = 0
+        difference = None
+        for variant in mutations(text):
+            checked += 1
+            difference = compare_with_antlr(variant)
+            if difference is not None:
+                break
+        if difference is None:
+            print(f"OK      {path}: {checked} вариантов")
+        else:
+            failures += 1
+            print(f"ОТЛИЧИЕ {path}: {difference}\n{variant}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
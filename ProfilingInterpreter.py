@@ -0,0 +1,229 @@
+"""
+Профилировщик исполнения по строкам исходного текста
+ProfilingInterpreter - подкласс Interpreter, который для каждого оператора и
+выражения (позиция ctx.start.line/ctx.start.column) считает число исполнений,
+полное время (вместе с вложенными узлами) и собственное время. Сам Interpreter
+не изменяется, поэтому без профилирования издержек нет.
+
+Отчёты: исходный текст с пометками по строкам, самые затратные узлы и файл
+свёрнутых стеков (строки "program;while 3:0;print 4:4 120", время в мкс)
+для flamegraph.pl, speedscope и подобных инструментов:
+    python Driver.py --engine tree --profile [--profile-stacks файл] программа.txt
+"""
+
+import time
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from ExprParser import ExprParser
+from Interpreter import Interpreter
+from OutputSink import OutputSink
+from Runtime import ExecutionBudget
+import Driver
+
+
+# Профилируемые узлы дерева разбора; StatementContext только выбирает
+# вложенный оператор, а литералы и типы входят в собственное время родителя
+_KINDS = {
+    ExprParser.DeclarationContext: 'declaration',
+    ExprParser.AssignmentContext: 'assignment',
+    ExprParser.IfStatementContext: 'if',
+    ExprParser.WhileStatementContext: 'while',
+    ExprParser.PrintStatementContext: 'print',
+    ExprParser.BlockContext: 'block',
+    ExprParser.ExpressionContext: 'expression',
+}
+
+_STATEMENT_KINDS = frozenset(('declaration', 'assignment', 'if', 'while', 'print', 'block'))
+
+_ROOT_LABEL = 'program'
+_TEXT_WIDTH = 40
+
+
+class NodeStats:
+    __slots__ = ('kind', 'line', 'column', 'text', 'count', 'inclusive', 'exclusive', 'parent')
+
+    def __init__(self, kind: str, line: int, column: int, text: str, parent: Optional['NodeStats']):
+        self.kind = kind
+        self.line = line
+        self.column = column
+        self.text = text
+        self.count = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        # Ближайший профилируемый предок в дереве разбора
+        self.parent = parent
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind} {self.line}:{self.column}"
+
+
+class Profile:
+    """Статистика узлов. В языке нет функций, поэтому стек исполнения узла всегда
+    совпадает с цепочкой его профилируемых предков в дереве разбора: собственное
+    время и свёрнутые стеки выводятся из полного времени после исполнения"""
+
+    def __init__(self):
+        self.nodes: Dict[object, NodeStats] = {}
+        self.total = 0.0
+        # Собственное время программы вне профилируемых операторов
+        self.root_exclusive = 0.0
+
+    def finish(self):
+        """Вычисляет собственное время: полное время без полного времени дочерних узлов"""
+        self.root_exclusive = self.total
+        for stats in self.nodes.values():
+            stats.exclusive = stats.inclusive
+        for stats in self.nodes.values():
+            if stats.parent is None:
+                self.root_exclusive -= stats.inclusive
+            else:
+                stats.parent.exclusive -= stats.inclusive
+
+    def collapsed_stacks(self) -> List[str]:
+        """Строки формата свёрнутых стеков: метки через ';' и собственное время в мкс"""
+        lines = []
+        if int(self.root_exclusive * 1e6) > 0:
+            lines.append(f"{_ROOT_LABEL} {int(self.root_exclusive * 1e6)}")
+        for stats in self.nodes.values():
+            microseconds = int(stats.exclusive * 1e6)
+            if microseconds <= 0:
+                continue
+            labels = []
+            node = stats
+            while node is not None:
+                labels.append(node.label)
+                node = node.parent
+            labels.append(_ROOT_LABEL)
+            lines.append(f"{';'.join(reversed(labels))} {microseconds}")
+        return lines
+
+    def line_totals(self) -> Dict[int, Tuple[int, float, float]]:
+        """По строкам: число исполнений, полное и собственное время.
+        Полное время строки - сумма по узлам, чей профилируемый предок начинается на другой строке"""
+        totals: Dict[int, List] = {}
+        for stats in self.nodes.values():
+            entry = totals.setdefault(stats.line, [0, 0, 0.0, 0.0])
+            # Число исполнений строки - у первого оператора на ней, иначе у первого выражения
+            rank = (0 if stats.kind in _STATEMENT_KINDS else 1, stats.column)
+            if entry[1] == 0 or rank < entry[1]:
+                entry[0], entry[1] = stats.count, rank
+            if stats.parent is None or stats.parent.line != stats.line:
+                entry[2] += stats.inclusive
+            entry[3] += stats.exclusive
+        return {line: (count, inclusive, exclusive) for line, (count, _, inclusive, exclusive) in totals.items()}
+
+
+class ProfilingInterpreter(Interpreter):
+    def __init__(self, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None,
+                 clock=time.perf_counter):
+        super().__init__(sink, budget)
+        self.profile = Profile()
+        self._nodes = self.profile.nodes
+        self._clock = clock
+        # Стек исполняемых профилируемых узлов
+        self._contexts: List[object] = [None]
+
+    def visitProgram(self, ctx: ExprParser.ProgramContext):
+        # Статистика узлов создаётся до начала замера, чтобы её подготовка
+        # не попадала во время узлов
+        self._register(ctx)
+        started = self._clock()
+        try:
+            return super().visitProgram(ctx)
+        finally:
+            self.profile.total += self._clock() - started
+            self.profile.finish()
+
+    def visit(self, tree):
+        # Условие, вычисленное через _is_true, уже учтено: не считаем узел дважды
+        if tree.__class__ not in _KINDS or tree is self._contexts[-1]:
+            return tree.accept(self)
+        return self._profiled(tree, tree.accept, self)
+
+    def _is_true(self, ctx: ExprParser.ExpressionContext) -> bool:
+        if ctx is self._contexts[-1]:
+            return super()._is_true(ctx)
+        return self._profiled(ctx, super()._is_true, ctx)
+
+    def _profiled(self, ctx, function, argument):
+        stats = self._nodes[ctx]
+        contexts = self._contexts
+        contexts.append(ctx)
+        clock = self._clock
+        started = clock()
+        try:
+            return function(argument)
+        finally:
+            stats.inclusive += clock() - started
+            stats.count += 1
+            contexts.pop()
+
+    def _register(self, root):
+        nodes = self.profile.nodes
+        pending = [(root, None)]
+        while pending:
+            ctx, parent = pending.pop()
+            kind = _KINDS.get(ctx.__class__)
+            if kind is not None:
+                parent = nodes[ctx] = NodeStats(kind, ctx.start.line, ctx.start.column, _source_text(ctx), parent)
+            for child in getattr(ctx, 'children', None) or ():
+                pending.append((child, parent))
+
+
+def _source_text(ctx) -> str:
+    """Исходный текст узла в одну строку"""
+    if ctx.stop is None or ctx.stop.stop < ctx.start.start:
+        return ctx.getText()
+    text = ctx.start.getInputStream().getText(ctx.start.start, ctx.stop.stop)
+    return ' '.join(text.split())
+
+
+def profile_source(input_text: str, lexer: str = 'fast', sink: Optional[OutputSink] = None,
+                   budget: Optional[ExecutionBudget] = None) -> Tuple[Profile, Optional[str]]:
+    """Исполняет программу с профилированием, как Driver.run_source с исполнителем tree;
+    профиль собирается и для программы, завершившейся ошибкой"""
+    interpreter = ProfilingInterpreter(sink, budget)
+    error = None
+    try:
+        interpreter.visit(Driver.parse(input_text, lexer=lexer))
+    except Exception as e:
+        error = Driver.error_message(e)
+        print(error)
+    return interpreter.profile, error
+
+
+# Отчёты
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:10.2f}"
+
+
+def write_annotated_source(profile: Profile, source: str, file: TextIO, top: int = 10):
+    totals = profile.line_totals()
+    total = profile.total or 1.0
+    print(f"Профиль исполнения: всего {profile.total * 1000:.2f} мс", file=file)
+    print(f"{'строка':>6} {'исполн.':>9} {'полное мс':>10} {'собств. мс':>10} {'%':>6}  текст", file=file)
+    for number, text in enumerate(source.splitlines(), start=1):
+        entry = totals.get(number)
+        if entry is None:
+            print(f"{number:6d} {'':>9} {'':>10} {'':>10} {'':>6}  {text}", file=file)
+            continue
+        count, inclusive, exclusive = entry
+        print(f"{number:6d} {count:9d} {_ms(inclusive)} {_ms(exclusive)} {exclusive / total * 100:6.1f}  {text}",
+              file=file)
+
+    print(f"Узлы с наибольшим собственным временем (первые {top}):", file=file)
+    print(f"{'позиция':>9} {'узел':<11} {'исполн.':>9} {'полное мс':>10} {'собств. мс':>10}  текст", file=file)
+    ranked = sorted(profile.nodes.values(), key=lambda stats: -stats.exclusive)[:top]
+    for stats in ranked:
+        text = stats.text if len(stats.text) <= _TEXT_WIDTH else stats.text[:_TEXT_WIDTH - 3] + '...'
+        position = f"{stats.line}:{stats.column}"
+        print(f"{position:>9} {stats.kind:<11} {stats.count:9d} {_ms(stats.inclusive)} {_ms(stats.exclusive)}  {text}",
+              file=file)
+
+
+def write_collapsed_stacks(profile: Profile, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in profile.collapsed_stacks():
+            f.write(line + '\n')
@@ -0,0 +1,151 @@
+"""
+Дисковый кэш скомпилированных программ, по аналогии с .pyc
+Хранит AST после свёртки констант, ключ - хэш исходного текста и версии
+интерпретатора. Загрузка из кэша не требует ни лексера, ни парсера, поэтому
+ANTLR при этом не импортируется. Ошибки чтения и записи кэша не мешают
+исполнению: программа просто разбирается заново
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+from typing import List, Optional
+
+import Ast
+
+
+# Увеличивается при несовместимом изменении формата записи
+FORMAT_VERSION = 1
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+_SUFFIX = '.ast'
+
+# Модули, от которых зависит построенное AST: их изменение делает записи устаревшими
+_COMPILER_MODULES = (
+    'Ast.py', 'Runtime.py', 'Scanner.py', 'ExprLexer.tokens', 'FastLexer.py', 'PrattParser.py', 'AstBuilder.py',
+    'ConstantFolder.py', 'ProgramCache.py',
+)
+
+
+def default_directory() -> str:
+    directory = os.environ.get('EXPR_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'expr')
+
+
+def _interpreter_version() -> bytes:
+    """Версия интерпретатора: формат записи, версия Python и состояние модулей компилятора"""
+    parts = [f"{FORMAT_VERSION};{sys.version_info[0]}.{sys.version_info[1]}"]
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in _COMPILER_MODULES:
+        try:
+            stat = os.stat(os.path.join(root, name))
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            parts.append(f"{name}:-")
+    return ';'.join(parts).encode('utf-8')
+
+
+class ProgramCache:
+    def __init__(self, directory: Optional[str] = None, max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = directory if directory is not None else default_directory()
+        self.max_size = max_size
+        self._version = _interpreter_version()
+
+    def key(self, source: str) -> str:
+        digest = hashlib.sha256(self._version)
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def load(self, source: str) -> Optional[Ast.Program]:
+        """AST программы из кэша или None, если записи нет или она повреждена"""
+        path = self._path(source)
+        try:
+            with open(path, 'rb') as f:
+                program = pickle.load(f)
+        except OSError:
+            return None
+        except Exception:
+            # Повреждённая запись удаляется и будет записана заново
+            self._remove(path)
+            return None
+        if not isinstance(program, Ast.Program):
+            self._remove(path)
+            return None
+        try:
+            # Время изменения служит временем последнего использования при вытеснении
+            os.utime(path)
+        except OSError:
+            pass
+        return program
+
+    def store(self, source: str, program: Ast.Program):
+        """Атомарно записывает AST: читатели видят либо старую запись, либо новую целиком"""
+        try:
+            data = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError):
+            # Слишком глубокое выражение не кэшируется
+            return
+        # tempfile нужен только при записи и не замедляет запуск с попаданием в кэш
+        import tempfile
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(source))
+        except OSError:
+            self._remove(temp_path)
+            return
+        self._evict()
+
+    def clear(self):
+        for path in self._entries():
+            self._remove(path)
+
+    # Внутренние методы
+
+    def _path(self, source: str) -> str:
+        return os.path.join(self.directory, self.key(source) + _SUFFIX)
+
+    def _entries(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [os.path.join(self.directory, name) for name in names if name.endswith(_SUFFIX)]
+
+    def _evict(self):
+        """Удаляет давно не использованные записи, пока кэш превышает max_size"""
+        entries = []
+        total = 0
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_size:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,110 @@
+"""
+Разрешение имён переменных в номера слотов
+Каждое объявленное имя получает постоянный индекс в плоском массиве значений.
+Обращение к имени, которое нигде в программе не объявлено, - ошибка компиляции.
+Анализ обязательного объявления отмечает обращения, которым не нужна проверка
+во время выполнения: переменная к этому моменту объявлена на любом пути исполнения
+"""
+
+from typing import Dict, List, Set
+
+from Runtime import UndefinedVariableError
+import Ast
+
+
+class Resolver:
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._defined: Set[str] = set()
+        self._statements = {
+            Ast.Declaration: self._resolve_declaration,
+            Ast.Assignment: self._resolve_assignment,
+            Ast.If: self._resolve_if,
+            Ast.While: self._resolve_while,
+            Ast.Print: self._resolve_print,
+            Ast.Block: self._resolve_block,
+        }
+
+    def resolve(self, program: Ast.Program) -> List[str]:
+        """Назначает слоты узлам программы и возвращает имена по номерам слотов"""
+        if program.names is not None:
+            return program.names
+        self._collect(program.body)
+        self._resolve_sequence(program.body)
+        program.names = list(self._slots)
+        return program.names
+
+    def _collect(self, nodes: List[Ast.Node]):
+        for node in nodes:
+            if isinstance(node, Ast.Declaration):
+                if node.name not in self._slots:
+                    self._slots[node.name] = len(self._slots)
+            elif isinstance(node, Ast.If):
+                self._collect([node.then])
+                if node.orelse is not None:
+                    self._collect([node.orelse])
+            elif isinstance(node, Ast.While):
+                self._collect([node.body])
+            elif isinstance(node, Ast.Block):
+                self._collect(node.body)
+
+    def _slot(self, name: str) -> int:
+        slot = self._slots.get(name)
+        if slot is None:
+            raise UndefinedVariableError(f"Переменная '{name}' не объявлена")
+        return slot
+
+    # Операторы
+
+    def _resolve_sequence(self, nodes: List[Ast.Node]):
+        statements = self._statements
+        for node in nodes:
+            statements[node.__class__](node)
+
+    def _resolve_declaration(self, node: Ast.Declaration):
+        if node.expr is not None:
+            self._resolve_expression(node.expr)
+        node.slot = self._slots[node.name]
+        self._defined.add(node.name)
+
+    def _resolve_assignment(self, node: Ast.Assignment):
+        node.slot = self._slot(node.name)
+        node.guarded = node.name not in self._defined
+        self._resolve_expression(node.expr)
+
+    def _resolve_if(self, node: Ast.If):
+        self._resolve_expression(node.cond)
+        before = set(self._defined)
+        self._statements[node.then.__class__](node.then)
+        if node.orelse is None:
+            self._defined = before
+            return
+        after_then = self._defined
+        self._defined = before
+        self._statements[node.orelse.__class__](node.orelse)
+        self._defined = after_then & self._defined
+
+    def _resolve_while(self, node: Ast.While):
+        self._resolve_expression(node.cond)
+        before = set(self._defined)
+        self._statements[node.body.__class__](node.body)
+        # Тело цикла может не выполниться ни разу
+        self._defined = before
+
+    def _resolve_print(self, node: Ast.Print):
+        self._resolve_expression(node.expr)
+
+    def _resolve_block(self, node: Ast.Block):
+        self._resolve_sequence(node.body)
+
+    # Выражения
+
+    def _resolve_expression(self, node: Ast.Node):
+        if isinstance(node, Ast.Var):
+            node.slot = self._slot(node.name)
+            node.guarded = node.name not in self._defined
+        elif isinstance(node, Ast.Binary):
+            self._resolve_expression(node.left)
+            self._resolve_expression(node.right)
+        elif isinstance(node, Ast.Unary):
+            self._resolve_expression(node.operand)
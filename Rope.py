@@ -0,0 +1,183 @@
+"""
+Ленивое представление длинных строк
+Конкатенация и повторение длинных строк создают узел Concat или Repeat за
+O(1), без копирования, поэтому накопление строки в цикле (s = s + piece)
+линейно, а не квадратично. Строка собирается в str только при сравнении,
+поиске подстроки или явном str(); длина известна без сборки, а вывод
+передаёт приёмнику части строки по очереди (chunks).
+Короче ROPE_THRESHOLD символов строки по-прежнему копируются: узел дороже
+копирования короткой строки
+"""
+
+import sys
+from typing import Iterator, Union
+
+
+# Наименьшая длина результата, начиная с которой создаётся узел, а не копия:
+# создание узла стоит около 0,5 мкс, столько же, сколько копирование 32 К символов
+ROPE_THRESHOLD = 32 * 1024
+# Короткие части, дописываемые в конец, объединяются в листья до этой длины
+_LEAF_SIZE = 512
+# Размер частей, которыми выводится повторение
+_BLOCK_SIZE = 64 * 1024
+
+Text = Union[str, 'Rope']
+
+
+class Rope:
+    """Неизменяемая строка из частей. Собранное значение запоминается,
+    а ссылки на части после этого освобождаются"""
+
+    __slots__ = ('length', 'ascii', '_flat')
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __bool__(self) -> bool:
+        return self.length > 0
+
+    def __str__(self) -> str:
+        flat = self._flat
+        if flat is None:
+            flat = self._flat = ''.join(self.chunks())
+            self._release()
+        return flat
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(length={self.length})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, (str, Rope)):
+            return NotImplemented
+        # Строки разной длины не равны: собирать их не нужно
+        return len(other) == self.length and str(self) == str(other)
+
+    def __ne__(self, other) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __lt__(self, other) -> bool:
+        return str(self) < str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __le__(self, other) -> bool:
+        return str(self) <= str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __gt__(self, other) -> bool:
+        return str(self) > str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __ge__(self, other) -> bool:
+        return str(self) >= str(other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __add__(self, other):
+        return concat(self, other) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __radd__(self, other):
+        return concat(other, self) if isinstance(other, (str, Rope)) else NotImplemented
+
+    def __mul__(self, count):
+        return repeat(self, count) if isinstance(count, int) else NotImplemented
+
+    __rmul__ = __mul__
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __reduce__(self):
+        # Сохраняется собранная строка, а не дерево частей
+        return str, (str(self),)
+
+    def isascii(self) -> bool:
+        return self.ascii
+
+    def chunks(self) -> Iterator[str]:
+        """Части строки по порядку, без сборки; глубина дерева не ограничена"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                if node:
+                    yield node
+            elif node._flat is not None:
+                yield node._flat
+            elif node.__class__ is Concat:
+                stack.append(node.right)
+                stack.append(node.left)
+            else:
+                yield from node.blocks()
+
+    def _release(self):
+        pass
+
+
+class Concat(Rope):
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left: Text, right: Text, length: int):
+        self.left = left
+        self.right = right
+        self.length = length
+        self.ascii = left.isascii() and right.isascii()
+        self._flat = None
+
+    def _release(self):
+        self.left = self.right = None
+
+
+class Repeat(Rope):
+    __slots__ = ('piece', 'count')
+
+    def __init__(self, piece: Text, count: int, length: int):
+        self.piece = piece
+        self.count = count
+        self.length = length
+        self.ascii = piece.isascii()
+        self._flat = None
+
+    def blocks(self) -> Iterator[str]:
+        """Повторение частями около _BLOCK_SIZE символов"""
+        piece = str(self.piece)
+        per_block = max(1, _BLOCK_SIZE // len(piece))
+        full, rest = divmod(self.count, per_block)
+        if full:
+            block = piece * per_block
+            for _ in range(full):
+                yield block
+        if rest:
+            yield piece * rest
+
+    def _release(self):
+        self.piece = None
+
+
+def concat(left: Text, right: Text) -> Text:
+    """Конкатенация строк: короткий результат - str, длинный - узел Concat"""
+    length = len(left) + len(right)
+    if length < ROPE_THRESHOLD:
+        # Узлы не короче ROPE_THRESHOLD, поэтому здесь обе части - str
+        return left + right
+    if not right:
+        return left
+    if not left:
+        return right
+    if left.__class__ is Concat and right.__class__ is str and left._flat is None:
+        # Дописывание короткой части: новый узел с объединённым листом вместо
+        # цепочки мелких узлов; прежний узел не меняется
+        leaf = left.right
+        if leaf.__class__ is str and len(leaf) + len(right) <= _LEAF_SIZE:
+            return Concat(left.left, leaf + right, length)
+    return Concat(left, right, length)
+
+
+def repeat(text: Text, count: int) -> Text:
+    """Повторение строки: короткий результат - str, длинный - узел Repeat"""
+    if count <= 0:
+        return ''
+    length = len(text) * count
+    if length < ROPE_THRESHOLD:
+        return text * count
+    if count == 1:
+        return text
+    if length > sys.maxsize:
+        # Та же ошибка, что у повторения str
+        return str(text) * count
+    return Repeat(text, count, length)
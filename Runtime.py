@@ -0,0 +1,429 @@
+"""
+Семантика времени выполнения языка, не зависящая от ANTLR
+Значения, ошибки и операции над значениями, общие для всех исполнителей
+"""
+
+import re
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from OutputSink import OutputSink, StreamSink
+from Rope import Rope, concat, repeat
+
+
+class InterpreterError(Exception):
+    pass
+
+
+class UndefinedVariableError(InterpreterError):
+    pass
+
+
+class TypeMismatchError(InterpreterError):
+    pass
+
+
+class ParseError(InterpreterError):
+    pass
+
+
+class ExecutionLimitError(InterpreterError):
+    """Исполнение прервано ограничением ExecutionBudget"""
+
+
+class StepLimitError(ExecutionLimitError):
+    pass
+
+
+class TimeLimitError(ExecutionLimitError):
+    pass
+
+
+class ExecutionCancelledError(ExecutionLimitError):
+    pass
+
+
+class MemoryLimitError(ExecutionLimitError):
+    pass
+
+
+class Value:
+    """Значение программы: значение Python и имя типа ('int', 'float' или 'string').
+    Экземпляры не изменяются после создания (по соглашению: запрет присваивания
+    замедлил бы создание каждого значения), поэтому одинаковые значения
+    разделяются: TRUE, FALSE, малые целые и значения по умолчанию создаются один раз.
+    Тип намеренно остаётся интернированной строкой, а не целочисленным кодом:
+    строка попадает в AST, TypeChecker, сообщения об ошибках и кэш программ, а
+    сравнение интернированных строк стоит столько же, сколько сравнение целых"""
+
+    __slots__ = ('value', 'type_name')
+
+    def __init__(self, value: Any, type_name: str):
+        self.value = value
+        self.type_name = type_name
+
+    def __reduce__(self):
+        # Копия из pickle и copy создаётся конструктором, как и остальные значения
+        return Value, (self.value, self.type_name)
+    
+    def __str__(self):
+        return str(self.value)
+    
+    def __repr__(self):
+        return f"Value({self.value}, {self.type_name})"
+    
+    def is_truthy(self) -> bool:
+        # Истинность int, float и string (в том числе Rope) совпадает с истинностью значения Python
+        return bool(self.value)
+
+
+NUMERIC_TYPES = frozenset(('int', 'float'))
+
+# Результаты сравнений и логических операций
+TRUE = Value(1, 'int')
+FALSE = Value(0, 'int')
+
+SMALL_INT_MIN = -5
+SMALL_INT_MAX = 256
+_SMALL_INTS = tuple(TRUE if number == 1 else FALSE if number == 0 else Value(number, 'int')
+                    for number in range(SMALL_INT_MIN, SMALL_INT_MAX + 1))
+
+# Value малого целого или None; поиск дешевле создания Value, поэтому
+# результаты целочисленной арифметики тоже берутся отсюда:
+#     small_int(result) or Value(result, 'int')
+small_int = {value.value: value for value in _SMALL_INTS}.get
+
+_DEFAULT_VALUES = {'int': FALSE, 'float': Value(0.0, 'float'), 'string': Value('', 'string')}
+
+
+def int_value(number: int) -> Value:
+    """Value для целого; малые целые берутся из заранее созданных"""
+    return small_int(number) or Value(number, 'int')
+
+
+_ESCAPES = {'n': '\n', 't': '\t', '\\': '\\', "'": "'"}
+
+_ESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+
+
+def _decode_escape(match: 're.Match') -> str:
+    # Неизвестная последовательность остаётся как есть, вместе с обратной косой чертой
+    return _ESCAPES.get(match.group(1), match.group(0))
+
+
+def decode_string_literal(literal: str) -> str:
+    """Убирает кавычки и обрабатывает escape-последовательности за один проход"""
+    text = literal[1:-1]
+    if '\\' not in text:
+        return text
+    return _ESCAPE_PATTERN.sub(_decode_escape, text)
+
+
+class ExecutionBudget:
+    """Ограничения исполнения: число шагов, предельное время и отмена из другого потока.
+    Шаг - переход от конца тела цикла к повторной проверке условия; других
+    неограниченных конструкций в языке нет. Исполнители расходуют шаги из
+    локального счётчика и обращаются к checkpoint, только когда выданная порция
+    исчерпана, поэтому время и флаг отмены проверяются раз в check_interval шагов.
+
+    max_memory - наибольший объём строк программы в байтах. Неограниченно растут
+    только строки (конкатенация и повторение), поэтому размер строки-результата
+    вычисляется до её создания. Строки не длиннее unchecked_length не учитываются:
+    их в памяти не больше, чем переменных и промежуточных значений выражения"""
+
+    DEFAULT_CHECK_INTERVAL = 1024
+    # Длина строки, начиная с которой учитывается память
+    STRING_CHECK_THRESHOLD = 64 * 1024
+
+    def __init__(self, max_steps: Optional[int] = None, time_limit: Optional[float] = None,
+                 max_memory: Optional[int] = None, check_interval: int = DEFAULT_CHECK_INTERVAL):
+        self.max_steps = max_steps
+        self.time_limit = time_limit
+        self.max_memory = max_memory
+        self.check_interval = check_interval
+        # Без ограничения памяти длина строк не проверяется
+        self.unchecked_length = (sys.maxsize if max_memory is None
+                                 else min(self.STRING_CHECK_THRESHOLD, max_memory))
+        # Шаги, выданные исполнителю до последней проверки
+        self.steps = 0
+        self.cancelled = False
+        self._granted = 0
+        self._deadline: Optional[float] = None
+
+    def start(self):
+        """Начинает отсчёт шагов и времени. Счётчик исполнителя начинается с нуля,
+        поэтому первый же шаг вызывает checkpoint и получает порцию"""
+        self.steps = 0
+        self._granted = 0
+        self._deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+
+    def checkpoint(self) -> int:
+        """Проверяет ограничения, когда счётчик исполнителя дошёл до нуля; возвращает новую порцию шагов"""
+        self.steps += self._granted
+        if self.cancelled:
+            raise ExecutionCancelledError("Исполнение отменено")
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            raise StepLimitError(f"Превышено ограничение числа шагов ({self.max_steps})")
+        if self._deadline is not None and time.monotonic() > self._deadline:
+            raise TimeLimitError(f"Превышено ограничение времени исполнения ({self.time_limit:g} с)")
+        granted = self.check_interval
+        if self.max_steps is not None:
+            granted = min(granted, self.max_steps - self.steps)
+        self._granted = granted
+        return granted
+
+    def reserve(self, size: int, held: int):
+        """Проверяет, что новая строка размером size байт помещается в ограничение
+        вместе со строками, которые программа уже хранит (held байт)"""
+        if self.max_memory is not None and held + size > self.max_memory:
+            raise MemoryLimitError(
+                f"Превышено ограничение памяти ({self.max_memory} байт): строке нужно {size} байт, "
+                f"в переменных уже {held} байт"
+            )
+
+    def cancel(self):
+        """Отменяет исполнение; безопасно вызывать из другого потока"""
+        self.cancelled = True
+
+
+class Runtime:
+    """Состояние программы и операции над значениями"""
+    
+    def __init__(self, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None):
+        self.variables: Dict[str, Value] = {}
+        # Приёмник вывода; по умолчанию строки пишутся блоками в sys.stdout
+        self.sink = sink if sink is not None else StreamSink()
+        # Ограничения исполнения; без ограничений шаги всё равно считаются ради отмены
+        self.budget = budget if budget is not None else ExecutionBudget()
+        # Оставшиеся шаги текущей порции бюджета
+        self._ticks = 0
+    
+    def get_output(self) -> str:
+        return self.sink.get_output()
+    
+    def clear_output(self):
+        self.sink.clear()
+    
+    # Учёт памяти строк
+    
+    def _stored_values(self) -> Iterable[Any]:
+        """Значения переменных программы: Value или значения Python"""
+        return self.variables.values()
+    
+    def _held_memory(self) -> int:
+        """Размер строк в переменных программы, байт. Строка Rope считается
+        собранной: столько памяти ей понадобится при сравнении"""
+        held = 0
+        for value in self._stored_values():
+            if isinstance(value, Value):
+                value = value.value
+            if isinstance(value, str):
+                held += sys.getsizeof(value)
+            elif isinstance(value, Rope):
+                held += len(value) * (1 if value.isascii() else 4)
+        return held
+    
+    def _reserve_string(self, length: int, *parts):
+        """Проверяет ограничение памяти до создания строки длины length из частей parts"""
+        # Строка только из ASCII занимает байт на символ, иначе до четырёх
+        width = 1 if all(part.isascii() for part in parts) else 4
+        self.budget.reserve(length * width, self._held_memory())
+    
+    def _concat(self, left, right):
+        """Конкатенация строк str или Rope; длинный результат - Rope"""
+        length = len(left) + len(right)
+        if length > self.budget.unchecked_length:
+            self._reserve_string(length, left, right)
+        return concat(left, right)
+    
+    def _repeat(self, text, count: int):
+        """Повторение строки str или Rope; длинный результат - Rope"""
+        if count > 0 and len(text) * count > self.budget.unchecked_length:
+            self._reserve_string(len(text) * count, text)
+        return repeat(text, count)
+    
+    def _print_value(self, value: Any):
+        """Выводит значение; части строки Rope передаются приёмнику без сборки"""
+        if isinstance(value, Rope):
+            self.sink.write_parts(value.chunks())
+        else:
+            self.sink.write(str(value))
+    
+    # Вспомогательные методы для операций
+    
+    def _is_compatible_type(self, from_type: str, to_type: str) -> bool:
+        """Проверка совместимости типов"""
+        if from_type == to_type:
+            return True
+        # int можно привести к float
+        if from_type == 'int' and to_type == 'float':
+            return True
+        # Любой тип можно привести к string
+        if to_type == 'string':
+            return True
+        return False
+    
+    def _convert_type(self, value: Value, target_type: str) -> Value:
+        """Приведение типа"""
+        if value.type_name == target_type:
+            return value
+        
+        if target_type == 'float' and value.type_name == 'int':
+            return Value(float(value.value), 'float')
+        elif target_type == 'string':
+            return Value(str(value.value), 'string')
+        
+        raise TypeMismatchError(f"Невозможно преобразовать тип {value.type_name} в {target_type}")
+    
+    def _get_default_value(self, type_name: str) -> Value:
+        """Получение значения по умолчанию для типа"""
+        value = _DEFAULT_VALUES.get(type_name)
+        if value is None:
+            raise InterpreterError(f"Неизвестный тип: {type_name}")
+        return value
+    
+    # Арифметические операции
+    def _add(self, left: Value, right: Value) -> Value:
+        """Сложение"""
+        if left.type_name == 'string' or right.type_name == 'string':
+            # Конкатенация строк; строка может быть Rope и не собирается
+            left_text = left.value if left.type_name == 'string' else str(left.value)
+            right_text = right.value if right.type_name == 'string' else str(right.value)
+            return Value(self._concat(left_text, right_text), 'string')
+        elif left.type_name == 'float' or right.type_name == 'float':
+            # Вещественная арифметика
+            left_val = float(left.value) if left.type_name in NUMERIC_TYPES else 0.0
+            right_val = float(right.value) if right.type_name in NUMERIC_TYPES else 0.0
+            return Value(left_val + right_val, 'float')
+        else:
+            # Целочисленная арифметика
+            result = left.value + right.value
+            return small_int(result) or Value(result, 'int')
+    
+    def _subtract(self, left: Value, right: Value) -> Value:
+        """Вычитание"""
+        if left.type_name == 'string' and right.type_name == 'string':
+            # Удаление подстроки
+            result = str(left.value).replace(str(right.value), '', 1)
+            return Value(result, 'string')
+        elif left.type_name == 'float' or right.type_name == 'float':
+            left_val = float(left.value) if left.type_name in NUMERIC_TYPES else 0.0
+            right_val = float(right.value) if right.type_name in NUMERIC_TYPES else 0.0
+            return Value(left_val - right_val, 'float')
+        else:
+            result = left.value - right.value
+            return small_int(result) or Value(result, 'int')
+    
+    def _multiply(self, left: Value, right: Value) -> Value:
+        """Умножение"""
+        if left.type_name == 'string' and right.type_name == 'int':
+            # Повторение строки
+            return Value(self._repeat(left.value, right.value), 'string')
+        elif left.type_name == 'int' and right.type_name == 'string':
+            return Value(self._repeat(right.value, left.value), 'string')
+        elif left.type_name == 'float' or right.type_name == 'float':
+            left_val = float(left.value) if left.type_name in NUMERIC_TYPES else 0.0
+            right_val = float(right.value) if right.type_name in NUMERIC_TYPES else 0.0
+            return Value(left_val * right_val, 'float')
+        else:
+            result = left.value * right.value
+            return small_int(result) or Value(result, 'int')
+    
+    def _divide(self, left: Value, right: Value) -> Value:
+        """Деление"""
+        if right.value == 0:
+            raise InterpreterError("Деление на ноль")
+        
+        if left.type_name in NUMERIC_TYPES and right.type_name in NUMERIC_TYPES:
+            left_val = float(left.value)
+            right_val = float(right.value)
+            return Value(left_val / right_val, 'float')
+        else:
+            raise TypeMismatchError("Деление поддерживается только для числовых типов")
+    
+    def _modulo(self, left: Value, right: Value) -> Value:
+        """Остаток от деления"""
+        if right.value == 0:
+            raise InterpreterError("Деление на ноль при вычислении остатка")
+        
+        if left.type_name == 'int' and right.type_name == 'int':
+            result = left.value % right.value
+            return small_int(result) or Value(result, 'int')
+        else:
+            raise TypeMismatchError("Операция остатка поддерживается только для целых чисел")
+    
+    # Операции сравнения
+    def _compare_lt(self, left: Value, right: Value) -> Value:
+        """Меньше"""
+        if left.type_name in NUMERIC_TYPES and right.type_name in NUMERIC_TYPES:
+            return TRUE if left.value < right.value else FALSE
+        elif left.type_name == 'string' and right.type_name == 'string':
+            return TRUE if left.value < right.value else FALSE
+        else:
+            raise TypeMismatchError("Невозможно сравнить значения разных типов")
+    
+    def _compare_le(self, left: Value, right: Value) -> Value:
+        """Меньше или равно"""
+        if left.type_name in NUMERIC_TYPES and right.type_name in NUMERIC_TYPES:
+            return TRUE if left.value <= right.value else FALSE
+        elif left.type_name == 'string' and right.type_name == 'string':
+            return TRUE if left.value <= right.value else FALSE
+        else:
+            raise TypeMismatchError("Невозможно сравнить значения разных типов")
+    
+    def _compare_gt(self, left: Value, right: Value) -> Value:
+        """Больше"""
+        if left.type_name in NUMERIC_TYPES and right.type_name in NUMERIC_TYPES:
+            return TRUE if left.value > right.value else FALSE
+        elif left.type_name == 'string' and right.type_name == 'string':
+            return TRUE if left.value > right.value else FALSE
+        else:
+            raise TypeMismatchError("Невозможно сравнить значения разных типов")
+    
+    def _compare_ge(self, left: Value, right: Value) -> Value:
+        """Больше или равно"""
+        if left.type_name in NUMERIC_TYPES and right.type_name in NUMERIC_TYPES:
+            return TRUE if left.value >= right.value else FALSE
+        elif left.type_name == 'string' and right.type_name == 'string':
+            return TRUE if left.value >= right.value else FALSE
+        else:
+            raise TypeMismatchError("Невозможно сравнить значения разных типов")
+    
+    def _compare_eq(self, left: Value, right: Value) -> Value:
+        """Равно"""
+        return TRUE if left.value == right.value else FALSE
+    
+    def _compare_ne(self, left: Value, right: Value) -> Value:
+        """Не равно"""
+        return TRUE if left.value != right.value else FALSE
+    
+    # Логические операции
+    def _logical_and(self, left: Value, right: Value) -> Value:
+        """Логическое И"""
+        return TRUE if left.value and right.value else FALSE
+    
+    def _logical_or(self, left: Value, right: Value) -> Value:
+        """Логическое ИЛИ"""
+        return TRUE if left.value or right.value else FALSE
+    
+    def _logical_not(self, operand: Value) -> Value:
+        """Логическое НЕ"""
+        return FALSE if operand.value else TRUE
+    
+    # Унарные операции
+    def _unary_minus(self, operand: Value) -> Value:
+        """Унарный минус"""
+        if operand.type_name == 'int':
+            return small_int(-operand.value) or Value(-operand.value, 'int')
+        elif operand.type_name == 'float':
+            return Value(-operand.value, 'float')
+        else:
+            raise TypeMismatchError("Унарный минус поддерживается только для числовых типов")
+    
+    def _unary_plus(self, operand: Value) -> Value:
+        """Унарный плюс"""
+        if operand.type_name in NUMERIC_TYPES:
+            return operand
+        else:
+            raise TypeMismatchError("Унарный плюс поддерживается только для числовых типов") 
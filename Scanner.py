@@ -0,0 +1,87 @@
+"""
+Разбиение текста программы на токены одним регулярным выражением
+Общая часть FastLexer и PrattParser, не зависящая от ANTLR: PrattParser
+импортирует только этот модуль, поэтому разбор по умолчанию обходится без
+загрузки библиотеки antlr4 и автоматов ExprLexer/ExprParser.
+Типы токенов читаются из ExprLexer.tokens, который генерируется вместе с лексером
+"""
+
+import os
+import re
+from typing import Dict, List, Tuple
+
+
+# Типы токенов, как в antlr4.Token
+EOF = -1
+INVALID_TYPE = 0
+
+
+def _load_token_types(path: str) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Имена и литералы токенов из файла .tokens: строки NAME=n и 'text'=n"""
+    names = {}
+    literals = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            name, _, value = line.strip().rpartition('=')
+            if not name:
+                continue
+            if name.startswith("'"):
+                literals[name[1:-1]] = int(value)
+            else:
+                names[name] = int(value)
+    return names, literals
+
+
+_TOKEN_NAMES, LITERAL_TOKENS = _load_token_types(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ExprLexer.tokens'))
+
+ID = _TOKEN_NAMES['ID']
+INT_LITERAL = _TOKEN_NAMES['INT_LITERAL']
+FLOAT_LITERAL = _TOKEN_NAMES['FLOAT_LITERAL']
+STRING_LITERAL = _TOKEN_NAMES['STRING_LITERAL']
+
+# Пропускаемые пробелы и комментарии поглощаются перед каждым токеном.
+# Строка разбирается так же, как автомат ANTLR: обратная косая черта и обычный
+# символ, и начало escape-последовательности, поэтому токеном становится самое
+# длинное совпадение правила STRING_LITERAL, а незакрытая строка - ошибкой
+# до символа, на котором автомат остановился
+_TOKEN_PATTERN = re.compile(r"""
+    (?=([ \t\r\n]*(?:(?://[^\r\n]*|/\*[\s\S]*?\*/)[ \t\r\n]*)*))\1    # без возврата в комментарий
+    (
+        [0-9]+(?:\.[0-9]+)?
+      | [a-zA-Z_][a-zA-Z0-9_]*
+      | '(?:[^'\\\r\n]|\\+[^\\])*'
+      | '(?:[^'\\\r\n]|\\+[^\\])+(?<=\\')
+      | '(?:[^'\\\r\n]|\\+[^\\])*(?:[\r\n]|\\*\Z)    # незакрытая строка
+      | <=|>=|==|!=|&&|\|\|
+      | [&|][\s\S]?                                   # & и | без пары - ошибка из двух символов
+      | [^ \t\r\n]
+      | \Z                                            # конец текста после пропущенного хвоста
+    )
+""", re.VERBOSE)
+
+_DIGITS = frozenset('0123456789')
+_ID_START = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+
+
+def scan(text: str) -> List[Tuple[str, str]]:
+    """Разбивает текст на пары (пропущенный текст, текст токена или ошибки)"""
+    return _TOKEN_PATTERN.findall(text)
+
+
+def token_type(text: str) -> int:
+    """Тип токена по его тексту: INVALID_TYPE - ошибка распознавания,
+    EOF - пустой токен конца текста"""
+    token_type = LITERAL_TOKENS.get(text)
+    if token_type is not None:
+        return token_type
+    if not text:
+        return EOF
+    first = text[0]
+    if first in _DIGITS:
+        return FLOAT_LITERAL if '.' in text else INT_LITERAL
+    if first == "'":
+        return STRING_LITERAL if len(text) > 1 and text[-1] == "'" else INVALID_TYPE
+    if first in _ID_START:
+        return ID
+    return INVALID_TYPE
@@ -0,0 +1,131 @@
+"""
+Измерение времени запуска интерпретатора
+Печатает разбивку времени импорта, как python -X importtime, с итогами по
+группам (модули интерпретатора, antlr4, стандартная библиотека), и время до
+первого вывода программы - медиану по нескольким запускам Driver.py в
+отдельных процессах. Завершается с кодом 1, если время до первого вывода
+сверх запуска пустого интерпретатора Python превышает цель (--target-ms):
+    python Startup.py [--runs N] [--target-ms T] [параметры Driver.py...] файл
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DRIVER = os.path.join(ROOT, 'Driver.py')
+
+DEFAULT_RUNS = 20
+DEFAULT_TOP = 15
+# Цель для запуска по умолчанию (PrattParser, AST из кэша): без ANTLR и без
+# неиспользуемых исполнителей время сверх запуска Python 45-70 мс, до этого 95-120 мс
+DEFAULT_TARGET_MS = 80.0
+
+
+class ImportRecord:
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'depth')
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+    @property
+    def group(self) -> str:
+        top = self.name.split('.')[0]
+        if top == 'antlr4':
+            return 'antlr4'
+        if os.path.exists(os.path.join(ROOT, top + '.py')):
+            return 'интерпретатор'
+        return 'stdlib и прочие'
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """Записи из вывода -X importtime: 'import time: self | cumulative | name'"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append(ImportRecord(name.strip(), int(parts[0]), int(parts[1]), depth))
+    return records
+
+
+def import_breakdown(driver_args: List[str]) -> List[ImportRecord]:
+    result = subprocess.run([sys.executable, '-X', 'importtime', DRIVER, *driver_args],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return parse_importtime(result.stderr)
+
+
+def time_to_first_output(command: List[str], runs: int) -> float:
+    """Медиана времени от запуска процесса до первого байта его вывода, мс"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        process.stdout.read(1)
+        timings.append(time.perf_counter() - started)
+        process.stdout.read()
+        process.wait()
+    return statistics.median(timings) * 1000
+
+
+def print_breakdown(records: List[ImportRecord], top: int):
+    groups: Dict[str, int] = {}
+    for record in records:
+        groups[record.group] = groups.get(record.group, 0) + record.self_us
+    print("Импорт по группам (собственное время):")
+    for group, total in sorted(groups.items(), key=lambda item: -item[1]):
+        print(f"  {total / 1000:8.1f} мс  {group}")
+    print(f"  {sum(groups.values()) / 1000:8.1f} мс  всего")
+
+    print(f"Модули верхнего уровня с наибольшим временем импорта (первые {top}):")
+    print("  собств. мс  всего мс  модуль")
+    outer = [record for record in records if record.depth == 0]
+    for record in sorted(outer, key=lambda record: -record.cumulative_us)[:top]:
+        print(f"  {record.self_us / 1000:9.1f}  {record.cumulative_us / 1000:8.1f}  {record.name}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Время запуска интерпретатора Expr",
+                                         epilog="остальные параметры передаются Driver.py")
+    arg_parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help="число запусков для медианы")
+    arg_parser.add_argument('--top', type=int, default=DEFAULT_TOP, help="число модулей в разбивке импорта")
+    arg_parser.add_argument('--target-ms', type=float, default=DEFAULT_TARGET_MS,
+                            help="наибольшее допустимое время до первого вывода сверх запуска Python, мс; "
+                                 "0 - не проверять")
+    args, driver_args = arg_parser.parse_known_args()
+    if not driver_args:
+        arg_parser.error("не указан файл программы")
+
+    # Первый запуск заполняет кэш скомпилированных программ и не учитывается
+    subprocess.run([sys.executable, DRIVER, *driver_args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    records = import_breakdown(driver_args)
+    print_breakdown(records, args.top)
+    if 'antlr4' in {record.group for record in records}:
+        print("Загружен antlr4")
+
+    python_ms = time_to_first_output([sys.executable, '-c', 'print()'], args.runs)
+    driver_ms = time_to_first_output([sys.executable, DRIVER, *driver_args], args.runs)
+    overhead_ms = driver_ms - python_ms
+    print(f"Время до первого вывода: {driver_ms:.1f} мс "
+          f"(пустой интерпретатор Python: {python_ms:.1f} мс, сверх него: {overhead_ms:.1f} мс)")
+    if args.target_ms:
+        if overhead_ms > args.target_ms:
+            print(f"ПРЕВЫШЕНО: {overhead_ms:.1f} мс > цели {args.target_ms:.1f} мс")
+            sys.exit(1)
+        print(f"OK: {overhead_ms:.1f} мс <= цели {args.target_ms:.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
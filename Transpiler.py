@@ -0,0 +1,482 @@
+"""
+Трансляция AST в исходный код Python, который компилируется в объект кода и исполняется напрямую
+Переменные с единственным объявленным типом хранятся как обычные значения Python,
+приведения типов встраиваются в код; остальные переменные и выражения
+обрабатываются общими методами Runtime над Value
+"""
+
+import math
+import sys
+from functools import reduce
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from Runtime import Value, InterpreterError, UndefinedVariableError, TypeMismatchError
+from AstInterpreter import AstInterpreter
+from Rope import ROPE_THRESHOLD, concat, repeat
+from TypeChecker import TypeChecker
+import Ast
+
+
+# Имя вспомогательного метода Runtime для каждого оператора
+_BINARY_HELPERS = {
+    Ast.OP_MUL: '_multiply', Ast.OP_DIV: '_divide', Ast.OP_MOD: '_modulo',
+    Ast.OP_ADD: '_add', Ast.OP_SUB: '_subtract',
+    Ast.OP_LT: '_compare_lt', Ast.OP_LE: '_compare_le', Ast.OP_GT: '_compare_gt', Ast.OP_GE: '_compare_ge',
+    Ast.OP_EQ: '_compare_eq', Ast.OP_NE: '_compare_ne',
+}
+
+_UNARY_HELPERS = {Ast.OP_NOT: '_logical_not', Ast.OP_NEG: '_unary_minus', Ast.OP_POS: '_unary_plus'}
+
+_NUMERIC = ('int', 'float')
+
+_DEFAULT_LITERALS = {'int': '0', 'float': '0.0', 'string': "''"}
+
+# repr бесконечности и NaN - не код Python: такие литералы берутся из пространства имён программы
+_NON_FINITE_LITERALS = {'inf': '_INF', '-inf': '(-_INF)', 'nan': '_NAN'}
+
+# Наибольшая длина str() для float, например '-2.2250738585072014e-308'
+_FLOAT_TEXT_LENGTH = 24
+
+# Имя файла объекта кода программы, по нему находится её кадр стека
+_PROGRAM_FILENAME = '<expr-program>'
+
+# Выражение: исходный код и статический тип (None - значение Value, тип известен только при исполнении)
+Expression = Tuple[str, Optional[str]]
+
+
+class _Undefined:
+    """Значение ещё не объявленной переменной"""
+
+    def __repr__(self):
+        return '<undefined>'
+
+
+_UNDEFINED = _Undefined()
+
+
+class PythonTranspiler:
+    def __init__(self):
+        self._lines: List[str] = []
+        self._indent = 0
+        # Число промежуточных переменных _t1, _t2, ...
+        self._temporaries = 0
+        self._types: Dict[str, Optional[str]] = {}
+        self._statements = {
+            Ast.Declaration: self._declaration,
+            Ast.Assignment: self._assignment,
+            Ast.If: self._if,
+            Ast.While: self._while,
+            Ast.Print: self._print,
+            Ast.Block: self._block,
+        }
+        self._expressions = {
+            Ast.Binary: self._binary,
+            Ast.Unary: self._unary,
+            Ast.Var: self._var,
+            Ast.Literal: self._literal,
+        }
+
+    def transpile(self, program: Ast.Program) -> str:
+        # Переменная с единственным объявленным типом хранится как значение Python
+        self._types = dict(zip(TypeChecker().check(program), program.types))
+
+        self._emit('def _program():')
+        self._indent += 1
+        # Счётчик шагов бюджета исполнения, общий для всех циклов программы
+        self._emit('_ticks = 0')
+        if self._types:
+            names = ' = '.join(self._local(name) for name in self._types)
+            self._emit(f'{names} = _UNDEFINED')
+        self._sequence(program.body)
+        return '\n'.join(self._lines) + '\n'
+
+    # Генерация кода
+
+    def _emit(self, line: str):
+        self._lines.append('    ' * self._indent + line)
+
+    @staticmethod
+    def _local(name: str) -> str:
+        # Префикс защищает от совпадения с ключевыми словами и именами Python
+        return f'v_{name}'
+
+    def _temporary(self) -> str:
+        """Новая локальная переменная для промежуточного значения выражения"""
+        self._temporaries += 1
+        return f'_t{self._temporaries}'
+
+    @staticmethod
+    def _box(expr: Expression) -> str:
+        code, type_name = expr
+        if type_name is None:
+            return code
+        return f"Value({code}, '{type_name}')"
+
+    @staticmethod
+    def _convert(code: str, from_type: str, to_type: str) -> str:
+        if from_type == to_type:
+            return code
+        if to_type == 'float':
+            return f'float({code})'
+        return f'str({code})'
+
+    def _helper_call(self, helper: str, operands: List[Expression], result_type: Optional[str]) -> Expression:
+        call = f"{helper}({', '.join(self._box(operand) for operand in operands)})"
+        if result_type is None:
+            return call, None
+        return f'{call}.value', result_type
+
+    # Операторы
+
+    def _statement(self, node: Ast.Node):
+        self._statements[node.__class__](node)
+
+    def _sequence(self, nodes: List[Ast.Node]):
+        for node in nodes:
+            self._statement(node)
+
+    def _store(self, name: str, expr: Expression, target_type: Optional[str], message_type: str):
+        local = self._local(name)
+        code, type_name = expr
+
+        if type_name is None:
+            checked = f"_declare({code}, '{message_type}', {name!r})"
+            self._emit(f'{local} = {checked}.value' if target_type is not None else f'{local} = {checked}')
+            return
+
+        # Совместимость статических типов уже проверена модулем TypeChecker
+        converted = self._convert(code, type_name, message_type)
+        if target_type is None:
+            converted = f"Value({converted}, '{message_type}')"
+        self._emit(f'{local} = {converted}')
+
+    def _declaration(self, node: Ast.Declaration):
+        target_type = self._types[node.name]
+        if node.expr is None:
+            if target_type is not None:
+                self._emit(f'{self._local(node.name)} = {_DEFAULT_LITERALS[node.type_name]}')
+            else:
+                self._emit(f"{self._local(node.name)} = _get_default_value('{node.type_name}')")
+        else:
+            self._store(node.name, self._expression(node.expr), target_type, node.type_name)
+
+    def _assignment(self, node: Ast.Assignment):
+        name = node.name
+        local = self._local(name)
+        if node.guarded:
+            self._emit(f'_check({local}, {name!r})')
+
+        target_type = self._types[name]
+        expr = self._expression(node.expr)
+        if target_type is None:
+            self._emit(f'{local} = _assign({local}, {self._box(expr)}, {name!r})')
+        else:
+            self._store(name, expr, target_type, target_type)
+
+    def _condition(self, node: Ast.Node) -> str:
+        """Код, истинность которого совпадает с истинностью узла; && и || - через and и or Python"""
+        if isinstance(node, Ast.Binary):
+            if node.op == Ast.OP_AND or node.op == Ast.OP_OR:
+                keyword = 'and' if node.op == Ast.OP_AND else 'or'
+                return f'({self._condition(node.left)} {keyword} {self._condition(node.right)})'
+            if Ast.OP_LT <= node.op <= Ast.OP_NE:
+                # Сравнение статических типов сразу даёт bool, без перевода в 1 или 0
+                comparison = self._comparison(node.op, self._expression(node.left), self._expression(node.right))
+                if comparison is not None:
+                    return f'({comparison})'
+        elif isinstance(node, Ast.Unary) and node.op == Ast.OP_NOT:
+            return f'(not {self._condition(node.operand)})'
+
+        code, type_name = self._expression(node)
+        if type_name is None:
+            return f'{code}.is_truthy()'
+        # Истинность int, float и string совпадает с истинностью значения Python
+        return code
+
+    def _suite(self, node: Ast.Node):
+        start = len(self._lines)
+        self._indent += 1
+        self._statement(node)
+        if len(self._lines) == start:
+            self._emit('pass')
+        self._indent -= 1
+
+    def _if(self, node: Ast.If):
+        self._emit(f'if {self._condition(node.cond)}:')
+        self._suite(node.then)
+        if node.orelse is not None:
+            self._emit('else:')
+            self._suite(node.orelse)
+
+    def _while(self, node: Ast.While):
+        self._emit(f'while {self._condition(node.cond)}:')
+        self._indent += 1
+        self._statement(node.body)
+        self._emit('_ticks = (_ticks or _checkpoint()) - 1')
+        self._indent -= 1
+
+    def _print(self, node: Ast.Print):
+        code, type_name = self._expression(node.expr)
+        if type_name == 'string':
+            # Строка может быть Rope: её части выводятся без сборки
+            self._emit(f'_print_value({code})')
+        elif type_name is not None:
+            self._emit(f'_print(str({code}))')
+        else:
+            self._emit(f'_print_value({code}.value)')
+
+    def _block(self, node: Ast.Block):
+        self._sequence(node.body)
+
+    # Выражения
+
+    def _expression(self, node: Ast.Node) -> Expression:
+        return self._expressions[node.__class__](node)
+
+    @staticmethod
+    def _comparison(op: int, left: Expression, right: Expression) -> Optional[str]:
+        """Сравнение статических типов как выражение Python со значением bool"""
+        left_code, left_type = left
+        right_code, right_type = right
+        if left_type is None or right_type is None:
+            return None
+        comparable = (left_type in _NUMERIC and right_type in _NUMERIC) or left_type == right_type == 'string'
+        if (Ast.OP_LT <= op <= Ast.OP_GE and comparable) or op in (Ast.OP_EQ, Ast.OP_NE):
+            return f'{left_code} {Ast.BINARY_SYMBOLS[op]} {right_code}'
+        return None
+
+    def _binary(self, node: Ast.Binary) -> Expression:
+        if node.op == Ast.OP_AND or node.op == Ast.OP_OR:
+            # Правый операнд вычисляется только при необходимости
+            return f'(1 if {self._condition(node)} else 0)', 'int'
+
+        if node.op == Ast.OP_ADD and node.type_name == 'string' and self._is_string_sum(node):
+            return self._string_sum(node), 'string'
+
+        left = self._expression(node.left)
+        right = self._expression(node.right)
+        helper = _BINARY_HELPERS[node.op]
+        left_code, left_type = left
+        right_code, right_type = right
+
+        result_type = node.type_name
+
+        if left_type is None or right_type is None:
+            return self._helper_call(helper, [left, right], result_type)
+
+        op = node.op
+        numeric = left_type in _NUMERIC and right_type in _NUMERIC
+
+        if op in (Ast.OP_ADD, Ast.OP_SUB, Ast.OP_MUL) and numeric:
+            return f'({left_code} {Ast.BINARY_SYMBOLS[op]} {right_code})', result_type
+        if op == Ast.OP_SUB and left_type == right_type == 'string':
+            # Строка-переменная может быть Rope: replace есть только у str
+            if not isinstance(node.left, Ast.Literal):
+                left_code = f'str({left_code})'
+            if not isinstance(node.right, Ast.Literal):
+                right_code = f'str({right_code})'
+            return f"{left_code}.replace({right_code}, '', 1)", 'string'
+        if op == Ast.OP_MUL and result_type == 'string':
+            return self._string_repeat(node, left_code, right_code), 'string'
+        if op == Ast.OP_DIV and numeric:
+            return f'_fdiv({left_code}, {right_code})', 'float'
+        if op == Ast.OP_MOD and left_type == right_type == 'int':
+            return f'_imod({left_code}, {right_code})', 'int'
+        comparison = self._comparison(op, left, right)
+        if comparison is not None:
+            return f'(1 if {comparison} else 0)', 'int'
+
+        return self._helper_call(helper, [left, right], result_type)
+
+    def _is_string_sum(self, node: Ast.Binary) -> bool:
+        """Конкатенация со статически известными типами операндов"""
+        return node.left.type_name is not None and node.right.type_name is not None
+
+    def _string_sum(self, node: Ast.Binary) -> str:
+        """Цепочка конкатенаций a + b + c одним выражением. Короткий результат
+        собирается обычным + над str, длинный - через _concat_all, который создаёт Rope.
+        Длина литералов известна заранее, а длина числа в конце цепочки ограничена,
+        поэтому len() вычисляется только для остальных операндов"""
+        operands = []
+        while True:
+            operands.append(node.right)
+            left = node.left
+            if not (isinstance(left, Ast.Binary) and left.op == Ast.OP_ADD and left.type_name == 'string'
+                    and self._is_string_sum(left)):
+                break
+            node = left
+        operands.append(left)
+        operands.reverse()
+
+        # Операнды после последнего с неизвестной длиной вычисляются уже после проверки
+        bounded_from = len(operands)
+        while bounded_from > 0 and self._length_bound(operands[bounded_from - 1]) is not None:
+            bounded_from -= 1
+
+        parts, lengths = [], []
+        static_length = 0
+        for index, operand in enumerate(operands):
+            if isinstance(operand, Ast.Literal):
+                text = str(operand.value.value)
+                parts.append(repr(text))
+                static_length += len(text)
+                continue
+            code, type_name = self._expression(operand)
+            if type_name != 'string':
+                code = f'str({code})'
+            if index >= bounded_from:
+                parts.append(code)
+                static_length += self._length_bound(operand)
+                continue
+            name = self._temporary()
+            parts.append(name)
+            lengths.append(f'len({name} := {code})')
+        if static_length or not lengths:
+            lengths.append(str(static_length))
+        return (f"({' + '.join(parts)} if {' + '.join(lengths)} < _SHORT_STRING "
+                f"else _concat_all({', '.join(parts)}))")
+
+    def _string_repeat(self, node: Ast.Binary, left_code: str, right_code: str) -> str:
+        """Повторение строки; длинный результат - через _repeat, который создаёт Rope"""
+        if node.left.type_name == 'string':
+            text_node, text_code, count_code = node.left, left_code, right_code
+        else:
+            text_node, text_code, count_code = node.right, right_code, left_code
+        count = self._temporary()
+        if isinstance(text_node, Ast.Literal):
+            length = f'({count} := {count_code}) * {len(text_node.value.value)}'
+            return f'({text_code} * {count} if {length} < _SHORT_STRING else _repeat({text_code}, {count}))'
+        text = self._temporary()
+        if text_node is node.left:
+            length = f'len({text} := {text_code}) * ({count} := {count_code})'
+        else:
+            length = f'({count} := {count_code}) * len({text} := {text_code})'
+        return f'({text} * {count} if {length} < _SHORT_STRING else _repeat({text}, {count}))'
+
+    @staticmethod
+    def _length_bound(operand: Ast.Node) -> Optional[int]:
+        """Наибольшая длина операнда после str() или None, если она не ограничена"""
+        if isinstance(operand, Ast.Literal):
+            return len(str(operand.value.value))
+        if operand.type_name == 'float':
+            return _FLOAT_TEXT_LENGTH
+        if operand.type_name == 'int' and sys.get_int_max_str_digits():
+            # Знак и цифры; более длинное число str() не преобразует
+            return sys.get_int_max_str_digits() + 1
+        return None
+
+    def _unary(self, node: Ast.Unary) -> Expression:
+        operand = self._expression(node.operand)
+        code, type_name = operand
+        if type_name is not None:
+            if node.op == Ast.OP_NOT:
+                return f'(0 if {code} else 1)', 'int'
+            if type_name in _NUMERIC:
+                return (f'(-{code})' if node.op == Ast.OP_NEG else code), type_name
+        return self._helper_call(_UNARY_HELPERS[node.op], [operand], node.type_name)
+
+    def _var(self, node: Ast.Var) -> Expression:
+        name = node.name
+        local = self._local(name)
+        if node.guarded:
+            local = f'_check({local}, {name!r})'
+        return local, self._types[name]
+
+    def _literal(self, node: Ast.Literal) -> Expression:
+        value = node.value
+        code = repr(value.value)
+        if value.type_name == 'float' and not math.isfinite(value.value):
+            code = _NON_FINITE_LITERALS[code]
+        return code, value.type_name
+
+
+class TranspiledInterpreter(AstInterpreter):
+    """Исполняет программу как функцию Python, полученную трансляцией AST"""
+
+    def compile(self, program: Ast.Program):
+        source = PythonTranspiler().transpile(program)
+        namespace = self._namespace()
+        exec(compile(source, _PROGRAM_FILENAME, 'exec'), namespace)
+        return namespace['_program']
+
+    def execute(self, program: Ast.Program):
+        try:
+            function = self.compile(program)
+        except (RecursionError, SyntaxError, MemoryError):
+            # Слишком глубокая вложенность для компилятора Python - исполняем AST напрямую
+            return super().execute(program)
+        self.budget.start()
+        try:
+            function()
+        finally:
+            self.sink.flush()
+        return None
+
+    def _stored_values(self) -> Iterable[Any]:
+        # Переменные транслированной программы - локальные переменные её кадра
+        frame = sys._getframe()
+        while frame is not None and frame.f_code.co_filename != _PROGRAM_FILENAME:
+            frame = frame.f_back
+        if frame is None:
+            return super()._stored_values()
+        return [value for name, value in frame.f_locals.items() if name.startswith('v_')]
+
+    def _namespace(self) -> dict:
+        _print = self.sink.write
+
+        def _check(value, name: str):
+            if value is _UNDEFINED:
+                raise UndefinedVariableError(f"Переменная '{name}' не объявлена")
+            return value
+
+        def _fdiv(left, right) -> float:
+            if right == 0:
+                raise InterpreterError("Деление на ноль")
+            return float(left) / float(right)
+
+        def _imod(left: int, right: int) -> int:
+            if right == 0:
+                raise InterpreterError("Деление на ноль при вычислении остатка")
+            return left % right
+
+        def _declare(value: Value, type_name: str, name: str) -> Value:
+            if not self._is_compatible_type(value.type_name, type_name):
+                raise TypeMismatchError(
+                    f"Невозможно присвоить значение типа {value.type_name} переменной типа {type_name} '{name}'"
+                )
+            return self._convert_type(value, type_name)
+
+        def _assign(existing_var: Value, value: Value, name: str) -> Value:
+            return _declare(value, existing_var.type_name, name)
+
+        # Без ограничения памяти длина строк не проверяется
+        checked = self.budget.max_memory is not None
+        concat_pair = self._concat if checked else concat
+
+        def _concat_all(*parts):
+            return reduce(concat_pair, parts)
+
+        namespace = {
+            'Value': Value,
+            'TypeMismatchError': TypeMismatchError,
+            'UndefinedVariableError': UndefinedVariableError,
+            '_UNDEFINED': _UNDEFINED,
+            '_print': _print,
+            '_print_value': self._print_value,
+            '_checkpoint': self.budget.checkpoint,
+            '_concat_all': _concat_all,
+            '_repeat': self._repeat if checked else repeat,
+            # Строки короче этой длины не становятся Rope и не проверяются
+            '_SHORT_STRING': min(ROPE_THRESHOLD, self.budget.unchecked_length + 1),
+            '_check': _check,
+            '_fdiv': _fdiv,
+            '_imod': _imod,
+            '_declare': _declare,
+            '_assign': _assign,
+            '_get_default_value': self._get_default_value,
+            '_INF': math.inf,
+            '_NAN': math.nan,
+        }
+        for helper in list(_BINARY_HELPERS.values()) + list(_UNARY_HELPERS.values()):
+            namespace[helper] = getattr(self, helper)
+        return namespace
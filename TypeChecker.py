@@ -0,0 +1,163 @@
+"""
+Статическая проверка типов AST
+Объявления переменных явно типизированы, поэтому тип каждого выражения
+известен до исполнения. Проверка отмечает выражения их типами и сообщает
+о гарантированных ошибках типов до начала исполнения программы.
+Переменная, объявленная с разными типами, остаётся динамической: её тип
+и типы зависящих от неё выражений определяются при исполнении
+"""
+
+from typing import Dict, List, Optional, Set
+
+from Runtime import Runtime, TypeMismatchError
+from Resolver import Resolver
+import Ast
+
+
+_NUMERIC = ('int', 'float')
+
+# Операторы, результат которых всегда int независимо от типов операндов
+_INT_RESULT = (
+    Ast.OP_MOD, Ast.OP_LT, Ast.OP_LE, Ast.OP_GT, Ast.OP_GE, Ast.OP_EQ, Ast.OP_NE, Ast.OP_AND, Ast.OP_OR,
+)
+
+_COMPARISONS = (Ast.OP_LT, Ast.OP_LE, Ast.OP_GT, Ast.OP_GE)
+
+
+def binary_result_type(op: int, left: Optional[str], right: Optional[str]) -> Optional[str]:
+    """Тип результата бинарной операции или None, если он определяется при исполнении"""
+    if op in _INT_RESULT:
+        return 'int'
+    if op == Ast.OP_DIV:
+        return 'float'
+    if left is None or right is None:
+        return None
+    if op == Ast.OP_ADD:
+        if left == 'string' or right == 'string':
+            return 'string'
+        return 'float' if 'float' in (left, right) else 'int'
+    if op == Ast.OP_SUB:
+        if left == 'string' and right == 'string':
+            return 'string'
+        if 'float' in (left, right):
+            return 'float'
+        # int - string завершается ошибкой при исполнении
+        return 'int' if left == right == 'int' else None
+    if op == Ast.OP_MUL:
+        if (left, right) in (('string', 'int'), ('int', 'string')):
+            return 'string'
+        if 'float' in (left, right):
+            return 'float'
+        return 'int' if left == right == 'int' else None
+    return None
+
+
+def unary_result_type(op: int, operand: Optional[str]) -> Optional[str]:
+    """Тип результата унарной операции или None, если он определяется при исполнении"""
+    if op == Ast.OP_NOT:
+        return 'int'
+    return operand
+
+
+class TypeChecker:
+    def __init__(self):
+        self._types: List[Optional[str]] = []
+        self._semantics = Runtime()
+        self._statements = {
+            Ast.Declaration: self._check_declaration,
+            Ast.Assignment: self._check_assignment,
+            Ast.If: self._check_if,
+            Ast.While: self._check_while,
+            Ast.Print: self._check_print,
+            Ast.Block: self._check_block,
+        }
+
+    def check(self, program: Ast.Program) -> List[str]:
+        """Разрешает слоты, отмечает выражения типами и возвращает имена по номерам слотов"""
+        names = Resolver().resolve(program)
+        if program.types is not None:
+            return names
+
+        declared: Dict[int, Set[str]] = {}
+        self._collect(program.body, declared)
+        self._types = [None] * len(names)
+        for slot, types in declared.items():
+            if len(types) == 1:
+                self._types[slot] = next(iter(types))
+
+        self._check_sequence(program.body)
+        program.types = self._types
+        return names
+
+    def _collect(self, nodes: List[Ast.Node], declared: Dict[int, Set[str]]):
+        for node in nodes:
+            if isinstance(node, Ast.Declaration):
+                declared.setdefault(node.slot, set()).add(node.type_name)
+            elif isinstance(node, Ast.If):
+                self._collect([node.then], declared)
+                if node.orelse is not None:
+                    self._collect([node.orelse], declared)
+            elif isinstance(node, Ast.While):
+                self._collect([node.body], declared)
+            elif isinstance(node, Ast.Block):
+                self._collect(node.body, declared)
+
+    def _check_store(self, name: str, value_type: Optional[str], type_name: Optional[str]):
+        if value_type is None or type_name is None:
+            return
+        if self._semantics._is_compatible_type(value_type, type_name):
+            return
+        raise TypeMismatchError(
+            f"Невозможно присвоить значение типа {value_type} переменной типа {type_name} '{name}'"
+        )
+
+    # Операторы
+
+    def _check_sequence(self, nodes: List[Ast.Node]):
+        statements = self._statements
+        for node in nodes:
+            statements[node.__class__](node)
+
+    def _check_declaration(self, node: Ast.Declaration):
+        if node.expr is not None:
+            self._check_store(node.name, self._check_expression(node.expr), node.type_name)
+
+    def _check_assignment(self, node: Ast.Assignment):
+        self._check_store(node.name, self._check_expression(node.expr), self._types[node.slot])
+
+    def _check_if(self, node: Ast.If):
+        self._check_expression(node.cond)
+        self._statements[node.then.__class__](node.then)
+        if node.orelse is not None:
+            self._statements[node.orelse.__class__](node.orelse)
+
+    def _check_while(self, node: Ast.While):
+        self._check_expression(node.cond)
+        self._statements[node.body.__class__](node.body)
+
+    def _check_print(self, node: Ast.Print):
+        self._check_expression(node.expr)
+
+    def _check_block(self, node: Ast.Block):
+        self._check_sequence(node.body)
+
+    # Выражения
+
+    def _check_expression(self, node: Ast.Node) -> Optional[str]:
+        if isinstance(node, Ast.Binary):
+            left = self._check_expression(node.left)
+            right = self._check_expression(node.right)
+            if node.op in _COMPARISONS and left is not None and right is not None:
+                if not (left in _NUMERIC and right in _NUMERIC or left == right == 'string'):
+                    raise TypeMismatchError("Невозможно сравнить значения разных типов")
+            node.type_name = binary_result_type(node.op, left, right)
+        elif isinstance(node, Ast.Unary):
+            operand = self._check_expression(node.operand)
+            if operand == 'string' and node.op != Ast.OP_NOT:
+                if node.op == Ast.OP_NEG:
+                    raise TypeMismatchError("Унарный минус поддерживается только для числовых типов")
+                raise TypeMismatchError("Унарный плюс поддерживается только для числовых типов")
+            node.type_name = unary_result_type(node.op, operand)
+        elif isinstance(node, Ast.Var):
+            node.type_name = self._types[node.slot]
+        return node.type_name
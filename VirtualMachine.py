@@ -0,0 +1,159 @@
+"""
+Стековая виртуальная машина для байт-кода из модуля Bytecode
+Вся программа исполняется одним циклом выборки инструкций, без рекурсии
+"""
+
+from typing import Iterable, List, Optional
+
+from OutputSink import OutputSink
+from Runtime import Runtime, Value, TRUE, FALSE, small_int, ExecutionBudget, UndefinedVariableError, TypeMismatchError, InterpreterError
+from Bytecode import (
+    BytecodeCompiler, Code,
+    LOAD_CONST, LOAD_VAR, LOAD_VAR_CHECKED, DECLARE, DECLARE_DEFAULT, CHECK_DEFINED, STORE,
+    ADD, SUB, MUL, DIV, MOD, LT, LE, GT, GE, EQ, NE, NOT, NEG, POS,
+    JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP, LOOP, PRINT,
+)
+import Ast
+
+
+class VirtualMachine(Runtime):
+    def __init__(self, sink: Optional[OutputSink] = None, budget: Optional[ExecutionBudget] = None):
+        super().__init__(sink, budget)
+        self.slots: List[Optional[Value]] = []
+
+    def execute(self, program: Ast.Program):
+        code = BytecodeCompiler().compile(program)
+        try:
+            self.run(code)
+        finally:
+            self.sink.flush()
+        return None
+
+    def _stored_values(self) -> Iterable[Optional[Value]]:
+        return self.slots
+
+    def run(self, code: Code):
+        instructions = code.instructions
+        constants = code.constants
+        names = code.names
+        declarations = code.declarations
+        self.slots = slots = [None] * len(names)
+        print_value = self._print_value
+
+        # Общие операции, используемые вне быстрых путей для int
+        binary = {
+            DIV: self._divide, MOD: self._modulo,
+            LT: self._compare_lt, LE: self._compare_le, GT: self._compare_gt, GE: self._compare_ge,
+            EQ: self._compare_eq, NE: self._compare_ne,
+        }
+        unary = {NOT: self._logical_not, NEG: self._unary_minus, POS: self._unary_plus}
+        add = self._add
+        subtract = self._subtract
+        multiply = self._multiply
+        compare_lt = self._compare_lt
+        is_compatible_type = self._is_compatible_type
+        convert_type = self._convert_type
+
+        checkpoint = self.budget.checkpoint
+        self.budget.start()
+        ticks = 0
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+        end = len(instructions)
+
+        while pc < end:
+            opcode, arg = instructions[pc]
+            pc += 1
+
+            if opcode == LOAD_VAR:
+                push(slots[arg])
+            elif opcode == LOAD_CONST:
+                push(constants[arg])
+            elif opcode == STORE:
+                value = pop()
+                type_name = slots[arg].type_name
+                if value.type_name != type_name:
+                    if not is_compatible_type(value.type_name, type_name):
+                        raise TypeMismatchError(
+                            f"Невозможно присвоить значение типа {value.type_name} переменной типа {type_name} '{names[arg]}'"
+                        )
+                    value = convert_type(value, type_name)
+                slots[arg] = value
+            elif opcode == LOAD_VAR_CHECKED:
+                value = slots[arg]
+                if value is None:
+                    raise UndefinedVariableError(f"Переменная '{names[arg]}' не объявлена")
+                push(value)
+            elif opcode == CHECK_DEFINED:
+                if slots[arg] is None:
+                    raise UndefinedVariableError(f"Переменная '{names[arg]}' не объявлена")
+            elif opcode == JUMP_IF_FALSE:
+                if not pop().is_truthy():
+                    pc = arg
+            elif opcode == ADD:
+                right = pop()
+                left = stack[-1]
+                if left.type_name == 'int' and right.type_name == 'int':
+                    result = left.value + right.value
+                    stack[-1] = small_int(result) or Value(result, 'int')
+                else:
+                    stack[-1] = add(left, right)
+            elif opcode == LT:
+                right = pop()
+                left = stack[-1]
+                if left.type_name == 'int' and right.type_name == 'int':
+                    stack[-1] = TRUE if left.value < right.value else FALSE
+                else:
+                    stack[-1] = compare_lt(left, right)
+            elif opcode == SUB:
+                right = pop()
+                left = stack[-1]
+                if left.type_name == 'int' and right.type_name == 'int':
+                    result = left.value - right.value
+                    stack[-1] = small_int(result) or Value(result, 'int')
+                else:
+                    stack[-1] = subtract(left, right)
+            elif opcode == LOOP:
+                # Обратный переход цикла расходует шаг бюджета
+                ticks = (ticks or checkpoint()) - 1
+                pc = arg
+            elif opcode == JUMP:
+                pc = arg
+            elif opcode == JUMP_IF_TRUE:
+                if pop().is_truthy():
+                    pc = arg
+            elif opcode == MUL:
+                right = pop()
+                left = stack[-1]
+                if left.type_name == 'int' and right.type_name == 'int':
+                    result = left.value * right.value
+                    stack[-1] = small_int(result) or Value(result, 'int')
+                else:
+                    stack[-1] = multiply(left, right)
+            elif opcode >= DIV and opcode <= NE:
+                right = pop()
+                stack[-1] = binary[opcode](stack[-1], right)
+            elif opcode == DECLARE:
+                slot, type_name = declarations[arg]
+                value = pop()
+                if value.type_name != type_name:
+                    if not is_compatible_type(value.type_name, type_name):
+                        raise TypeMismatchError(
+                            f"Невозможно присвоить значение типа {value.type_name} переменной типа {type_name} '{names[slot]}'"
+                        )
+                    value = convert_type(value, type_name)
+                slots[slot] = value
+            elif opcode == DECLARE_DEFAULT:
+                slot, type_name = declarations[arg]
+                slots[slot] = self._get_default_value(type_name)
+            elif opcode == PRINT:
+                print_value(pop().value)
+            elif opcode <= POS and opcode >= NOT:
+                stack[-1] = unary[opcode](stack[-1])
+            else:
+                raise InterpreterError(f"Неизвестная инструкция: {opcode}")
+
+        return None
@@ -0,0 +1,18 @@
+"""Программы для сверки с ANTLR: примеры и программы замеров"""
+
+import glob
+import os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def program_files():
+    paths = sorted(glob.glob(os.path.join(ROOT, 'examples', '*.txt')))
+    paths += sorted(glob.glob(os.path.join(ROOT, 'bench', '*.txt')))
+    return [os.path.relpath(path, ROOT) for path in paths]
+
+
+def read_program(path: str) -> str:
+    with open(os.path.join(ROOT, path), 'r', encoding='utf-8') as f:
+        return f.read()
+
@@ -0,0 +1,28 @@
+"""FastLexer выдаёт те же токены и ошибки, что и ExprLexer, и ExprParser
+разбирает его токены так же, включая восстановление после ошибок"""
+
+import pytest
+
+from FastLexer import compare_with_antlr, compare_parse_with_antlr
+from FastLexer import MALFORMED
+from programs import program_files, read_program
+
+
+@pytest.mark.parametrize('path', program_files())
+def test_tokens_match_antlr(path):
+    assert compare_with_antlr(read_program(path)) is None
+
+
+@pytest.mark.parametrize('path', program_files())
+def test_parse_matches_antlr(path):
+    assert compare_parse_with_antlr(read_program(path)) is None
+
+
+@pytest.mark.parametrize('text', MALFORMED)
+def test_malformed_tokens_match_antlr(text):
+    assert compare_with_antlr(text) is None
+
+
+@pytest.mark.parametrize('text', MALFORMED)
+def test_malformed_parse_matches_antlr(text):
+    assert compare_parse_with_antlr(text) is None
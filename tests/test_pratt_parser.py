@@ -0,0 +1,27 @@
+"""PrattParser и ExprParser (с токенами ExprLexer и FastLexer) принимают одни
+и те же программы с одинаковым AST и отвергают одни и те же программы с
+ошибкой в одной и той же позиции"""
+
+import pytest
+
+from FastLexer import MALFORMED
+from PrattParser import compare_with_antlr, mutations
+from programs import program_files, read_program
+
+
+def _first_difference(text: str):
+    for variant in mutations(text):
+        difference = compare_with_antlr(variant)
+        if difference is not None:
+            return f"{difference}\n{variant}"
+    return None
+
+
+@pytest.mark.parametrize('path', program_files())
+def test_program_and_mutations_match_antlr(path):
+    assert _first_difference(read_program(path)) is None
+
+
+@pytest.mark.parametrize('text', MALFORMED)
+def test_malformed_and_mutations_match_antlr(text):
+    assert _first_difference(text) is None